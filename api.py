@@ -5,14 +5,12 @@ import base64
 import flask
 from flask import request, jsonify, send_file
 import hashlib
-import listbuilder
 import logging
-import logging.handlers
 import os
+import shrimplog
 import time
 
-_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/api.log")
-logging.basicConfig(handlers=[_handler], level=logging.INFO)
+shrimplog.configure("/var/log/shrimpbot/api.log")
 
 logging.info("API start...")
 
@@ -22,16 +20,27 @@ ROOT_PATH = os.path.dirname(__file__)
 guid_hash = hashlib.new("md5")
 guid_hash.update(str(time.time()).encode())
 guid = guid_hash.hexdigest()[0:16]
-
-listbuilder_config = listbuilder.get_default_config()
-listbuilder_config.pwd = ROOT_PATH
-listbuilder_config.working_dir = os.path.join(ROOT_PATH, "working/")
 outpath = os.path.join(ROOT_PATH, "out/")
-listbuilder_config.vlb_path = os.path.join(
-    listbuilder_config.pwd, "vlb/", f"{guid}.vlb"
-)
-listbuilder_config.vlog_path = os.path.join(outpath, guid + ".vlog")
-listbuilder_config.db_path = os.path.join(ROOT_PATH, "vlb_pieces.vlo")
+
+listbuilder_config = None
+
+
+def get_listbuilder_config():
+    """Import listbuilder and build this worker's config on first use, so a
+    gunicorn worker can start taking requests without loading it."""
+
+    global listbuilder_config
+    if listbuilder_config is None:
+        import listbuilder
+
+        config = listbuilder.get_default_config()
+        config.pwd = ROOT_PATH
+        config.working_dir = os.path.join(ROOT_PATH, "working/")
+        config.vlb_path = os.path.join(config.pwd, "vlb/", f"{guid}.vlb")
+        config.vlog_path = os.path.join(outpath, guid + ".vlog")
+        config.db_path = os.path.join(ROOT_PATH, "vlb_pieces.vlo")
+        listbuilder_config = config
+    return listbuilder_config
 
 
 app = flask.Flask(__name__)
@@ -63,6 +72,9 @@ def home():
             logging.error(f"Error decoding 'fleet_b64': {str(e)}")
             return out
 
+        import listbuilder
+
+        listbuilder_config = get_listbuilder_config()
         listbuilder_config.fleet = liststr
         success, last_item = listbuilder.import_from_list(listbuilder_config)
 
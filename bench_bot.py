@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+
+"""
+bench_bot.py
+
+Replay a corpus of chat messages through shrimpbot's on_message (and its &
+commands) without connecting to Discord, and report how fast it went.
+
+Messages, channels, guilds and users are stand-ins that record everything the
+bot sends instead of calling Discord.  The wiki is replaced with one that never
+finds anything, rate limits are off, reactions fire immediately and the
+attachment cache is a throwaway, so a run touches nothing but the local card
+and acronym tables.  Per-handler latency comes from the bot's own shrimpperf
+spans.
+
+The corpus is one message per line: either plain text, sent by a default user
+in a default channel, or a JSON object with "content" and optionally "author",
+"channel" and "guild" names.  Without a corpus, a built-in sample is used.
+
+    ./bench_bot.py                       # the built-in sample, 100 times
+    ./bench_bot.py -corpus chat.jsonl -n 5 -c 8
+"""
+
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import shrimpperf
+
+DEFAULT_CORPUS = [
+    "!card admiral ackbar",
+    "!card gladiator star destroyer",
+    "!card intel officer",
+    "!card admiral ackbar, intel officer, gladiator star destroyer",
+    "!acro ACM BT",
+    "!acro whats an ISD",
+    "ACM?",
+    "anyone up for a game tonight?",
+    "I love my MC30s",
+    "all hail shrimpbot",
+    "GARM BEL IBLIS",
+    "count dooku would never",
+    "just chatting about nothing in particular",
+    "!roll 3red 2blue 1black",
+    "&list",
+]
+
+_ids = itertools.count(700000000000000000)
+
+
+class FakeAttachment:
+    def __init__(self, url):
+        self.url = url
+
+
+class Recorder:
+    """Everything sent, in order, as (destination, content, kwargs)."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, destination, content=None, **kwargs):
+        self.sent.append((destination, content, kwargs))
+        sent = FakeMessage(content or "", author=None, channel=destination)
+        uploads = kwargs.get("files") or []
+        if kwargs.get("file") is not None:
+            uploads = [kwargs["file"]]
+        # hour-long attachment URLs, like Discord's, so the cache gets used
+        expires = "{:x}".format(int(time.time()) + 3600)
+        for upload in uploads:
+            sent.attachments.append(
+                FakeAttachment(
+                    "https://cdn.discordapp.com/attachments/{}/{}?ex={}".format(
+                        next(_ids), getattr(upload, "filename", "image.png"), expires
+                    )
+                )
+            )
+        return sent
+
+
+class FakeUser:
+    def __init__(self, name, recorder, bot=False, user_id=None):
+        self.id = user_id or next(_ids)
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.mention = "<@{}>".format(self.id)
+        self.recorder = recorder
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        return self.recorder.send(self, content, **kwargs)
+
+
+class FakeGuild:
+    def __init__(self, name):
+        self.id = next(_ids)
+        self.name = name
+        self.channels = []
+
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel:
+    def __init__(self, name, guild, recorder, channel_type=None):
+        self.id = next(_ids)
+        self.name = name
+        self.guild = guild
+        self.type = channel_type
+        self.recorder = recorder
+        guild.channels.append(self)
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        return self.recorder.send(self, content, **kwargs)
+
+
+class FakeMessage:
+    def __init__(self, content, author, channel):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = getattr(channel, "guild", None)
+        self.attachments = []
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        self.reactions.append(emoji)
+
+
+class FakeContext:
+    """Just enough of a commands.Context for the bot's & commands."""
+
+    def __init__(self, message):
+        self.message = message
+        self.author = message.author
+        self.channel = message.channel
+        self.guild = message.guild
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class NoWiki:
+    """A WikiClient that never finds anything, so nothing leaves the machine."""
+
+    async def autoPopulateImage(self, subject):
+        return False
+
+    async def findPage(self, page_name):
+        return False
+
+    async def close(self):
+        pass
+
+
+def read_corpus(lines):
+    """(author, channel, guild, content) for every non-blank line."""
+
+    corpus = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("{"):
+            entry = json.loads(line)
+            corpus.append(
+                (
+                    entry.get("author", "ardaedhel"),
+                    entry.get("channel", "general"),
+                    entry.get("guild", "Armada"),
+                    entry["content"],
+                )
+            )
+        else:
+            corpus.append(("ardaedhel", "general", "Armada", line))
+    return corpus
+
+
+_MISSING = object()
+
+
+class Harness:
+    """Drives shrimpbot's on_message with stand-in Discord objects.
+
+    The stand-ins are swapped into the shrimpbot module, so close() (or
+    leaving a with block) must put the originals back before anything else
+    uses it."""
+
+    def __init__(self, shrimpbot, channel_type=None, rate_limits=False):
+        self.shrimpbot = shrimpbot
+        self.recorder = Recorder()
+        self.channel_type = channel_type
+        self.users = {}
+        self.guilds = {}
+        self.channels = {}
+        self.errors = collections.Counter()
+        self.messages = []
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = []
+
+        from lib_shrimpbot.attachments import AttachmentCache
+        from lib_shrimpbot.ratelimit import RateLimiter
+
+        self.swap(shrimpbot, "wiki", NoWiki())
+        self.swap(
+            shrimpbot,
+            "attachments",
+            AttachmentCache(os.path.join(self.tmp.name, "attachments.json")),
+        )
+        self.swap(shrimpbot.reactions, "delay", 0)
+        if not rate_limits:
+            self.swap(shrimpbot, "rate_limits", RateLimiter({}))
+        self.swap(shrimpbot.bot, "process_commands", self.process_commands)
+
+    def swap(self, obj, name, value):
+        self.saved.append((obj, name, vars(obj).get(name, _MISSING)))
+        setattr(obj, name, value)
+
+    def close(self):
+        """Put back everything the harness swapped out."""
+
+        while self.saved:
+            obj, name, value = self.saved.pop()
+            if value is _MISSING:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, value)
+        self.tmp.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def user(self, name):
+        if name not in self.users:
+            self.users[name] = FakeUser(name, self.recorder)
+        return self.users[name]
+
+    def channel(self, name, guild_name):
+        if guild_name not in self.guilds:
+            self.guilds[guild_name] = FakeGuild(guild_name)
+        if (guild_name, name) not in self.channels:
+            self.channels[(guild_name, name)] = FakeChannel(
+                name, self.guilds[guild_name], self.recorder, self.channel_type
+            )
+        return self.channels[(guild_name, name)]
+
+    def message(self, author, channel, guild, content):
+        message = FakeMessage(content, self.user(author), self.channel(channel, guild))
+        self.messages.append(message)
+        return message
+
+    async def process_commands(self, message):
+        """Stands in for bot.process_commands: run the & command, if any,
+        straight through its callback."""
+
+        prefix = self.shrimpbot.bot.command_prefix
+        if not message.content.startswith(prefix):
+            return
+        name, *args = message.content[len(prefix) :].split()
+        command = self.shrimpbot.bot.get_command(name)
+        if command is None:
+            return
+        with shrimpperf.span("&" + name):
+            await command.callback(FakeContext(message), *args)
+
+    async def dispatch(self, message):
+        try:
+            with shrimpperf.span("on_message"):
+                await self.shrimpbot.on_message(message)
+        except Exception as err:
+            self.errors[type(err).__name__] += 1
+
+    async def replay(self, corpus, repeat=1, concurrency=1):
+        """Send every corpus message through on_message, repeat times,
+        concurrency at a time.  Returns the wall time taken."""
+
+        messages = [self.message(*entry) for _ in range(repeat) for entry in corpus]
+        start = time.perf_counter()
+        for i in range(0, len(messages), concurrency):
+            await asyncio.gather(
+                *(self.dispatch(m) for m in messages[i : i + concurrency])
+            )
+        # let the reactions go out before the clock stops; even with no delay
+        # they're scheduled with call_later, so give the timers a turn first
+        await asyncio.sleep(0.01)
+        while self.shrimpbot.reactions.tasks:
+            await asyncio.gather(*self.shrimpbot.reactions.tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed):
+        lines = [
+            "{} messages in {:.2f} s: {:.0f} messages/s".format(
+                len(self.messages), elapsed, len(self.messages) / elapsed
+            ),
+            "{} sends, {} reactions".format(
+                len(self.recorder.sent),
+                sum(len(m.reactions) for m in self.messages),
+            ),
+        ]
+        if self.errors:
+            lines.append(
+                "errors: "
+                + ", ".join(
+                    "{} x{}".format(name, count)
+                    for name, count in self.errors.most_common()
+                )
+            )
+        lines.extend(shrimpperf.timings.summary()[1:])
+        return "\n".join(lines)
+
+
+async def run(args):
+    import discord
+    import shrimpbot
+
+    if args.corpus:
+        with open(args.corpus) as corpus_file:
+            corpus = read_corpus(corpus_file)
+    else:
+        corpus = read_corpus(DEFAULT_CORPUS)
+
+    with Harness(
+        shrimpbot,
+        channel_type=discord.ChannelType.text,
+        rate_limits=args.rate_limits,
+    ) as harness:
+        shrimpperf.timings.reset()
+        elapsed = await harness.replay(corpus, repeat=args.n, concurrency=args.c)
+        return harness.report(elapsed)
+
+
+def main():
+
+    # fmt: off
+    parser = argparse.ArgumentParser(description="Benchmark shrimpbot's message handling offline.")
+    parser.add_argument("-corpus", help="messages to replay, one per line (text or JSON)", type=str, default=None)
+    parser.add_argument("-n", help="times to replay the corpus", type=int, default=100)
+    parser.add_argument("-c", help="messages handled concurrently", type=int, default=1)
+    parser.add_argument("--rate-limits", help="keep the bot's rate limits on", action="store_true")
+    args = parser.parse_args()
+    # fmt: on
+
+    print(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+
+    main()
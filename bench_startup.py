@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+"""
+bench_startup.py
+
+Measure how long it takes to import the bot's and the API's modules, so changes
+to what gets loaded at startup (and so bot restarts and gunicorn worker
+respawns) can be compared.
+
+Each module is imported in a fresh interpreter under `python -X importtime`,
+repeat times, and the best run is reported: the time spent importing (and the
+wall time of the whole interpreter), and the slowest imports it pulled in, by
+cumulative time.
+
+    ./bench_startup.py                     # the default set of modules
+    ./bench_startup.py listbuilder -n 10 -top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PWD = os.path.dirname(os.path.abspath(__file__))
+
+# shrimpbot itself needs discord.py; it's skipped with a note if that's missing
+DEFAULT_MODULES = [
+    "shrimplog",
+    "cardpop",
+    "lib_shrimpbot.vassal",
+    "listbuilder",
+    "api",
+    "shrimpbot",
+]
+
+
+def parse_importtime(stderr):
+    """Parse -X importtime output into a list of (module, self_us,
+    cumulative_us, depth) tuples, in the order the imports finished."""
+
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return entries
+
+
+def measure(module, python=sys.executable, cwd=PWD):
+    """Import module once in a fresh interpreter.  Returns (wall_seconds,
+    entries), or raises RuntimeError with the child's error output."""
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", "import " + module],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    # everything up to site is the interpreter starting up, not module's doing
+    entries = parse_importtime(proc.stderr)
+    for i, (name, _, _, depth) in enumerate(entries):
+        if name == "site" and depth == 0:
+            entries = entries[i + 1 :]
+            break
+    return wall, entries
+
+
+def benchmark(module, repeat=5, **kwargs):
+    """The fastest of repeat measure()s, so one-off disk and cache effects
+    don't count against the module."""
+
+    return min((measure(module, **kwargs) for _ in range(repeat)), key=lambda r: r[0])
+
+
+def report(module, wall, entries, top=10):
+    imports = sum(e[2] for e in entries if e[3] == 0)
+    lines = [
+        "{}: {:.1f} ms importing, {:.1f} ms wall".format(
+            module, imports / 1000, wall * 1000
+        )
+    ]
+    for name, self_us, cumulative_us, depth in sorted(
+        entries, key=lambda e: e[2], reverse=True
+    )[:top]:
+        lines.append(
+            "  {:>8.1f} ms cumulative {:>8.1f} ms self  {}{}".format(
+                cumulative_us / 1000, self_us / 1000, "  " * depth, name
+            )
+        )
+    return "\n".join(lines)
+
+
+def main():
+
+    # fmt: off
+    parser = argparse.ArgumentParser(description="Report import time per module for the bot and the API.")
+    parser.add_argument("modules", help="modules to import", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("-n", help="runs per module (the best is reported)", type=int, default=5)
+    parser.add_argument("-top", help="slowest imports to list per module", type=int, default=10)
+    args = parser.parse_args()
+    # fmt: on
+
+    for module in args.modules:
+        try:
+            wall, entries = benchmark(module, repeat=args.n)
+        except RuntimeError as err:
+            print("{}: could not import ({})".format(module, err))
+            continue
+        print(report(module, wall, entries, top=args.top))
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""
+build_card_variants.py
+
+Make a smaller copy of every card image in cards.txt, shrunk to display size
+and recompressed (WebP by default), for !card to upload instead of the
+original.  Images are worked on across every core, and only new or changed
+ones are transcoded, so it's cheap to run again after adding cards.  The bot
+picks up the new variants by itself.
+
+    ./build_card_variants.py
+    ./build_card_variants.py -format png -max-size 600 -j 4
+"""
+
+import argparse
+import os
+
+from lib_shrimpbot import variants
+from lib_shrimpbot.cardsearch import read_card_table
+
+PWD = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+
+    # fmt: off
+    parser = argparse.ArgumentParser(description="Build display-size variants of the card images.")
+    parser.add_argument("-img", help="card image directory", type=str, default=os.path.join(PWD, "img"))
+    parser.add_argument("-cards", help="card reference table", type=str, default=os.path.join(PWD, "cards.txt"))
+    parser.add_argument("-out", help="variant directory", type=str, default=os.path.join(PWD, "img", "variants"))
+    parser.add_argument("-max-size", help="longest side, in pixels", type=int, default=800)
+    parser.add_argument("-format", help="variant format", choices=["webp", "png"], default="webp")
+    parser.add_argument("-quality", help="WebP quality (0-100)", type=int, default=90)
+    parser.add_argument("-j", help="worker processes (default: one per core)", type=int, default=None)
+    args = parser.parse_args()
+    # fmt: on
+
+    sources = read_card_table(args.cards, os.path.abspath(args.img)).values()
+    counts = variants.build(
+        sources,
+        os.path.abspath(args.out),
+        max_size=args.max_size,
+        fmt=args.format,
+        quality=args.quality,
+        workers=args.j,
+    )
+    print(
+        "{built} built, {unchanged} unchanged, {kept_source} already small enough, "
+        "{missing} missing, {failed} failed.".format(**counts)
+    )
+
+
+if __name__ == "__main__":
+
+    main()
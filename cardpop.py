@@ -1,16 +1,23 @@
 #!/usr/bin/python3
 
+import aiohttp
+import asyncio
+import hashlib
 import json
 import logging
-import logging.handlers
 import os
 import pathlib
-import requests
+import re
+import shrimplog
 import shutil
+import time
 
+shrimplog.configure("/var/log/shrimpbot/shrimp.log")
 
-_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/shrimp.log")
-logging.basicConfig(handlers=[_handler], level=logging.INFO)
+WIKI_API_URL = "https://starwars-armada.fandom.com/api.php"
+
+# The blocking helpers below import requests where they use it: the bot only
+# uses WikiClient, and requests is a good chunk of cardpop's import time.
 
 
 def autoPopulateImage(subject):
@@ -29,17 +36,24 @@ def autoPopulateImage(subject):
 def findPage(page_name):
     """Search by page name.  Return page title of the top result."""
 
-    payload = {
+    import requests
+
+    with requests.get(WIKI_API_URL, params=_findPagePayload(page_name)) as r:
+        data = r.json()
+    return _parseTopHit(data)
+
+
+def _findPagePayload(page_name):
+    return {
         "action": "query",
         "list": "search",
         "srsearch": page_name,
         "format": "json",
     }
-    urlString = "https://starwars-armada.fandom.com/api.php"
 
+
+def _parseTopHit(data):
     try:
-        with requests.get(urlString, params=payload) as r:
-            data = r.json()
         logging.info("Top wiki hit: {}".format(data["query"]["search"][0]["title"]))
         return data["query"]["search"][0]["title"]
     except IndexError:
@@ -51,18 +65,29 @@ def getBestMatchImageTitle(pageTitle):
 
     logging.info("Searching for a good match in {}...".format(pageTitle))
 
-    payload = {
+    import requests
+
+    try:
+        with requests.get(WIKI_API_URL, params=_imagesPayload(pageTitle)) as r:
+            data = r.json()
+        return _parseBestMatchImageTitle(pageTitle, data)
+    except Exception as err:
+        logging.error("{} - {} - {}".format(type(err), err.args, err))
+
+    return False
+
+
+def _imagesPayload(pageTitle):
+    return {
         "action": "query",
         "titles": pageTitle,
         "format": "json",
         "prop": "images",
     }
-    urlString = "https://starwars-armada.fandom.com/api.php"
 
-    try:
-        with requests.get(urlString, params=payload) as r:
-            data = r.json()
 
+def _parseBestMatchImageTitle(pageTitle, data):
+    try:
         for _, val in data["query"]["pages"].items():
             [logging.info(v) for v in val]
             for img in val["images"]:
@@ -86,27 +111,72 @@ def getBestMatchImageTitle(pageTitle):
 
 def getImageUrl(img_title):
 
-    payload = {
+    import requests
+
+    with requests.get(WIKI_API_URL, params=_imageInfoPayload(img_title)) as r:
+        data = r.json()
+    return _parseImageUrl(data)
+
+
+def _imageInfoPayload(img_title):
+    return {
         "action": "query",
         "titles": img_title,
         "format": "json",
         "prop": "imageinfo",
         "iiprop": "url",
     }
-    urlString = "https://starwars-armada.fandom.com/api.php"
 
-    try:
-        with requests.get(urlString, params=payload) as r:
-            data = r.json()
-
-    except:
-        raise
 
+def _parseImageUrl(data):
     for _, val in data["query"]["pages"].items():
         for entry in val["imageinfo"]:
             return entry["url"].split("/revision/")[0]
 
 
+def _listPagesPayload(category=None, cont=None):
+    if category:
+        payload = {
+            "action": "query",
+            "list": "categorymembers",
+            "cmtitle": "Category:" + category,
+            "cmnamespace": 0,
+            "cmlimit": 500,
+            "format": "json",
+        }
+        if cont:
+            payload["cmcontinue"] = cont
+    else:
+        payload = {
+            "action": "query",
+            "list": "allpages",
+            "apnamespace": 0,
+            "aplimit": 500,
+            "format": "json",
+        }
+        if cont:
+            payload["apcontinue"] = cont
+    return payload
+
+
+def _parsePageList(data):
+    """Return (page titles, continuation token or None) from a page listing."""
+
+    listing = data["query"].get("categorymembers", data["query"].get("allpages", []))
+    cont = data.get("continue", {})
+    return (
+        [page["title"] for page in listing],
+        cont.get("cmcontinue", cont.get("apcontinue")),
+    )
+
+
+def cardNameFromTitle(pageTitle):
+    """The cards.txt name for a wiki page title, e.g. 'General Dodonna' ->
+    'GENERAL DODONNA'."""
+
+    return " ".join(re.sub(r"[^0-9A-Za-z]+", " ", pageTitle).upper().split())
+
+
 def addCardToReference(img_src_path, img_dest_path, card_name, reference_table_path):
 
     src = pathlib.Path(img_src_path).resolve()
@@ -125,6 +195,291 @@ def addCardToReference(img_src_path, img_dest_path, card_name, reference_table_p
         t.write(table_entry)
 
 
+class ImageCache:
+    """A content-addressed disk cache for card images fetched from the wiki.
+
+    Images are stored once per content hash under cache_dir, with an index
+    (index.json) from source URL to hash, size, last use and hit count.  When
+    the cache grows past max_bytes, the least recently used images are evicted.
+    An image requested promote_after times is worth keeping for good, so
+    promote() moves it into img/ and cards.txt with addCardToReference().
+
+    Adding or dropping an image saves the index straight away, but a hit only
+    updates it in memory, and is written out with the next save or at most
+    save_interval seconds later; flush() writes any that are pending."""
+
+    def __init__(
+        self,
+        cache_dir,
+        max_bytes=100 * 1024 * 1024,
+        promote_after=3,
+        save_interval=60,
+        clock=time.monotonic,
+    ):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.promote_after = promote_after
+        self.save_interval = save_interval
+        self.clock = clock
+        self.index_path = self.cache_dir / "index.json"
+        self.dirty = False
+        self.saved_at = self.clock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.index_path) as index:
+                self.entries = json.load(index)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def _blob_path(self, entry):
+        return self.cache_dir / (entry["hash"] + entry["ext"])
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as index:
+            json.dump(self.entries, index)
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+        self.saved_at = self.clock()
+
+    def flush(self):
+        """Write out any hits not saved yet."""
+
+        if self.dirty:
+            self._save()
+
+    def _discard(self, url):
+        """Drop url from the index, and its image unless another URL shares it."""
+        entry = self.entries.pop(url)
+        if not any(e["hash"] == entry["hash"] for e in self.entries.values()):
+            try:
+                os.remove(self._blob_path(entry))
+            except FileNotFoundError:
+                pass
+
+    def size(self):
+        blobs = {e["hash"]: e["size"] for e in self.entries.values()}
+        return sum(blobs.values())
+
+    def get(self, url):
+        """Return the cached image path for url and count the hit, or None."""
+
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        if not self._blob_path(entry).exists():
+            self._discard(url)
+            self._save()
+            return None
+        entry["hits"] += 1
+        entry["last_used"] = time.time()
+        self.dirty = True
+        if self.clock() - self.saved_at >= self.save_interval:
+            self._save()
+        return str(self._blob_path(entry))
+
+    def put(self, url, data):
+        """Store the image data fetched from url and return its path."""
+
+        ext = os.path.splitext(url.split("?")[0])[1].lower() or ".png"
+        entry = {
+            "hash": hashlib.sha256(data).hexdigest(),
+            "ext": ext,
+            "size": len(data),
+            "hits": 1,
+            "last_used": time.time(),
+        }
+        path = self._blob_path(entry)
+        if not path.exists():
+            tmp_path = path.with_suffix(".part")
+            with open(tmp_path, "wb") as blob:
+                blob.write(data)
+            os.replace(tmp_path, path)
+        self.entries[url] = entry
+        self.evict()
+        self._save()
+        return str(path)
+
+    def evict(self):
+        """Evict least recently used images until the cache fits in max_bytes."""
+
+        lru = sorted(self.entries, key=lambda url: self.entries[url]["last_used"])
+        while lru and self.size() > self.max_bytes:
+            url = lru.pop(0)
+            logging.info("Evicting wiki image {} from the cache.".format(url))
+            self._discard(url)
+
+    def should_promote(self, url):
+        entry = self.entries.get(url)
+        return bool(entry) and entry["hits"] >= self.promote_after
+
+    def promote(self, url, card_name, img_dest_path, reference_table_path):
+        """Move a cached image into img/ and cards.txt under card_name.
+        Returns the new image's filename."""
+
+        entry = self.entries[url]
+        slug = re.sub(r"[^a-z0-9]+", "-", card_name.lower()).strip("-")
+        staged = self.cache_dir / ("wiki_" + slug + entry["ext"])
+        shutil.copyfile(self._blob_path(entry), staged)
+        addCardToReference(staged, img_dest_path, card_name, reference_table_path)
+        logging.info("Promoted wiki image {} to {}.".format(url, card_name))
+
+        self._discard(url)
+        self._save()
+        return "_" + staged.name
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A small dict cache whose entries expire ttl seconds after being set."""
+
+    def __init__(self, ttl, maxsize=2048):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        if len(self.entries) >= self.maxsize:
+            now = time.monotonic()
+            self.entries = {k: e for k, e in self.entries.items() if e[0] >= now}
+            if len(self.entries) >= self.maxsize:
+                del self.entries[next(iter(self.entries))]
+        self.entries[key] = (
+            time.monotonic() + (self.ttl if ttl is None else ttl),
+            value,
+        )
+
+
+class WikiClient:
+    """Asynchronous version of autoPopulateImage() and friends for the bot.
+
+    All requests share one keep-alive connection pool and a timeout.  Every
+    stage of the lookup (search term -> page -> image title -> image URL) is
+    cached for ttl seconds, and misses are cached too, for negative_ttl, so
+    repeated typos don't go back to the wiki every time.  Network errors are
+    not cached."""
+
+    def __init__(
+        self,
+        api_url=WIKI_API_URL,
+        timeout=10,
+        ttl=6 * 60 * 60,
+        negative_ttl=60 * 60,
+        max_connections=4,
+    ):
+        self.api_url = api_url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self.negative_ttl = negative_ttl
+        self.cache = TTLCache(ttl)
+        self.session = None
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                raise_for_status=True,
+            )
+        return self.session
+
+    async def _query(self, payload):
+        async with self._session().get(self.api_url, params=payload) as r:
+            return await r.json(content_type=None)
+
+    async def _cached(self, stage, key, lookup, *args):
+        result = self.cache.get((stage, key), _MISSING)
+        if result is not _MISSING:
+            return result
+
+        try:
+            result = await lookup(*args)
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError) as err:
+            logging.error("{} - {} - {}".format(type(err), err.args, err))
+            return False
+
+        if result:
+            self.cache.set((stage, key), result)
+        else:
+            result = False
+            self.cache.set((stage, key), result, ttl=self.negative_ttl)
+        return result
+
+    async def _findPage(self, page_name):
+        return _parseTopHit(await self._query(_findPagePayload(page_name)))
+
+    async def _getBestMatchImageTitle(self, pageTitle):
+        logging.info("Searching for a good match in {}...".format(pageTitle))
+        data = await self._query(_imagesPayload(pageTitle))
+        return _parseBestMatchImageTitle(pageTitle, data)
+
+    async def _getImageUrl(self, img_title):
+        return _parseImageUrl(await self._query(_imageInfoPayload(img_title)))
+
+    async def findPage(self, page_name):
+        key = " ".join(page_name.lower().split())
+        return await self._cached("page", key, self._findPage, page_name)
+
+    async def getBestMatchImageTitle(self, pageTitle):
+        return await self._cached(
+            "image_title", pageTitle, self._getBestMatchImageTitle, pageTitle
+        )
+
+    async def getImageUrl(self, img_title):
+        return await self._cached("image_url", img_title, self._getImageUrl, img_title)
+
+    async def autoPopulateImage(self, subject):
+
+        pageTitle = await self.findPage(subject)
+        if pageTitle:
+            img_title = await self.getBestMatchImageTitle(pageTitle)
+            if img_title:
+                img_url = await self.getImageUrl(img_title)
+                if img_url:
+                    return img_url
+
+        return False
+
+    async def listPages(self, category=None):
+        """Yield the title of every article on the wiki, or every page in
+        category, following the API's continuation."""
+
+        cont = None
+        while True:
+            data = await self._query(_listPagesPayload(category, cont))
+            titles, cont = _parsePageList(data)
+            for title in titles:
+                yield title
+            if not cont:
+                return
+
+    async def fetch(self, url):
+        """Download url over the shared pool and return the body as bytes."""
+
+        async with self._session().get(url) as r:
+            return await r.read()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
 if __name__ == "__main__":
 
     autoPopulateImage("hondo ohnaka officer")
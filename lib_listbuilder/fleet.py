@@ -1,8 +1,7 @@
 import logging
-import logging.handlers
+import shrimplog
 
-_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/shrimp.log")
-logging.basicConfig(handlers=[_handler], level=logging.INFO)
+shrimplog.configure("/var/log/shrimpbot/shrimp.log")
 
 import re
 import sqlite3
@@ -229,6 +228,7 @@ class Piece:
         """
         Fetches content from the database for a given piece type and name.
         Returns a tuple of fields or raises RuntimeError if not found.
+        Rows found are kept in config.piece_cache, if there is one.
         """
 
         logging.info(
@@ -236,12 +236,21 @@ class Piece:
         )
 
         piecename = scrub_piecename(piecename)
+        cache = getattr(self.config, "piece_cache", None)
+        key = (piecetype, piecename, select_fields, like)
+        if cache is not None and key in cache:
+            return cache[key]
+
         query = f"select {select_fields} from pieces where piecetype=? and piecename{' like ' if like else '='}?;"
         param = (piecetype, f"%{piecename}%" if like else piecename)
         try:
             with sqlite3.connect(self.conn) as connection:
                 result = connection.execute(query, param).fetchall()
             if len(result) == 1:
+                # rows still hold their placeholders, so each piece gets its
+                # own GUID when it's built from a cached row
+                if cache is not None:
+                    cache[key] = result[0]
                 return result[0]
             logging.debug(f"Did not find {piecetype} {piecename}")
         except Exception as err:
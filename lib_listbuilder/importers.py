@@ -1,5 +1,5 @@
 import logging
-import logging.handlers
+import shrimplog
 import os
 import re
 import sqlite3
@@ -12,8 +12,7 @@ from .fleet import Fleet
 from .utils import scrub_piecename, unzipall
 
 
-_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/shrimp.log")
-logging.basicConfig(handlers=[_handler], level=logging.INFO)
+shrimplog.configure("/var/log/shrimpbot/shrimp.log")
 
 
 def import_from_fabs(import_list, config):
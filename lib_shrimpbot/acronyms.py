@@ -0,0 +1,130 @@
+import copy
+
+special_chars = "~`@#$%^&* ()_-+=|\\{}[]:;\"'<>,.?/!"
+
+
+class AcronymEngine:
+    """The acronym dictionary from acronyms.txt, indexed for the message path.
+
+    Acronyms are normalized (stripped, upper-cased) once at build time, so
+    detecting one in a message is a set lookup per word no matter how big the
+    dictionary gets.  A small prefix trie backs the "did you mean" suggestions
+    for words that aren't in it."""
+
+    def __init__(self, definitions=None):
+
+        self.definitions = {}
+        self.trie = {}
+        for acronym, definition in (definitions or {}).items():
+            self.add(acronym, definition)
+
+    @staticmethod
+    def read_file(acronyms_path):
+        definitions = {}
+        with open(acronyms_path) as acros:
+            for line in acros.readlines():
+                acronym, definition = line.split(";", 1)
+                definitions[acronym.strip()] = definition.strip()
+        return definitions
+
+    @classmethod
+    def from_file(cls, acronyms_path):
+        return cls(cls.read_file(acronyms_path))
+
+    def copy(self):
+        """An independent copy, to apply changes to before swapping it in."""
+
+        clone = AcronymEngine()
+        clone.definitions = dict(self.definitions)
+        clone.trie = copy.deepcopy(self.trie)
+        return clone
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def __contains__(self, acronym):
+        return self.normalize(acronym) in self.definitions
+
+    def __iter__(self):
+        return iter(self.definitions)
+
+    def items(self):
+        return self.definitions.items()
+
+    @staticmethod
+    def normalize(word):
+        return word.strip(special_chars).upper()
+
+    def add(self, acronym, definition):
+        acronym = self.normalize(acronym)
+        self.definitions[acronym] = definition
+
+        node = self.trie
+        for char in acronym:
+            node = node.setdefault(char, {})
+        node[None] = acronym
+
+    def remove(self, acronym):
+        acronym = self.normalize(acronym)
+        del self.definitions[acronym]
+
+        path = [self.trie]
+        for char in acronym:
+            path.append(path[-1][char])
+        del path[-1][None]
+        # prune the branch back up to the last node something else still uses
+        for depth in range(len(acronym), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][acronym[depth - 1]]
+
+    def define(self, word):
+        """The definition of word, or None if it isn't an acronym we know."""
+        return self.definitions.get(self.normalize(word))
+
+    def lookup(self, text):
+        """Every known acronym in text, once each, in order, as a list of
+        (acronym, definition) pairs."""
+
+        found = {}
+        for word in text.split():
+            word = self.normalize(word)
+            if word in self.definitions and word not in found:
+                found[word] = self.definitions[word]
+        return list(found.items())
+
+    def question(self, text):
+        """The acronym asked about if text is just "ACRONYM?", else None."""
+
+        if not text.endswith("?"):
+            return None
+        acronym = text[:-1].upper()
+        if acronym in self.definitions:
+            return acronym
+        return None
+
+    def suggest(self, word, limit=3):
+        """Up to limit known acronyms sharing the longest possible prefix with
+        word, shortest first."""
+
+        word = self.normalize(word)
+        node = self.trie
+        for char in word:
+            if char not in node:
+                break
+            node = node[char]
+        if node is self.trie:
+            return []
+
+        suggestions = []
+        level = [node]
+        while level and len(suggestions) < limit:
+            next_level = []
+            for n in level:
+                for char, child in n.items():
+                    if char is None:
+                        suggestions.append(child)
+                    else:
+                        next_level.append(child)
+            level = next_level
+        return sorted(suggestions[:limit])
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import urllib.parse
+
+import discord
+
+
+class AttachmentCache:
+    """Remembers the CDN URL each image got the first time it was uploaded, so
+    the same card can be sent again as an embed instead of re-uploading it.
+
+    Entries are keyed by the image's content hash and persisted to a JSON file.
+    Discord signs attachment URLs with an expiry (the "ex" query parameter), so
+    a URL without one, or within margin seconds of expiring, is treated as gone
+    and the image is uploaded again, which refreshes the entry.  Discord takes
+    an embed of a dead URL without complaint and just shows a broken image, so
+    a send going through is no sign the URL was good."""
+
+    def __init__(self, cache_path, margin=60 * 60):
+        self.cache_path = cache_path
+        self.margin = margin
+        self.file_hashes = {}
+        try:
+            with open(self.cache_path) as cache:
+                self.entries = json.load(cache)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _save(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as cache:
+            json.dump(self.entries, cache)
+        os.replace(tmp_path, self.cache_path)
+
+    def digest(self, filepath):
+        """Content hash of filepath, only re-read when the file changes."""
+
+        stat = os.stat(filepath)
+        known = self.file_hashes.get(filepath)
+        if known and known[0] == (stat.st_mtime_ns, stat.st_size):
+            return known[1]
+        with open(filepath, "rb") as img:
+            digest = hashlib.sha256(img.read()).hexdigest()
+        self.file_hashes[filepath] = ((stat.st_mtime_ns, stat.st_size), digest)
+        return digest
+
+    @staticmethod
+    def expiry(url):
+        """When a signed attachment URL expires, as a unix time, or None."""
+
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        try:
+            return int(query["ex"][0], 16)
+        except (KeyError, ValueError):
+            return None
+
+    def get(self, filepath):
+        entry = self.entries.get(self.digest(filepath))
+        if entry is None:
+            return None
+        if entry["expires"] is None or entry["expires"] - self.margin < time.time():
+            return None
+        return entry["url"]
+
+    def put(self, filepath, url, save=True):
+        expires = self.expiry(url)
+        if expires is None:
+            # no telling when it dies, so it's no use reusing
+            return
+        self.entries[self.digest(filepath)] = {"url": url, "expires": expires}
+        if save:
+            self._save()
+
+    def forget(self, filepath):
+        if self.entries.pop(self.digest(filepath), None) is not None:
+            self._save()
+
+    async def send(self, channel, filepath):
+        """Send the image at filepath to channel, reusing an earlier upload of
+        the same image when there's a live URL for it."""
+
+        url = self.get(filepath)
+        if url:
+            try:
+                return await channel.send(embed=discord.Embed().set_image(url=url))
+            except discord.HTTPException as err:
+                logging.info("[-] Cached attachment {} failed: {}".format(url, err))
+                self.forget(filepath)
+
+        message = await channel.send(file=discord.File(filepath))
+        if message.attachments:
+            self.put(filepath, message.attachments[0].url)
+        return message
+
+    @staticmethod
+    async def read(filepath):
+        """filepath as a discord.File, read on an executor thread."""
+
+        def read_bytes():
+            with open(filepath, "rb") as img:
+                return img.read()
+
+        data = await asyncio.get_running_loop().run_in_executor(None, read_bytes)
+        return discord.File(io.BytesIO(data), filename=os.path.basename(filepath))
+
+    async def send_many(self, channel, filepaths):
+        """Send all the images at filepaths to channel in one message: images
+        with a live URL as embeds, the rest as attachments, read concurrently.
+        filepaths must fit in one message (ten of each)."""
+
+        urls = {filepath: self.get(filepath) for filepath in filepaths}
+        embeds = [discord.Embed().set_image(url=url) for url in urls.values() if url]
+        uploads = [filepath for filepath, url in urls.items() if not url]
+        files = await asyncio.gather(*(self.read(filepath) for filepath in uploads))
+
+        try:
+            message = await channel.send(embeds=embeds, files=files)
+        except discord.HTTPException as err:
+            if not embeds:
+                raise
+            logging.info("[-] Cached attachments failed: {}".format(err))
+            for filepath in filepaths:
+                self.forget(filepath)
+            return await self.send_many(channel, filepaths)
+
+        for filepath, attachment in zip(uploads, message.attachments):
+            self.put(filepath, attachment.url, save=False)
+        if message.attachments:
+            self._save()
+        return message
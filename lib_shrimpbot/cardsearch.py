@@ -0,0 +1,171 @@
+import collections
+import functools
+import heapq
+import os
+
+from fuzzywuzzy import fuzz, utils
+
+
+def normalize(name):
+    """The same lowercase, alphanumeric-only form fuzzywuzzy scores against."""
+    return utils.full_process(name, force_ascii=True)
+
+
+def trigrams(token):
+    """Padded character trigrams of a token, so short tokens still get some."""
+    padded = "  " + token + " "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def read_card_table(cards_path, img_path):
+    """Read cards.txt into a dict of card name -> image path."""
+
+    cardlookup = {}
+    with open(cards_path) as cardslist:
+        for line in cardslist.readlines():
+            filename, key = line.split(";")
+            cardlookup[key.rstrip()] = os.path.join(img_path, filename)
+    return cardlookup
+
+
+def confident(matches, match_threshold):
+    """Whether the best of matches is good enough to send without asking."""
+
+    if not matches:
+        return False
+    _, set_ratio, sort_ratio = matches[0]
+    return (set_ratio + sort_ratio > match_threshold) or (set_ratio == 100)
+
+
+class CardIndex:
+    """A fuzzy search index over card names, built once from cards.txt.
+
+    Names are normalized and tokenized up front.  A search only scores the
+    cards that share a token, or the most character trigrams, with the search
+    term, rather than every card in the table, so lookups stay quick as the
+    card list grows.  Scores are the same token_set_ratio + token_sort_ratio
+    sum that the full scan used, and ties go to the card added first, as the
+    full scan's stable sort gave them to the card earliest in cards.txt."""
+
+    def __init__(self, names=(), candidate_limit=64, cache_size=512):
+
+        self.candidate_limit = candidate_limit
+        self.cache_size = cache_size
+        self.entries = {}
+        self.exact = {}
+        self.ordinals = {}
+        self.added = 0
+        self.token_index = collections.defaultdict(set)
+        self.trigram_index = collections.defaultdict(set)
+
+        self.search = functools.lru_cache(maxsize=cache_size)(self._search)
+
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def copy(self):
+        """An independent copy, to apply changes to before swapping it in."""
+
+        clone = CardIndex(
+            candidate_limit=self.candidate_limit, cache_size=self.cache_size
+        )
+        clone.entries = dict(self.entries)
+        clone.exact = dict(self.exact)
+        clone.ordinals = dict(self.ordinals)
+        clone.added = self.added
+        for token, names in self.token_index.items():
+            clone.token_index[token] = set(names)
+        for gram, names in self.trigram_index.items():
+            clone.trigram_index[gram] = set(names)
+        return clone
+
+    def add(self, name):
+        processed = normalize(name)
+        tokens = processed.split()
+        self.entries[name] = (processed, " ".join(sorted(tokens)), tokens)
+        self.exact.setdefault(processed, name)
+        if name not in self.ordinals:
+            self.ordinals[name] = self.added
+            self.added += 1
+        for token in tokens:
+            self.token_index[token].add(name)
+            for gram in trigrams(token):
+                self.trigram_index[gram].add(name)
+        self.search.cache_clear()
+
+    def remove(self, name):
+        processed, _, tokens = self.entries.pop(name)
+        del self.ordinals[name]
+        if self.exact.get(processed) == name:
+            del self.exact[processed]
+            for other, entry in self.entries.items():
+                if entry[0] == processed:
+                    self.exact[processed] = other
+                    break
+        for token in tokens:
+            self.token_index[token].discard(name)
+            if not self.token_index[token]:
+                del self.token_index[token]
+            for gram in trigrams(token):
+                names = self.trigram_index.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.trigram_index[gram]
+        self.search.cache_clear()
+
+    def candidates(self, tokens):
+        """Cards sharing a whole token with the search, plus the cards sharing
+        the most trigrams with it (to catch typos)."""
+
+        found = set()
+        shared = collections.Counter()
+        for token in tokens:
+            found.update(self.token_index.get(token, ()))
+            for gram in trigrams(token):
+                shared.update(self.trigram_index.get(gram, ()))
+
+        found.update(
+            heapq.nsmallest(
+                self.candidate_limit,
+                shared,
+                key=lambda name: (-shared[name], self.ordinals[name]),
+            )
+        )
+        return found
+
+    def _search(self, search_term, limit=3):
+        """Return up to limit (name, token_set_ratio, token_sort_ratio) tuples,
+        best first."""
+
+        processed = normalize(search_term)
+        if not processed:
+            return ()
+
+        if processed in self.exact:
+            return ((self.exact[processed], 100, 100),)
+
+        tokens = processed.split()
+        sorted_term = " ".join(sorted(tokens))
+        scored = []
+        for name in self.candidates(tokens):
+            name_processed, name_sorted, _ = self.entries[name]
+            scored.append(
+                (
+                    name,
+                    fuzz.token_set_ratio(processed, name_processed, full_process=False),
+                    fuzz.ratio(sorted_term, name_sorted),
+                )
+            )
+
+        return tuple(
+            heapq.nlargest(
+                limit, scored, key=lambda s: (s[1] + s[2], -self.ordinals[s[0]])
+            )
+        )
@@ -0,0 +1,300 @@
+import collections
+import functools
+import logging
+import math
+import secrets
+
+Face = collections.namedtuple("Face", "emoji damage crits accuracies")
+
+# the eight faces of each attack die
+RED = [
+    Face("<:redblank:522785582284275755>", 0, 0, 0),
+    Face("<:redblank:522785582284275755>", 0, 0, 0),
+    Face("<:redacc:522785555847577610>", 0, 0, 1),
+    Face("<:redhit:522785530958577701>", 1, 0, 0),
+    Face("<:redhit:522785530958577701>", 1, 0, 0),
+    Face("<:redcrit:522785616707059713>", 1, 1, 0),
+    Face("<:redcrit:522785616707059713>", 1, 1, 0),
+    Face("<:reddbl:522784255722651670>", 2, 0, 0),
+]
+BLUE = [
+    Face("<:bluehit:522785736500576266>", 1, 0, 0),
+    Face("<:bluehit:522785736500576266>", 1, 0, 0),
+    Face("<:bluehit:522785736500576266>", 1, 0, 0),
+    Face("<:bluehit:522785736500576266>", 1, 0, 0),
+    Face("<:bluecrit:522785721153748996>", 1, 1, 0),
+    Face("<:bluecrit:522785721153748996>", 1, 1, 0),
+    Face("<:blueacc:522785704917467137>", 0, 0, 1),
+    Face("<:blueacc:522785704917467137>", 0, 0, 1),
+]
+BLACK = [
+    Face("<:blackhit:522785658062766090>", 1, 0, 0),
+    Face("<:blackhit:522785658062766090>", 1, 0, 0),
+    Face("<:blackhit:522785658062766090>", 1, 0, 0),
+    Face("<:blackhit:522785658062766090>", 1, 0, 0),
+    Face("<:blackblank:522785641310847024>", 0, 0, 0),
+    Face("<:blackblank:522785641310847024>", 0, 0, 0),
+    Face("<:blackhitcrit:522785681156866063>", 2, 1, 0),
+    Face("<:blackhitcrit:522785681156866063>", 2, 1, 0),
+]
+DICE = {"red": RED, "blue": BLUE, "black": BLACK}
+
+# more than this many dice and the bot won't play along
+MAX_POOL = 50
+
+# numpy is imported where the odds are worked out, so the bot doesn't load it
+# until someone asks
+
+
+def parse_pool(text):
+    """Count the dice asked for in text, e.g. "3red 2blues 1black", as a
+    (red, blue, black) tuple.  Counts below one are ignored."""
+
+    red = blue = black = 0
+    for word in text.split(" "):
+        word = word.upper().rstrip("S")
+        try:
+            if word[-3::] == "RED":
+                red += max(0, int(word[:-3]))
+            if word[-4::] == "BLUE":
+                blue += max(0, int(word[:-4]))
+            if word[-5::] == "BLACK":
+                black += max(0, int(word[:-5]))
+        except ValueError:
+            pass
+    return (red, blue, black)
+
+
+def too_many(pool):
+    """Whether any one color of pool, or the whole pool, is MAX_POOL dice or
+    more."""
+
+    return any(count >= MAX_POOL for count in pool) or sum(pool) >= MAX_POOL
+
+
+@functools.lru_cache(maxsize=None)
+def face_distribution(color):
+    """One die's outcomes as a probability array indexed by
+    [damage, crits, accuracies]."""
+
+    import numpy
+
+    faces = DICE[color]
+    shape = tuple(
+        max(getattr(f, field) for f in faces) + 1 for field in Face._fields[1:]
+    )
+    dist = numpy.zeros(shape)
+    for face in faces:
+        dist[face.damage, face.crits, face.accuracies] += 1.0 / len(faces)
+    dist.flags.writeable = False
+    return dist
+
+
+def convolve(dist, kernel):
+    """The distribution of the sum of two independent outcomes, for
+    [damage, crits, accuracies] arrays.  kernel is a single die, so this is a
+    handful of shifted, scaled copies of dist."""
+
+    import numpy
+
+    out = numpy.zeros(tuple(a + b - 1 for a, b in zip(dist.shape, kernel.shape)))
+    for offset, p in numpy.ndenumerate(kernel):
+        if p:
+            window = tuple(slice(o, o + n) for o, n in zip(offset, dist.shape))
+            out[window] += p * dist
+    return out
+
+
+def pool_distribution(red, blue, black):
+    """The exact distribution of a pool's [damage, crits, accuracies].
+
+    Built up one die at a time.  Nothing here is memoized: the arrays for big
+    pools run to a megabyte or so each, so only odds() keeps its results."""
+
+    import numpy
+
+    if min(red, blue, black) < 0:
+        raise ValueError("Negative dice pool {}".format((red, blue, black)))
+    dist = numpy.ones((1, 1, 1))
+    for color, count in zip(DICE, (red, blue, black)):
+        kernel = face_distribution(color)
+        for _ in range(count):
+            dist = convolve(dist, kernel)
+    return dist
+
+
+def at_least(marginal):
+    """P(x >= k) for every k, from P(x == k)."""
+    return marginal[::-1].cumsum()[::-1]
+
+
+@functools.lru_cache(maxsize=32)
+def odds(red, blue, black, floor=0.01):
+    """A few lines summing up the pool: average damage, then the chance of
+    at least k damage, crits and accuracies, for every k likelier than floor.
+    The lines for the last few pools asked about are kept, as a tuple."""
+
+    dist = pool_distribution(red, blue, black)
+    damage = dist.sum(axis=(1, 2))
+    crits = dist.sum(axis=(0, 2))
+    accuracies = dist.sum(axis=(0, 1))
+
+    pool = ", ".join(
+        "{} {}".format(count, color)
+        for count, color in zip((red, blue, black), ("red", "blue", "black"))
+        if count
+    )
+    lines = [
+        "{}: {:.2f} damage on average".format(pool, (damage * range(len(damage))).sum())
+    ]
+    for name, marginal in (
+        ("damage", damage),
+        ("crits", crits),
+        ("accuracies", accuracies),
+    ):
+        chances = [
+            "{}+ {:.0f}%".format(k, p * 100)
+            for k, p in enumerate(at_least(marginal))
+            if k and p >= floor
+        ]
+        lines.append("{}: {}".format(name, "  ".join(chances) or "none"))
+    return tuple(lines)
+
+
+def chi2_sf(statistic, dof):
+    """P(X >= statistic) for a chi-square distribution with dof degrees of
+    freedom: the regularized upper incomplete gamma function Q(dof/2, x/2)."""
+
+    a, x = dof / 2.0, statistic / 2.0
+    if x <= 0:
+        return 1.0
+    if x < a + 1:
+        # series for the lower function P(a, x)
+        term = total = 1.0 / a
+        n = a
+        while term > total * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return 1.0 - total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+    # continued fraction for Q(a, x) (Lentz's method)
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return h * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+class DiceRoller:
+    """Rolls whole pools at once from one seeded generator, and counts how
+    often each face comes up over the last history rolls.
+
+    The seed is logged at the first roll, so a run of rolls can be replayed.
+    Faces forced by &cheat aren't rolled, so they aren't counted either."""
+
+    def __init__(self, seed=None, history=1000):
+        self.seed = seed
+        self.rng = None
+        self.recent = collections.deque(maxlen=history)
+        self.window = None
+        self.emojis = None
+
+    def generator(self):
+        if self.rng is None:
+            import numpy
+
+            if self.seed is None:
+                self.seed = secrets.randbits(64)
+            logging.info("Dice seed: {}".format(self.seed))
+            self.rng = numpy.random.default_rng(self.seed)
+            self.window = numpy.zeros((len(DICE), 8), dtype=numpy.int64)
+            self.emojis = {
+                color: numpy.array([face.emoji for face in faces], dtype=object)
+                for color, faces in DICE.items()
+            }
+        return self.rng
+
+    def roll(self, red, blue, black, forced=None):
+        """Face indices for each color's dice, as {color: array}.  forced maps
+        a color to the face every die of that color shows instead."""
+
+        import numpy
+
+        if min(red, blue, black) < 0:
+            raise ValueError("Negative dice pool {}".format((red, blue, black)))
+        forced = forced or {}
+        counts = dict(zip(DICE, (red, blue, black)))
+        rolled = {
+            color: count for color, count in counts.items() if color not in forced
+        }
+        faces = self.generator().integers(0, 8, size=sum(rolled.values()))
+
+        result = {}
+        tally = numpy.zeros_like(self.window)
+        start = 0
+        for row, (color, count) in enumerate(counts.items()):
+            if color in forced:
+                result[color] = numpy.full(count, forced[color])
+                continue
+            result[color] = faces[start : start + count]
+            tally[row] = numpy.bincount(result[color], minlength=8)
+            start += count
+
+        if len(self.recent) == self.recent.maxlen:
+            self.window -= self.recent[0]
+        self.recent.append(tally)
+        self.window += tally
+        return result
+
+    def render(self, rolled):
+        """The emoji for a roll, all in one string."""
+
+        return " ".join(
+            emoji
+            for color, faces in rolled.items()
+            for emoji in self.emojis[color][faces]
+        )
+
+    def fairness(self, last=None):
+        """Chi-square test of each color's faces over the last rolls (all the
+        kept history by default), as a list of lines."""
+
+        import numpy
+
+        if last is not None and last < 1:
+            raise ValueError("Can't check the last {} rolls".format(last))
+        self.generator()
+        if last is None or last >= len(self.recent):
+            window = self.window
+            last = len(self.recent)
+        else:
+            window = numpy.sum(list(self.recent)[-last:], axis=0)
+
+        lines = ["over the last {} rolls:".format(last)]
+        for color, observed in zip(DICE, window):
+            total = int(observed.sum())
+            if total < 5 * len(observed):
+                lines.append("{}: {} dice, too few to tell".format(color, total))
+                continue
+            expected = total / len(observed)
+            statistic = float(((observed - expected) ** 2 / expected).sum())
+            p = chi2_sf(statistic, len(observed) - 1)
+            lines.append(
+                "{}: {} dice, chi-square {:.2f}, p = {:.3f}{}".format(
+                    color, total, statistic, p, " (suspicious)" if p < 0.01 else ""
+                )
+            )
+        return lines
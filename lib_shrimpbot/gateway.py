@@ -0,0 +1,72 @@
+import discord
+
+# what each profile subscribes to.  "minimal" is what the handlers actually
+# use: guilds (for the guild list and our own nickname), messages in guilds
+# and DMs, and their content.
+INTENT_PROFILES = {
+    "minimal": ("guilds", "guild_messages", "dm_messages", "message_content"),
+    "all": None,
+}
+
+MEMBER_CACHE_POLICIES = ("none", "intents", "voice", "joined", "all")
+
+
+def intents(profile):
+    """discord.Intents for profile: a profile name, optionally followed by
+    extra intents to turn on, comma-separated, e.g. "minimal,members"."""
+
+    name, *extra = [word.strip() for word in profile.split(",") if word.strip()]
+    if name not in INTENT_PROFILES:
+        raise ValueError(
+            "Unknown intents profile {!r}; expected one of {}".format(
+                name, ", ".join(INTENT_PROFILES)
+            )
+        )
+    if INTENT_PROFILES[name] is None:
+        chosen = discord.Intents.all()
+    else:
+        chosen = discord.Intents.none()
+        extra = list(INTENT_PROFILES[name]) + extra
+    for flag in extra:
+        if flag not in discord.Intents.VALID_FLAGS:
+            raise ValueError("Unknown intent {!r}".format(flag))
+        setattr(chosen, flag, True)
+    return chosen
+
+
+def member_cache_flags(policy, chosen_intents):
+    """discord.MemberCacheFlags for policy, one of MEMBER_CACHE_POLICIES.
+    "intents" caches whatever the intents allow, which is discord.py's
+    default; "voice", "joined" and "all" need the matching intents."""
+
+    if policy not in MEMBER_CACHE_POLICIES:
+        raise ValueError(
+            "Unknown member cache policy {!r}; expected one of {}".format(
+                policy, ", ".join(MEMBER_CACHE_POLICIES)
+            )
+        )
+    if policy == "intents":
+        return discord.MemberCacheFlags.from_intents(chosen_intents)
+    if policy in ("none", "all"):
+        return getattr(discord.MemberCacheFlags, policy)()
+    flags = discord.MemberCacheFlags.none()
+    setattr(flags, policy, True)
+    return flags
+
+
+def max_messages(size):
+    """The bot's max_messages for a message cache of size; discord.py takes
+    0 to mean its default of 1000, so no cache is None."""
+
+    return size if size > 0 else None
+
+
+def footprint(bot):
+    """What discord.py is holding in memory for bot, as one line."""
+
+    return "{} guilds, {} members, {} users, {} messages cached".format(
+        len(bot.guilds),
+        sum(len(guild.members) for guild in bot.guilds),
+        len(bot.users),
+        len(bot.cached_messages),
+    )
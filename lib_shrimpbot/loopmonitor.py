@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from shrimpperf import percentile
+
+
+class LoopMonitor:
+    """Watches the event loop for anything that holds it up.
+
+    A task on the loop wakes every interval seconds and records how late it
+    woke up: that's the loop's lag.  A watchdog thread checks on the task, and
+    if it hasn't woken for threshold seconds, something is blocking the loop
+    right now, so the watchdog grabs the loop thread's stack and the task it's
+    running.  Once the loop gets going again, the stall is recorded with how
+    long it lasted.  Each sample is tagged with the beat it was taken for, as
+    the watchdog can finish one just after the loop has moved on, and a
+    sample from another beat is never put down to this one.
+
+    The last history lag samples and slow callbacks are kept for summary(),
+    which is also logged every report_interval seconds."""
+
+    def __init__(self, interval=0.5, threshold=0.25, history=200, report_interval=900):
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.lags = collections.deque(maxlen=history)
+        self.slow = collections.deque(maxlen=history)
+        self.slow_total = 0
+        self.max_lag = 0.0
+        self.beat = None
+        self.stalled = None
+        self.loop = None
+        self.loop_thread = None
+        self.tasks = []
+        self.watchdog = None
+
+    def reset(self):
+        self.lags.clear()
+        self.slow.clear()
+        self.slow_total = 0
+        self.max_lag = 0.0
+
+    @staticmethod
+    def describe(task, frame=None):
+        """A name for what task is running: its own name, unless it's just
+        asyncio's "Task-N", and the innermost coroutine on the stack in frame.
+        discord.py runs every event as a task named "discord.py: <event>"
+        around Client._run_event, so the task's coroutine alone says
+        nothing."""
+
+        innermost = None
+        while frame is not None:
+            if frame.f_code.co_flags & inspect.CO_COROUTINE:
+                code = frame.f_code
+                innermost = getattr(code, "co_qualname", code.co_name)
+                break
+            frame = frame.f_back
+        if innermost is None:
+            innermost = getattr(task.get_coro(), "__qualname__", None)
+
+        name = task.get_name()
+        if name.startswith("Task-"):
+            return innermost or name
+        if innermost:
+            return "{} ({})".format(name, innermost)
+        return name
+
+    def sample(self):
+        """The task the loop thread is running and its stack, as a dict.
+        Called from the watchdog thread while the loop is stuck."""
+
+        frame = sys._current_frames().get(self.loop_thread)
+        task = asyncio.current_task(self.loop)
+        handler = None
+        if task is not None:
+            handler = self.describe(task, frame)
+        return {
+            "when": time.time(),
+            "handler": handler or "(no task)",
+            "stack": traceback.format_stack(frame) if frame else [],
+        }
+
+    def record(self, lag, beat=None):
+        self.lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        stalled, self.stalled = self.stalled, None
+        if stalled is not None and stalled.get("beat") != beat:
+            stalled = None
+        if lag < self.threshold:
+            return
+        if stalled is None:
+            # too quick for the watchdog to catch in the act
+            stalled = {"when": time.time() - lag, "handler": "(unknown)", "stack": []}
+        stalled["duration"] = lag
+        self.slow.append(stalled)
+        self.slow_total += 1
+        logging.warning(
+            "[!] Event loop blocked for {:.0f} ms in {}".format(
+                lag * 1000, stalled["handler"]
+            )
+        )
+
+    async def _tick(self):
+        while True:
+            beat = self.beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.monotonic() - beat - self.interval), beat)
+
+    def _watchdog(self):
+        while True:
+            time.sleep(self.threshold / 2)
+            beat = self.beat
+            stalled = self.stalled
+            if beat is None or (stalled is not None and stalled["beat"] == beat):
+                continue
+            if time.monotonic() - beat > self.interval + self.threshold:
+                self.stalled = dict(self.sample(), beat=beat)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logging.info("Event loop: " + " / ".join(self.summary()))
+
+    def start(self):
+        if self.tasks and not all(task.done() for task in self.tasks):
+            return
+        self.loop = asyncio.get_event_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks = [
+            asyncio.ensure_future(self._tick()),
+            asyncio.ensure_future(self._report()),
+        ]
+        if self.watchdog is None:
+            self.watchdog = threading.Thread(
+                target=self._watchdog, name="shrimpbot-loopmonitor", daemon=True
+            )
+            self.watchdog.start()
+
+    def summary(self, stacks=False):
+        """A list of lines describing lag and slow callbacks since the last
+        reset, with each slow callback's stack if stacks is set."""
+
+        lags = list(self.lags)
+        lines = [
+            "lag over {} samples: p50 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms".format(
+                len(lags),
+                percentile(lags, 0.50) * 1000,
+                percentile(lags, 0.99) * 1000,
+                self.max_lag * 1000,
+            ),
+            "{} callbacks over {:.0f} ms".format(
+                self.slow_total, self.threshold * 1000
+            ),
+        ]
+        for stalled in self.slow:
+            lines.append(
+                "{} {:.0f} ms in {}".format(
+                    time.strftime("%H:%M:%S", time.localtime(stalled["when"])),
+                    stalled["duration"] * 1000,
+                    stalled["handler"],
+                )
+            )
+            if stacks and stalled["stack"]:
+                lines.append("".join(stalled["stack"][-8:]).rstrip())
+        return lines
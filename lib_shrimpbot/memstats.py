@@ -0,0 +1,164 @@
+import collections
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+CONTAINERS = (dict, list, tuple, set, frozenset, collections.deque)
+
+# code, classes and modules are shared with everything else, so they aren't
+# counted as part of anything
+SKIP = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+)
+
+
+def format_bytes(size):
+    if abs(size) < 1024:
+        return "{} B".format(int(size))
+    for unit in ("KiB", "MiB", "GiB"):
+        size /= 1024.0
+        if abs(size) < 1024 or unit == "GiB":
+            return "{:.1f} {}".format(size, unit)
+
+
+def rss_bytes():
+    """The process's resident set size right now, or its peak if the current
+    figure isn't available."""
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_size(obj, limit=1000000):
+    """Roughly how many bytes obj holds: its own size plus everything reachable
+    through containers and instance attributes, each object counted once.
+    Stops after limit objects, so it can't run away on a huge graph."""
+
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending and len(seen) < limit:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, SKIP):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, CONTAINERS):
+            pending.extend(item)
+        elif hasattr(item, "__dict__") and not callable(item):
+            pending.append(vars(item))
+    return total
+
+
+def cache_sizes(caches):
+    """A line for each of caches (name -> object) with its length, where it
+    has one, and roughly how much memory it holds."""
+
+    lines = []
+    for name, cache in caches.items():
+        try:
+            entries = "{} entries, ".format(len(cache))
+        except TypeError:
+            entries = ""
+        lines.append("{}: {}~{}".format(name, entries, format_bytes(deep_size(cache))))
+    return lines
+
+
+class MemoryTracer:
+    """tracemalloc, switched on and off from chat.
+
+    Tracing slows every allocation down, so it's off until started.  When it's
+    started, a snapshot is taken to compare against, so summary() can show
+    what has grown since as well as what's biggest."""
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.baseline = None
+        self.started = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Start tracing.  Returns False if it was already on."""
+
+        if self.tracing:
+            return False
+        tracemalloc.start(self.frames)
+        self.started = time.time()
+        self.baseline = self.snapshot()
+        return True
+
+    def stop(self):
+        """Stop tracing and drop the traces.  Returns False if it was off."""
+
+        if not self.tracing:
+            return False
+        tracemalloc.stop()
+        self.baseline = self.started = None
+        return True
+
+    def snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def summary(self, top=10):
+        """Traced memory, the top allocation sites by size, and the ones that
+        have grown the most since tracing started, as a list of lines."""
+
+        if not self.tracing:
+            return ["tracemalloc is off"]
+        if self.baseline is None:
+            # started some other way, e.g. PYTHONTRACEMALLOC
+            self.started = time.time()
+            self.baseline = self.snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            "traced since {}: {} now, {} peak".format(
+                time.ctime(self.started), format_bytes(current), format_bytes(peak)
+            ),
+            "top allocation sites:",
+        ]
+        snapshot = self.snapshot()
+        for stat in snapshot.statistics("lineno")[:top]:
+            lines.append(
+                "{}: {} in {} blocks".format(
+                    stat.traceback[0], format_bytes(stat.size), stat.count
+                )
+            )
+        lines.append("grown the most since tracing started:")
+        grown = [
+            stat
+            for stat in snapshot.compare_to(self.baseline, "lineno")
+            if stat.size_diff > 0
+        ]
+        for stat in grown[:top]:
+            lines.append(
+                "{}: +{} ({:+} blocks)".format(
+                    stat.traceback[0], format_bytes(stat.size_diff), stat.count_diff
+                )
+            )
+        return lines
@@ -0,0 +1,120 @@
+import asyncio
+import collections
+import logging
+
+DISCORD_MESSAGE_LIMIT = 2000
+
+
+def pack(texts, limit=DISCORD_MESSAGE_LIMIT):
+    """Join texts with newlines into as few chunks of at most limit characters
+    as possible, splitting any single text that's too long on its own."""
+
+    chunks = []
+    current = ""
+    for text in texts:
+        text = str(text)
+        while len(text) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(text[:limit])
+            text = text[limit:]
+        if not current:
+            current = text
+        elif len(current) + 1 + len(text) <= limit:
+            current += "\n" + text
+        else:
+            chunks.append(current)
+            current = text
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class Outbox:
+    """Collects consecutive messages for one destination and sends them as
+    few messages as fit under Discord's length limit.
+
+        async with Outbox(ctx) as out:
+            out.add("one")
+            out.add("two")  # both go out in one message on exit
+    """
+
+    def __init__(self, destination, limit=DISCORD_MESSAGE_LIMIT):
+        self.destination = destination
+        self.limit = limit
+        self.texts = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        self.texts.append(text)
+
+    async def flush(self):
+        texts, self.texts = self.texts, []
+        for chunk in pack(texts, self.limit):
+            await self.destination.send(chunk)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()
+
+
+class ErrorDigest:
+    """Batches error reports for the bot owner into one DM every interval
+    seconds, collapsing repeats of the same error into a count.
+
+    get_owner is called at flush time, so it can be handed bot.get_user before
+    the bot has logged in."""
+
+    def __init__(self, get_owner, interval=60):
+        self.get_owner = get_owner
+        self.interval = interval
+        self.reports = collections.OrderedDict()
+        self.task = None
+
+    def __len__(self):
+        return len(self.reports)
+
+    def report(self, summary, *details, poc=None):
+        """Queue an error for the owner.  Reports with the same summary are
+        merged; only the first one's details are kept."""
+
+        if summary not in self.reports:
+            self.reports[summary] = {"count": 0, "pocs": [], "details": details}
+        entry = self.reports[summary]
+        entry["count"] += 1
+        if poc and poc not in entry["pocs"]:
+            entry["pocs"].append(poc)
+
+    async def flush(self):
+        if not self.reports:
+            return
+        reports, self.reports = self.reports, collections.OrderedDict()
+
+        out = Outbox(self.get_owner())
+        for summary, entry in reports.items():
+            if entry["count"] > 1:
+                out.add("{} (x{})".format(summary, entry["count"]))
+            else:
+                out.add(summary)
+            if entry["pocs"]:
+                out.add("POC: {}".format(", ".join(entry["pocs"])))
+            for detail in entry["details"]:
+                out.add(detail)
+        await out.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as err:
+                logging.exception(err)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
@@ -0,0 +1,124 @@
+import contextlib
+import time
+
+
+class TokenBucket:
+    """capacity tokens, refilled at rate tokens per second."""
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_full(self, now):
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """Token buckets per command class, for every user and every channel.
+
+    limits maps a command class to {scope: (per_minute, burst)}, where scope is
+    "user" or "channel".  A request has to have a token in every one of its
+    buckets to go ahead, and only takes them if it does, so being turned away
+    doesn't use anything up.
+
+        limiter = RateLimiter({"card": {"user": (10, 5), "channel": (30, 10)}})
+        limiter.limited({"card", "shrimp"}, user_id, channel_id)  # frozenset()
+    """
+
+    def __init__(self, limits, prune_interval=300, clock=time.monotonic):
+        self.limits = limits
+        self.prune_interval = prune_interval
+        self.clock = clock
+        self.buckets = {}
+        self.pruned = clock()
+        self.denied = 0
+
+    def bucket(self, command, scope, key, now):
+        per_minute, burst = self.limits[command][scope]
+        bucket = self.buckets.get((command, scope, key))
+        if bucket is None:
+            bucket = self.buckets[(command, scope, key)] = TokenBucket(
+                per_minute / 60.0, burst, now
+            )
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def allow(self, command, user, channel):
+        """Take a token from each of command's buckets for user and channel
+        if they all have one.  Commands without limits are always allowed."""
+
+        if command not in self.limits:
+            return True
+        now = self.clock()
+        keys = {"user": user, "channel": channel}
+        buckets = [
+            self.bucket(command, scope, keys[scope], now)
+            for scope in self.limits[command]
+        ]
+        if any(bucket.tokens < 1 for bucket in buckets):
+            self.denied += 1
+            return False
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return True
+
+    def limited(self, commands, user, channel):
+        """The commands (of those given) that user may not run in channel
+        right now."""
+
+        self.prune()
+        return frozenset(
+            command for command in commands if not self.allow(command, user, channel)
+        )
+
+    def prune(self):
+        """Every prune_interval seconds, forget buckets that have refilled, so
+        one-off users and channels don't pile up."""
+
+        now = self.clock()
+        if now - self.pruned < self.prune_interval:
+            return
+        self.pruned = now
+        for key in [key for key, b in self.buckets.items() if b.is_full(now)]:
+            del self.buckets[key]
+
+
+class InFlight:
+    """Requests that are still being handled, so identical ones that come in
+    meanwhile can be dropped instead of doing the same work again.
+
+        with in_flight.claim({"card": ("card", channel_id, text)}) as duplicates:
+            # "card" is in duplicates if the same lookup is already running
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.collapsed = 0
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    @contextlib.contextmanager
+    def claim(self, keys):
+        """Hold keys (a dict of name -> request key) until the block exits,
+        yielding the names whose key is already held by another request."""
+
+        duplicates = frozenset(name for name, key in keys.items() if key in self.keys)
+        claimed = {key for name, key in keys.items() if name not in duplicates}
+        self.keys |= claimed
+        self.collapsed += len(duplicates)
+        try:
+            yield duplicates
+        finally:
+            self.keys -= claimed
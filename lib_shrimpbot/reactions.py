@@ -0,0 +1,60 @@
+import asyncio
+import collections
+import logging
+
+
+class ReactionScheduler:
+    """Adds reactions after a delay without ever sleeping on the event loop.
+
+    Delays are asyncio timers, and all the reactions for one message are sent
+    concurrently.  Reactions share a per-channel rate limit bucket on Discord's
+    side, so in-flight requests are capped per channel here and discord.py's
+    HTTP client paces (and retries 429s on) whatever gets through."""
+
+    def __init__(self, delay=1.0, per_channel=4):
+
+        self.delay = delay
+        self.per_channel = per_channel
+        self.channel_slots = {}
+        self.channel_users = collections.Counter()
+        self.tasks = set()
+
+    def schedule(self, message, *emojis, delay=None):
+        """Queue emojis to be added to message once delay seconds have passed."""
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(
+            self.delay if delay is None else delay, self._fire, message, emojis
+        )
+
+    def _fire(self, message, emojis):
+        task = asyncio.ensure_future(self._react(message, emojis))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _react(self, message, emojis):
+
+        channel_id = message.channel.id
+        if channel_id not in self.channel_slots:
+            self.channel_slots[channel_id] = asyncio.Semaphore(self.per_channel)
+        slots = self.channel_slots[channel_id]
+        self.channel_users[channel_id] += 1
+
+        async def add_one(emoji):
+            async with slots:
+                try:
+                    await message.add_reaction(emoji)
+                except Exception as err:
+                    logging.info(
+                        "[-] Failed to react {} to message {}: {}".format(
+                            emoji, message.id, err
+                        )
+                    )
+
+        try:
+            await asyncio.gather(*(add_one(emoji) for emoji in emojis))
+        finally:
+            self.channel_users[channel_id] -= 1
+            if self.channel_users[channel_id] <= 0:
+                del self.channel_users[channel_id]
+                del self.channel_slots[channel_id]
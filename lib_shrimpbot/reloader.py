@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import os
+
+
+class FileWatcher:
+    """Polls files for changes (by mtime and size) and calls back on each one.
+
+    Callbacks run on the event loop, between handlers, so a callback that
+    builds its new tables first and then rebinds them in one go is atomic as
+    far as the handlers are concerned.  If a callback raises, the error is
+    logged and the old tables stay in place until the file changes again."""
+
+    def __init__(self, interval=10.0):
+        self.interval = interval
+        self.watched = {}
+        self.task = None
+
+    @staticmethod
+    def signature(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def watch(self, path, callback):
+        self.watched[path] = [self.signature(path), callback]
+
+    def poll(self):
+        """Check every watched file once; return the paths that were reloaded."""
+
+        reloaded = []
+        for path, watched in self.watched.items():
+            signature = self.signature(path)
+            if signature is None or signature == watched[0]:
+                continue
+            watched[0] = signature
+            try:
+                watched[1](path)
+                reloaded.append(path)
+            except Exception as err:
+                logging.error("[-] Failed to reload {}: {}".format(path, err))
+        return reloaded
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.poll()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
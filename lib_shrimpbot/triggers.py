@@ -0,0 +1,48 @@
+import re
+
+
+class TriggerTable:
+    """A compiled table of case-insensitive trigger keywords.
+
+    Built once from a dict of {handler name: [keywords]}.  Every keyword is
+    folded into a single regex, so a message is scanned exactly once no matter
+    how many handlers are registered, instead of upper-casing the whole message
+    once per keyword."""
+
+    def __init__(self, handler_keywords):
+
+        self.handler_keywords = {
+            handler: [kw.upper() for kw in keywords]
+            for handler, keywords in handler_keywords.items()
+        }
+
+        # Every keyword implies the handlers of any keyword it contains, e.g.
+        # finding "HAIL SHRIMPBOT" also means "SHRIMP" is in the message.
+        all_keywords = {
+            kw: handler
+            for handler, keywords in self.handler_keywords.items()
+            for kw in keywords
+        }
+        self.implied = {}
+        for kw in all_keywords:
+            self.implied[kw] = frozenset(
+                handler
+                for handler, keywords in self.handler_keywords.items()
+                if any(other in kw for other in keywords)
+            )
+
+        # Longest first, so the alternation picks the longest keyword starting
+        # at each position; the zero-width lookahead lets matches overlap.
+        alternatives = sorted(all_keywords, key=len, reverse=True)
+        self.pattern = re.compile(
+            "(?=({}))".format("|".join(re.escape(kw) for kw in alternatives)),
+            re.IGNORECASE,
+        )
+
+    def match(self, text):
+        """Return the frozenset of handler names triggered by text."""
+
+        found = {m.group(1).upper() for m in self.pattern.finditer(text)}
+        if not found:
+            return frozenset()
+        return frozenset().union(*(self.implied[kw] for kw in found))
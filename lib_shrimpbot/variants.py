@@ -0,0 +1,178 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+
+MANIFEST = "manifest.json"
+
+# Pillow is only needed to build the variants, so it's imported in the worker
+# processes that do it and the bot never loads it
+
+
+def file_digest(filepath):
+    with open(filepath, "rb") as img:
+        return hashlib.sha256(img.read()).hexdigest()
+
+
+def variant_filename(source_name, digest, fmt):
+    """Variants are named for their source and its content hash, so a changed
+    image gets a new variant and an unchanged one never needs another."""
+
+    return "{}-{}.{}".format(os.path.splitext(source_name)[0], digest[:12], fmt)
+
+
+def read_manifest(variant_dir):
+    try:
+        with open(os.path.join(variant_dir, MANIFEST)) as manifest:
+            return json.load(manifest)
+    except (FileNotFoundError, ValueError):
+        return {"settings": None, "sources": {}}
+
+
+def write_manifest(variant_dir, manifest):
+    path = os.path.join(variant_dir, MANIFEST)
+    with open(path + ".tmp", "w") as out:
+        json.dump(manifest, out, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def transcode(source, dest, max_size, fmt, quality):
+    """Shrink source to fit in max_size x max_size and write it to dest as fmt
+    ("webp" or "png").  Returns False, writing nothing, if that wouldn't make
+    it any smaller."""
+
+    from PIL import Image
+
+    part = dest + ".part"
+    with Image.open(source) as img:
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        if fmt == "png":
+            img.save(part, "PNG", optimize=True)
+        else:
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            img.save(part, "WEBP", quality=quality, method=6)
+    if os.path.getsize(part) >= os.path.getsize(source):
+        os.remove(part)
+        return False
+    os.replace(part, dest)
+    return True
+
+
+def build(sources, variant_dir, max_size=800, fmt="webp", quality=90, workers=None):
+    """Bring variant_dir up to date with sources (image paths): transcode the
+    new and changed ones across workers processes, drop variants nothing
+    uses any more, and write the manifest the bot serves them from.
+
+    A source whose size and mtime match the manifest is skipped without being
+    read; one that was only touched is hashed, and skipped if its content
+    hasn't changed.  Changing any setting rebuilds everything.  Returns a dict
+    of counts."""
+
+    os.makedirs(variant_dir, exist_ok=True)
+    settings = {"max_size": max_size, "format": fmt, "quality": quality}
+    manifest = read_manifest(variant_dir)
+    known = manifest["sources"] if manifest["settings"] == settings else {}
+    counts = {"unchanged": 0, "built": 0, "kept_source": 0, "missing": 0, "failed": 0}
+
+    def current(entry):
+        return entry["variant"] is None or os.path.exists(
+            os.path.join(variant_dir, entry["variant"])
+        )
+
+    entries = {}
+    todo = {}
+    for source in sorted(set(sources)):
+        name = os.path.basename(source)
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            counts["missing"] += 1
+            continue
+        entry = known.get(name)
+        if entry and current(entry):
+            if (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                entries[name] = entry
+                counts["unchanged"] += 1
+                continue
+            digest = file_digest(source)
+            if entry["digest"] == digest:
+                entries[name] = dict(entry, mtime_ns=stat.st_mtime_ns)
+                counts["unchanged"] += 1
+                continue
+        else:
+            digest = file_digest(source)
+        todo[name] = (source, digest, stat)
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {
+            name: pool.submit(
+                transcode,
+                source,
+                os.path.join(variant_dir, variant_filename(name, digest, fmt)),
+                max_size,
+                fmt,
+                quality,
+            )
+            for name, (source, digest, stat) in todo.items()
+        }
+        for name, future in futures.items():
+            source, digest, stat = todo[name]
+            try:
+                smaller = future.result()
+            except Exception as err:
+                logging.error("Failed to transcode {}: {}".format(source, err))
+                counts["failed"] += 1
+                continue
+            counts["built" if smaller else "kept_source"] += 1
+            entries[name] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "digest": digest,
+                "variant": variant_filename(name, digest, fmt) if smaller else None,
+            }
+
+    write_manifest(variant_dir, {"settings": settings, "sources": entries})
+
+    # after the manifest, so the bot never points at a file that's gone
+    used = {entry["variant"] for entry in entries.values()}
+    for filename in os.listdir(variant_dir):
+        if filename != MANIFEST and filename not in used:
+            os.remove(os.path.join(variant_dir, filename))
+    return counts
+
+
+class VariantIndex:
+    """Which smaller variant to send in place of each card image, from the
+    manifest build() writes.
+
+    A variant is only served while its source still has the size and mtime it
+    was built from, so an image that's been replaced since is sent as it is
+    until the variants are rebuilt."""
+
+    def __init__(self, variant_dir):
+        self.variant_dir = variant_dir
+        self.entries = {}
+        self.reload()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def reload(self, path=None):
+        self.entries = read_manifest(self.variant_dir)["sources"]
+
+    def get(self, filepath):
+        """The variant to send for the image at filepath, or filepath itself."""
+
+        entry = self.entries.get(os.path.basename(filepath))
+        if not entry or not entry["variant"]:
+            return filepath
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return filepath
+        if (stat.st_mtime_ns, stat.st_size) != (entry["mtime_ns"], entry["size"]):
+            return filepath
+        variant = os.path.join(self.variant_dir, entry["variant"])
+        return variant if os.path.exists(variant) else filepath
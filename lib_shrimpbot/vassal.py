@@ -0,0 +1,252 @@
+import collections
+import copy
+import importlib
+import os
+import re
+import shutil
+import time
+
+# "!vassal add <upgrade> to <ship>", "!vassal remove <piece> [from <ship>]" and
+# "!vassal fix line <n> <text>" edit the list the user last converted
+Edit = collections.namedtuple("Edit", "action name target")
+
+EDITS = [
+    ("add", re.compile(r"add\s+(?P<name>.+?)(?:\s+to\s+(?P<target>.+))?", re.I)),
+    (
+        "remove",
+        re.compile(r"remove\s+(?P<name>.+?)(?:\s+from\s+(?P<target>.+))?", re.I),
+    ),
+    ("fix", re.compile(r"fix\s+line\s+(?P<target>\d+)\s*:?\s+(?P<name>.+)", re.I)),
+]
+
+
+def warmup():
+    """Import listbuilder (and all of lib_listbuilder) ahead of the first
+    !vassal.  It's deferred so the bot can log in without waiting on it; run
+    this on a worker thread once it's up."""
+
+    importlib.import_module("listbuilder")
+
+
+class FleetSession:
+    """The list a user last converted: the parsed Fleet, the lines it was
+    read from, the edits made to it since, and the database rows its pieces
+    came from."""
+
+    def __init__(self):
+        self.fleet = None
+        self.lines = []
+        self.edits = []
+        self.piece_cache = {}
+        self.expires = 0.0
+
+
+class FleetSessions:
+    """Each user's FleetSession, kept for ttl seconds after it was last
+    used."""
+
+    def __init__(self, ttl=900, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.sessions = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def put(self, user, session):
+        self.prune()
+        session.expires = self.clock() + self.ttl
+        self.sessions[user] = session
+
+    def get(self, user):
+        """user's session, or None if they don't have one (any more)."""
+
+        self.prune()
+        session = self.sessions.get(user)
+        if session is not None:
+            session.expires = self.clock() + self.ttl
+        return session
+
+    def end(self, user):
+        self.sessions.pop(user, None)
+
+    def prune(self):
+        now = self.clock()
+        for user in [u for u, s in self.sessions.items() if s.expires <= now]:
+            del self.sessions[user]
+
+
+def parse_edit(text):
+    """The Edit asked for in text (what follows "!vassal"), or None if text
+    isn't an edit, which makes it a whole list.  name is the piece, and target
+    the ship it goes on or comes off (or None); for "fix line", name is the
+    new line and target its number."""
+
+    text = text.strip()
+    if "\n" in text:
+        return None
+    for action, pattern in EDITS:
+        match = pattern.fullmatch(text)
+        if match:
+            target = match.group("target")
+            if action == "fix":
+                target = int(target)
+            return Edit(action, match.group("name").strip(), target)
+    return None
+
+
+def job_config(listbuilder, guid, job_dir, root_path):
+    """A listbuilder config that works entirely inside job_dir.
+
+    export_to_vlog() purges <pwd>/out and writes savedGame into the working
+    dir, so every job gets its own copies of both and concurrent jobs can't
+    clobber each other."""
+
+    working_path = os.path.join(job_dir, "working")
+    out_path = os.path.join(job_dir, "out")
+    os.makedirs(working_path, exist_ok=True)
+    os.makedirs(out_path, exist_ok=True)
+    for boilerplate in ("moduledata", "savedata"):
+        shutil.copyfile(
+            os.path.join(root_path, "working", boilerplate),
+            os.path.join(working_path, boilerplate),
+        )
+
+    listbuilder_config = listbuilder.get_default_config()
+    listbuilder_config.pwd = job_dir
+    listbuilder_config.vlog_path = os.path.join(out_path, guid + ".vlog")
+    listbuilder_config.vlb_path = os.path.join(job_dir, "vlb", guid + ".vlb")
+    listbuilder_config.working_dir = working_path
+    listbuilder_config.db_path = os.path.join(root_path, "vlb_pieces.vlo")
+    return listbuilder_config
+
+
+def build_vlog(liststr, guid, job_dir, root_path, session=None):
+    """Convert a pasted fleet list into a .vlog, entirely inside job_dir.
+
+    This is the blocking half of !vassal, meant to run on a worker thread.
+    If session is given, the parsed fleet is kept on it for later edits.
+    Returns (True, vlog_path) or (False, last_item)."""
+
+    import listbuilder
+
+    listbuilder_config = job_config(listbuilder, guid, job_dir, root_path)
+    listbuilder_config.fleet = liststr
+    if session is not None:
+        listbuilder_config.piece_cache = session.piece_cache
+
+    success, fleet = listbuilder.parse_fleet(listbuilder_config)
+    if not success:
+        return (False, fleet)
+
+    listbuilder.write_vlb(fleet, listbuilder_config.vlb_path)
+    listbuilder.export_to_vlog(listbuilder_config)
+    if session is not None:
+        session.fleet = fleet
+        session.lines = liststr.splitlines()
+        session.edits = []
+    return (True, listbuilder_config.vlog_path)
+
+
+def find_piece(pieces, name, attr):
+    """The piece whose attr is name, or else the only one whose attr contains
+    it."""
+
+    exact = [piece for piece in pieces if getattr(piece, attr) == name]
+    if exact:
+        return exact[0]
+    partial = [piece for piece in pieces if name in getattr(piece, attr)]
+    if len(partial) == 1:
+        return partial[0]
+    return None
+
+
+def apply_edit(fleet, edit):
+    """Add or remove one piece on fleet, looking up only that piece.  Returns
+    None, or what went wrong."""
+
+    from lib_listbuilder.definitions import nomenclature_translation
+    from lib_listbuilder.utils import scrub_piecename
+
+    name = scrub_piecename(edit.name)
+    name = nomenclature_translation.get(name, name)
+    ships = fleet.ships
+    if edit.target:
+        ship = find_piece(fleet.ships, scrub_piecename(edit.target), "shipclass")
+        if ship is None:
+            return "I couldn't find a {} in your list.".format(edit.target)
+        ships = [ship]
+
+    if edit.action == "add":
+        # the piece is built before anything moves, so a failed lookup
+        # leaves the fleet as it was
+        try:
+            if edit.target:
+                ships[0].add_upgrade(name)
+            else:
+                try:
+                    fleet.add_squadron(name)
+                except (TypeError, ValueError):
+                    fleet.add_ship(name)
+        except (TypeError, ValueError):
+            return "I couldn't find a card called {}.".format(edit.name)
+        return None
+
+    for ship in ships:
+        upgrade = find_piece(ship.upgrades, name, "upgradename")
+        if upgrade is not None:
+            ship.remove_upgrade(upgrade)
+            return None
+    if not edit.target:
+        squadron = find_piece(fleet.squadrons, name, "squadronclass")
+        if squadron is not None:
+            fleet.remove_squadron(squadron)
+            return None
+        ship = find_piece(fleet.ships, name, "shipclass")
+        if ship is not None:
+            fleet.remove_ship(ship)
+            return None
+    return "I couldn't find {} in your list.".format(edit.name)
+
+
+def edit_vlog(session, edit, guid, job_dir, root_path):
+    """Apply edit to session's fleet and render it again into a .vlog inside
+    job_dir.
+
+    Adds and removes change a copy of the parsed fleet.  A fixed line means
+    parsing the list again, but every piece that didn't change comes out of
+    the session's piece cache, and the earlier edits are made again on top.
+    Returns (True, vlog_path) or (False, what went wrong); the session is
+    only updated once the .vlog has been written, so a failed edit or export
+    leaves it as it was."""
+
+    import listbuilder
+
+    listbuilder_config = job_config(listbuilder, guid, job_dir, root_path)
+    listbuilder_config.piece_cache = session.piece_cache
+
+    if edit.action == "fix":
+        if not 1 <= edit.target <= len(session.lines):
+            return (False, "Your list only has {} lines.".format(len(session.lines)))
+        lines = list(session.lines)
+        lines[edit.target - 1] = edit.name
+        listbuilder_config.fleet = "\n".join(lines)
+        success, fleet = listbuilder.parse_fleet(listbuilder_config)
+        if not success:
+            return (False, "I still can't read your list near this line: " + fleet)
+        # edits that no longer apply (say, to a ship that's gone) are dropped
+        edits = [e for e in session.edits if apply_edit(fleet, e) is None]
+    else:
+        # every piece shares the one config (and its piece cache), so that
+        # isn't copied
+        config = session.fleet.config
+        fleet = copy.deepcopy(session.fleet, {id(config): config})
+        error = apply_edit(fleet, edit)
+        if error:
+            return (False, error)
+        lines, edits = session.lines, session.edits + [edit]
+
+    listbuilder.write_vlb(fleet, listbuilder_config.vlb_path)
+    listbuilder.export_to_vlog(listbuilder_config)
+    session.fleet, session.lines, session.edits = fleet, lines, edits
+    return (True, listbuilder_config.vlog_path)
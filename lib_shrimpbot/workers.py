@@ -0,0 +1,49 @@
+import asyncio
+import collections
+import concurrent.futures
+import functools
+
+
+class UserQueueFull(RuntimeError):
+    """Raised when a user already has as many jobs queued as they're allowed."""
+
+
+class BoundedWorkerPool:
+    """Runs blocking jobs off the event loop on a fixed-size thread pool, with a
+    cap on how many jobs any one user can have queued or running at a time."""
+
+    def __init__(self, max_workers=2, per_user_limit=1, name="shrimpbot-worker"):
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self.pending = collections.Counter()
+
+    def is_full(self, user_id):
+        return self.pending[user_id] >= self.per_user_limit
+
+    async def run(self, user_id, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the pool and await its result."""
+
+        if self.is_full(user_id):
+            raise UserQueueFull(
+                "User {} already has {} job(s) pending.".format(
+                    user_id, self.pending[user_id]
+                )
+            )
+
+        self.pending[user_id] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self.pending[user_id] -= 1
+            if self.pending[user_id] <= 0:
+                del self.pending[user_id]
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
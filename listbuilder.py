@@ -22,10 +22,10 @@ Example usage (as a module):
 """
 
 import logging
-import logging.handlers
+import shrimplog
+import shrimpperf
 
-_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/shrimp.log")
-logging.basicConfig(handlers=[_handler], level=logging.INFO)
+shrimplog.configure("/var/log/shrimpbot/shrimp.log")
 logging.info("Logging initialized for listbuilder module.")
 
 import argparse
@@ -55,6 +55,7 @@ class ShrimpConfig:
         flt="list.flt",
         db="vlb_pieces.vlo",
         import_vlog=False,
+        piece_cache=None,
     ):
         self.pwd = os.path.dirname(__file__)
         self.vlog_path = os.path.abspath(vlog)
@@ -66,6 +67,9 @@ class ShrimpConfig:
         self.fleet = os.path.abspath(flt)  # path or text
         self.db_path = os.path.abspath(db)
         self.import_vlog = import_vlog
+        # database rows already looked up, shared by every import using this
+        # config, so re-importing an edited list only queries what changed
+        self.piece_cache = piece_cache
 
 
 def identify_format(fleet_text):
@@ -157,12 +161,9 @@ def identify_format(fleet_text):
     return max(formats.keys(), key=(lambda x: formats[x]))
 
 
-def import_from_list(config):
-    """Imports a fleet list from a file or string into a VASSAL Listbuilder (VLB) format."""
-
-    conn = config.db_path
-    working_path = config.working_dir
-    output_to = config.vlb_path
+def parse_fleet(config):
+    """Reads a fleet list from a file or string into a Fleet.  Returns
+    (True, fleet), or (False, the line it failed on)."""
 
     ingest_format = {
         "fab": import_from_fabs,
@@ -173,65 +174,73 @@ def import_from_list(config):
         "vlog": import_from_vlog,
     }
 
-    if config.import_vlog:
-        logging.debug(f"Importing from VLOG {config.fleet}.")
-        return import_from_vlog(config)
+    if os.path.exists(config.fleet):
+        logging.info(config.fleet)
+        with open(config.fleet) as fleet_list:
+            fleet_text = fleet_list.read()
     else:
-        if os.path.exists(config.fleet):
-            logging.info(config.fleet)
-            with open(config.fleet) as fleet_list:
-                fleet_text = fleet_list.read()
-        else:
-            fleet_text = config.fleet
+        fleet_text = config.fleet
 
+    with shrimpperf.span("listbuilder.detect"):
         fmt = identify_format(fleet_text)
-        success, fleet = ingest_format[fmt](fleet_text, config)
-
-        if not success:
-            return (success, fleet)
-
-        os.makedirs(os.path.dirname(output_to), exist_ok=True)
-        with open(output_to, "w") as vlb:
-            vlb.write("a1\r\nbegin_save{}\r\nend_save{}\r\n".format(chr(27), chr(27)))
-            vlb.write(
-                "LOG\tCHAT<Listbuilder> - "
-                + "Fleet imported by Shrimpbot on the Armada Discord.{}\r\n".format(
-                    chr(27)
+    with shrimpperf.span("listbuilder.import"):
+        return ingest_format[fmt](fleet_text, config)
+
+
+def write_vlb(fleet, output_to):
+    """Writes every piece of fleet to a VASSAL Listbuilder (VLB) file."""
+
+    os.makedirs(os.path.dirname(output_to), exist_ok=True)
+    with shrimpperf.span("listbuilder.vlb"), open(output_to, "w") as vlb:
+        vlb.write("a1\r\nbegin_save{}\r\nend_save{}\r\n".format(chr(27), chr(27)))
+        vlb.write(
+            "LOG\tCHAT<Listbuilder> - "
+            + "Fleet imported by Shrimpbot on the Armada Discord.{}\r\n".format(chr(27))
+            + "LOG\tCHAT<Listbuilder> - "
+            + "https://discord.gg/jY4K4d6{}\r\n\r\n".format(chr(27))
+        )
+        for ship in fleet.ships:
+            logging.debug(
+                'Writing shipcard "{}" to VLB: {}'.format(
+                    ship.shipclass, ship.shipcard.content[:50]
                 )
-                + "LOG\tCHAT<Listbuilder> - "
-                + "https://discord.gg/jY4K4d6{}\r\n\r\n".format(chr(27))
             )
-            for ship in fleet.ships:
-                logging.debug(
-                    'Writing shipcard "{}" to VLB: {}'.format(
-                        ship.shipclass, ship.shipcard.content[:50]
-                    )
-                )
-                vlb.write(ship.shipcard.content + chr(27))
+            vlb.write(ship.shipcard.content + chr(27))
 
-                logging.debug(
-                    'Writing shiptoken "{}" to VLB: {}'.format(
-                        ship.shipclass, ship.shiptoken.content[:50]
-                    )
+            logging.debug(
+                'Writing shiptoken "{}" to VLB: {}'.format(
+                    ship.shipclass, ship.shiptoken.content[:50]
                 )
-                vlb.write(ship.shiptoken.content + chr(27))
+            )
+            vlb.write(ship.shiptoken.content + chr(27))
 
-                logging.debug(
-                    "Writing shipcmdstack to VLB: {}".format(
-                        ship.shipcmdstack.content[:50]
-                    )
-                )
-                vlb.write(ship.shipcmdstack.content + chr(27))
+            logging.debug(
+                "Writing shipcmdstack to VLB: {}".format(ship.shipcmdstack.content[:50])
+            )
+            vlb.write(ship.shipcmdstack.content + chr(27))
+
+            logging.debug("Writing upgrades to VLB.")
+            [vlb.write(u.content + chr(27)) for u in ship.upgrades]
+        for sq in fleet.squadrons:
+            vlb.write(sq.squadroncard.content + chr(27))
+            vlb.write(sq.squadrontoken.content + chr(27))
+        for objective in fleet.objectives:
+            vlb.write(fleet.objectives[objective].content + chr(27))
+
+
+def import_from_list(config):
+    """Imports a fleet list from a file or string into a VASSAL Listbuilder (VLB) format."""
+
+    if config.import_vlog:
+        logging.debug(f"Importing from VLOG {config.fleet}.")
+        return import_from_vlog(config)
 
-                logging.debug("Writing upgrades to VLB.")
-                [vlb.write(u.content + chr(27)) for u in ship.upgrades]
-            for sq in fleet.squadrons:
-                vlb.write(sq.squadroncard.content + chr(27))
-                vlb.write(sq.squadrontoken.content + chr(27))
-            for objective in fleet.objectives:
-                vlb.write(fleet.objectives[objective].content + chr(27))
+    success, fleet = parse_fleet(config)
+    if not success:
+        return (success, fleet)
 
-        return (True, output_to)
+    write_vlb(fleet, config.vlb_path)
+    return (True, config.vlb_path)
 
 
 def export_to_vlog(config):
@@ -264,19 +273,21 @@ def export_to_vlog(config):
     with open(config.vlb_path, "r") as vlb:
         in_vlb = vlb.read()
 
-    in_vlb = in_vlb.replace("\r", "").replace("\n", "")
-    xor_key = int(in_vlb[0:2], 16)
-    clear = in_vlb[2::]
-    obf_out = "!VCSK" + (in_vlb[0:2])
-    for char in clear:
-        obfint = ord(char) ^ xor_key
-        obf_out += hex(obfint)[2::]
+    with shrimpperf.span("listbuilder.obfuscate"):
+        in_vlb = in_vlb.replace("\r", "").replace("\n", "")
+        xor_key = int(in_vlb[0:2], 16)
+        clear = in_vlb[2::]
+        obf_out = "!VCSK" + (in_vlb[0:2])
+        for char in clear:
+            obfint = ord(char) ^ xor_key
+            obf_out += hex(obfint)[2::]
 
     os.makedirs(os.path.dirname(config.working_dir), exist_ok=True)
     with open(os.path.join(config.working_dir, "savedGame"), "w") as savedgame_out:
         savedgame_out.write(obf_out)
 
-    zipall(config.working_dir, os.path.abspath(config.vlog_path))
+    with shrimpperf.span("listbuilder.zip"):
+        zipall(config.working_dir, os.path.abspath(config.vlog_path))
 
 
 def get_default_config():
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import logging
+import logging.handlers
+
+_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/updater.log")
+logging.basicConfig(handlers=[_handler], level=logging.INFO)
+
+
+import argparse
+import asyncio
+import os
+
+import cardpop
+from lib_shrimpbot.cardsearch import CardIndex, confident, read_card_table
+
+PWD = os.path.dirname(os.path.abspath(__file__))
+
+# the same bar !card uses, so anything we skip here is already served locally
+MATCH_THRESHOLD = 140
+
+
+async def mirror(
+    wiki, img_path, reference_table_path, concurrency=8, category=None, dry_run=False
+):
+    """Download the card image for every wiki page that !card can't already
+    answer from img/, and add each one to img/ and cards.txt.
+
+    Pages are worked on concurrency at a time.  Images are written to a .part
+    file and only added to cards.txt once complete, and pages the local index
+    already answers are skipped, so an interrupted run can just be restarted.
+    Returns a dict of counts."""
+
+    index = CardIndex(read_card_table(reference_table_path, img_path))
+    staging_path = os.path.join(img_path, "tmp", "mirror")
+    os.makedirs(staging_path, exist_ok=True)
+
+    slots = asyncio.Semaphore(concurrency)
+    counts = {"pages": 0, "local": 0, "no_image": 0, "mirrored": 0, "failed": 0}
+
+    async def mirror_page(page_title):
+        card_name = cardpop.cardNameFromTitle(page_title)
+        if not card_name or confident(index.search(card_name), MATCH_THRESHOLD):
+            counts["local"] += 1
+            return
+
+        async with slots:
+            img_title = await wiki.getBestMatchImageTitle(page_title)
+            img_url = img_title and await wiki.getImageUrl(img_title)
+            if not img_url:
+                counts["no_image"] += 1
+                return
+            if dry_run:
+                logging.info("Would mirror {} from {}".format(card_name, img_url))
+                counts["mirrored"] += 1
+                return
+            data = await wiki.fetch(img_url)
+
+        # checked again: another page may have claimed the name while we waited
+        if confident(index.search(card_name), MATCH_THRESHOLD):
+            counts["local"] += 1
+            return
+
+        ext = os.path.splitext(img_url)[1].lower() or ".png"
+        staged = os.path.join(
+            staging_path, "wiki_" + card_name.lower().replace(" ", "-") + ext
+        )
+        with open(staged + ".part", "wb") as part:
+            part.write(data)
+        os.replace(staged + ".part", staged)
+
+        cardpop.addCardToReference(staged, img_path, card_name, reference_table_path)
+        index.add(card_name)
+        counts["mirrored"] += 1
+        logging.info("Mirrored {} from {}".format(card_name, img_url))
+
+    titles = [title async for title in wiki.listPages(category)]
+    counts["pages"] = len(titles)
+    results = await asyncio.gather(
+        *(mirror_page(title) for title in titles), return_exceptions=True
+    )
+    for title, result in zip(titles, results):
+        if isinstance(result, Exception):
+            counts["failed"] += 1
+            logging.error("Failed to mirror {}: {}".format(title, result))
+
+    return counts
+
+
+async def run(args):
+    wiki = cardpop.WikiClient(api_url=args.api, max_connections=args.j)
+    try:
+        return await mirror(
+            wiki,
+            os.path.abspath(args.img),
+            os.path.abspath(args.cards),
+            concurrency=args.j,
+            category=args.category,
+            dry_run=args.dry_run,
+        )
+    finally:
+        await wiki.close()
+
+
+def main():
+
+    # fmt: off
+    parser = argparse.ArgumentParser(description="Mirror card images from the Armada wiki into img/ and cards.txt.")
+    parser.add_argument("-img", help="card image directory", type=str, default=os.path.join(PWD, "img"))
+    parser.add_argument("-cards", help="card reference table", type=str, default=os.path.join(PWD, "cards.txt"))
+    parser.add_argument("-api", help="MediaWiki API endpoint", type=str, default=cardpop.WIKI_API_URL)
+    parser.add_argument("-category", help="wiki category of the card pages to mirror", type=str, required=True)
+    parser.add_argument("-j", help="concurrent downloads", type=int, default=8)
+    parser.add_argument("--dry-run", help="report what would be mirrored without downloading", action="store_true")
+    args = parser.parse_args()
+    # fmt: on
+
+    counts = asyncio.run(run(args))
+    print(
+        "{pages} pages: {mirrored} mirrored, {local} already local, "
+        "{no_image} without a card image, {failed} failed.".format(**counts)
+    )
+
+
+if __name__ == "__main__":
+
+    main()
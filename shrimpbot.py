@@ -1,80 +1,227 @@
 #!/usr/bin/env python3
 
+import asyncio
 import cardpop
 import discord
 import hashlib
-import listbuilder
 import logging
-import logging.handlers
 import os
 import random
-import requests
+import shrimplog
+import shrimpperf
 import shutil
+import tempfile
 import time
 
 from discord import emoji
 from discord.ext import commands
-from fuzzywuzzy import fuzz
-
-_handler = logging.handlers.WatchedFileHandler("/var/log/shrimpbot/shrimp.log")
-logging.basicConfig(handlers=[_handler], level=logging.INFO)
+from lib_shrimpbot import dice, gateway, vassal
+from lib_shrimpbot.acronyms import AcronymEngine, special_chars
+from lib_shrimpbot.attachments import AttachmentCache
+from lib_shrimpbot.cardsearch import CardIndex, confident, normalize, read_card_table
+from lib_shrimpbot.loopmonitor import LoopMonitor
+from lib_shrimpbot.memstats import MemoryTracer, cache_sizes, format_bytes, rss_bytes
+from lib_shrimpbot.outbound import ErrorDigest, Outbox
+from lib_shrimpbot.ratelimit import InFlight, RateLimiter
+from lib_shrimpbot.reactions import ReactionScheduler
+from lib_shrimpbot.reloader import FileWatcher
+from lib_shrimpbot.triggers import TriggerTable
+from lib_shrimpbot.variants import MANIFEST, VariantIndex
+from lib_shrimpbot.workers import BoundedWorkerPool, UserQueueFull
+
+# chat traffic can be sampled (0.0-1.0) to cut log volume on busy servers
+CHAT_LOG_SAMPLE_RATE = float(os.environ.get("SHRIMPBOT_CHAT_LOG_SAMPLE_RATE", 1.0))
+
+shrimplog.configure(
+    "/var/log/shrimpbot/shrimp.log", chat_sample_rate=CHAT_LOG_SAMPLE_RATE
+)
 
 PWD = os.path.dirname(__file__)
 TOKEN_PATH = PWD + "/privatekey.dsc"
 CARD_IMG_PATH = PWD + "/img/"
 CARD_LOOKUP = PWD + "/cards.txt"
 ACRO_LOOKUP = PWD + "/acronyms.txt"
+ATTACHMENT_CACHE = PWD + "/attachments.json"
 BOT_OWNER_ID = 236683961831653376
 
-
-with open(TOKEN_PATH) as t:
-    BOT_TOKEN = t.read().strip()
+# gateway intents: a profile ("minimal", what the handlers need, or "all"),
+# optionally with extra intents, e.g. "minimal,members"
+INTENTS_PROFILE = os.environ.get("SHRIMPBOT_INTENTS", "minimal")
+# members discord.py keeps: "none", "intents" (whatever the intents allow),
+# "voice", "joined" or "all"
+MEMBER_CACHE_POLICY = os.environ.get("SHRIMPBOT_MEMBER_CACHE", "none")
+# recent messages discord.py keeps; nothing looks them up again, so none
+MESSAGE_CACHE_SIZE = int(os.environ.get("SHRIMPBOT_MESSAGE_CACHE_SIZE", 0))
+
+# VASSAL list conversions run on a worker pool off the event loop
+VASSAL_WORKERS = int(os.environ.get("SHRIMPBOT_VASSAL_WORKERS", 2))
+VASSAL_PER_USER_LIMIT = int(os.environ.get("SHRIMPBOT_VASSAL_PER_USER_LIMIT", 1))
+
+# each user's last converted list is kept this long (seconds) after its last
+# use, for "!vassal add/remove/fix line" to edit
+FLEET_SESSION_TTL = int(os.environ.get("SHRIMPBOT_FLEET_SESSION_TTL", 900))
+
+# smaller copies of the card images, built by build_card_variants.py, are
+# uploaded in place of the originals when they're up to date
+CARD_VARIANT_PATH = CARD_IMG_PATH + "variants/"
+
+# images fetched from the wiki are cached on disk, and moved into img/ and
+# cards.txt once they've been asked for often enough
+WIKI_IMAGE_CACHE_BYTES = int(
+    os.environ.get("SHRIMPBOT_WIKI_IMAGE_CACHE_BYTES", 100 * 1024 * 1024)
+)
+WIKI_IMAGE_PROMOTE_AFTER = int(os.environ.get("SHRIMPBOT_WIKI_IMAGE_PROMOTE_AFTER", 3))
+# hits on the cache are written to its index at most this often (seconds)
+WIKI_IMAGE_SAVE_INTERVAL = float(
+    os.environ.get("SHRIMPBOT_WIKI_IMAGE_SAVE_INTERVAL", 60)
+)
+
+# listbuilder error reports to the owner are collected into one DM this often
+OWNER_DIGEST_INTERVAL = int(os.environ.get("SHRIMPBOT_OWNER_DIGEST_INTERVAL", 60))
+
+# cards.txt and acronyms.txt are reloaded this often (seconds) if they change
+RELOAD_INTERVAL = float(os.environ.get("SHRIMPBOT_RELOAD_INTERVAL", 10))
+
+# guild setup in on_ready runs in the background, a few guilds at a time
+GUILD_SETUP_CONCURRENCY = int(os.environ.get("SHRIMPBOT_GUILD_SETUP_CONCURRENCY", 5))
+GUILD_SETUP_INTERVAL = 0.25
+
+# "!card a, b, c" answers with up to this many cards on one message, which is
+# as many attachments as Discord allows
+MAX_CARDS_PER_MESSAGE = 10
+
+# anything holding up the event loop longer than this (seconds) is recorded,
+# with a stack sample, for &loop and the log
+LOOP_SLOW_THRESHOLD = float(os.environ.get("SHRIMPBOT_LOOP_SLOW_THRESHOLD", 0.25))
+LOOP_REPORT_INTERVAL = int(os.environ.get("SHRIMPBOT_LOOP_REPORT_INTERVAL", 900))
+
+# rolls go to the dedicated dice roller channel; the seed can be pinned to
+# replay a run of rolls, and the last DICE_HISTORY rolls are kept for &fairness
+DICE_CHANNEL_ID = 534871344395845657
+DICE_SEED = os.environ.get("SHRIMPBOT_DICE_SEED")
+DICE_HISTORY = int(os.environ.get("SHRIMPBOT_DICE_HISTORY", 1000))
+
+# faces &cheat loads each color's dice to, by user
+LOADED_DICE = {
+    419956366703329281: {"red": 0, "blue": 7, "black": 5},
+    BOT_OWNER_ID: {"black": 7},
+}
+
+# token buckets in front of the expensive handlers, for each user and for each
+# channel: (requests per minute, burst)
+RATE_LIMITS = {
+    "roll": {"user": (10, 5), "channel": (30, 10)},
+    "odds": {"user": (10, 5), "channel": (30, 10)},
+    "card": {"user": (10, 5), "channel": (30, 10)},
+    "vassal": {"user": (2, 2), "channel": (6, 3)},
+}
 
 enabled = True
 cheating = False  # Changes on login to default to False
-special_chars = "~`@#$%^&* ()_-+=|\\{}[]:;\"'<>,.?/!"
+special_chars_to_spaces = str.maketrans(special_chars, " " * len(special_chars))
 
-cardlookup = {}
-with open(CARD_LOOKUP) as cardslist:
-    for line in cardslist.readlines():
-        filename, key = line.split(";")
-        cardlookup[key.rstrip()] = os.path.join(CARD_IMG_PATH, filename)
+cardlookup = read_card_table(CARD_LOOKUP, CARD_IMG_PATH)
+cardindex = CardIndex(cardlookup)
 
-acronym_dict = {}
-with open(ACRO_LOOKUP) as acros:
-    for line in acros.readlines():
-        acronym, definition = line.split(";", 1)
-        acronym_dict[acronym.strip()] = definition.strip()
+acronyms = AcronymEngine.from_file(ACRO_LOOKUP)
 
-bot = commands.Bot(command_prefix="&", intents=discord.Intents.all())
+intents = gateway.intents(INTENTS_PROFILE)
+bot = commands.Bot(
+    command_prefix="&",
+    intents=intents,
+    member_cache_flags=gateway.member_cache_flags(MEMBER_CACHE_POLICY, intents),
+    max_messages=gateway.max_messages(MESSAGE_CACHE_SIZE),
+)
+bot_owner = None
 note = discord.Game(name="'!acro' for definitions")
-
-
-def findIn(findMe, findInMe):
-    for word in findMe:
-        if word.upper() in findInMe.upper():
-            return True
-    return False
-
-
-def equalsAny(findUs, inMe):
-    for word in findUs:
-        if word.upper() == inMe.upper():
-            return True
-    return False
-
-
-def searchFor(search_term, search_set, match_threshold=100):
-    ratios = [
-        (x, fuzz.token_set_ratio(search_term, x), fuzz.token_sort_ratio(search_term, x))
-        for x in search_set
-    ]
-    matches = sorted(
-        [r for r in ratios], key=lambda ratio: ratio[1] + ratio[2], reverse=True
-    )
-    if ((int(matches[0][1] + matches[0][2])) > match_threshold) or (
-        int(matches[0][1]) == 100
-    ):
+vassal_pool = BoundedWorkerPool(
+    max_workers=VASSAL_WORKERS,
+    per_user_limit=VASSAL_PER_USER_LIMIT,
+    name="shrimpbot-vassal",
+)
+fleet_sessions = vassal.FleetSessions(ttl=FLEET_SESSION_TTL)
+reactions = ReactionScheduler(delay=1.0)
+wiki = cardpop.WikiClient()
+attachments = AttachmentCache(ATTACHMENT_CACHE)
+card_variants = VariantIndex(CARD_VARIANT_PATH)
+watcher = FileWatcher(interval=RELOAD_INTERVAL)
+owner_errors = ErrorDigest(
+    lambda: bot.get_user(BOT_OWNER_ID) or bot_owner, interval=OWNER_DIGEST_INTERVAL
+)
+wiki_images = cardpop.ImageCache(
+    CARD_IMG_PATH + "tmp/",
+    max_bytes=WIKI_IMAGE_CACHE_BYTES,
+    promote_after=WIKI_IMAGE_PROMOTE_AFTER,
+    save_interval=WIKI_IMAGE_SAVE_INTERVAL,
+)
+guild_setup_slots = asyncio.Semaphore(GUILD_SETUP_CONCURRENCY)
+guild_setup = None
+rate_limits = RateLimiter(RATE_LIMITS)
+in_flight = InFlight()
+dice_roller = dice.DiceRoller(
+    seed=int(DICE_SEED) if DICE_SEED else None, history=DICE_HISTORY
+)
+dice_channel = None
+loop_monitor = LoopMonitor(
+    threshold=LOOP_SLOW_THRESHOLD, report_interval=LOOP_REPORT_INTERVAL
+)
+memory_tracer = MemoryTracer()
+
+triggers = TriggerTable(
+    {
+        "roll": ["!ROLL"],
+        "odds": ["!ODDS"],
+        "shrimp": [
+            "SHRIMP",
+            "SHRIMPBOT",
+            "MC30",
+            "MC30T",
+            "MC30S",
+            "MC30'S",
+            "MC-30",
+            "MC-30S",
+            "MC-30'S",
+        ],
+        "hail": ["HAIL SHRIMPBOT"],
+        "datagod": ["DATA FOR THE DATA GOD"],
+        "garm": ["GARM"],
+        "dooku": ["DOOKU"],
+        "acronym": ["!ACRONYM", "!ACRO", "!DEFINE"],
+        "card": ["!LOOKUP", "!CARD"],
+        "yes": ["!YES"],
+        "no": ["!NO"],
+        "listhelp": ["!listhelp"],
+        "vassal": ["!VASSAL"],
+        "testy": ["!testy"],
+    }
+)
+
+
+def get_dice_channel():
+    """The dedicated dice roller channel, looked up once it's visible."""
+
+    global dice_channel
+    if dice_channel is None:
+        dice_channel = bot.get_channel(DICE_CHANNEL_ID)
+    return dice_channel
+
+
+def request_keys(message, triggered):
+    """What makes a request the same as one that's still running: the same
+    card lookup in the same channel, or the same list from the same user."""
+
+    keys = {}
+    if "card" in triggered:
+        text = " ".join(message.content.upper().split())
+        keys["card"] = ("card", message.channel.id, text)
+    if "vassal" in triggered:
+        keys["vassal"] = ("vassal", message.author.id, message.content.strip())
+    return keys
+
+
+def searchFor(search_term, search_index, match_threshold=100):
+    matches = search_index.search(search_term)
+    if confident(matches, match_threshold):
         logging.info("FOUND MATCHES")
         logging.info(
             str(
@@ -98,33 +245,150 @@ def searchFor(search_term, search_set, match_threshold=100):
     return False
 
 
-@bot.command()
-async def list(ctx):
+def reload_cards(cards_path):
+    """Pick up changes to cards.txt, re-indexing only the cards that changed."""
+
+    global cardlookup, cardindex
+    new_lookup = read_card_table(cards_path, CARD_IMG_PATH)
+    removed = cardlookup.keys() - new_lookup.keys()
+    added = new_lookup.keys() - cardlookup.keys()
+
+    new_index = cardindex.copy()
+    for name in removed:
+        new_index.remove(name)
+    # in cards.txt order, which breaks ties between equally good matches
+    for name in new_lookup:
+        if name in added:
+            new_index.add(name)
+
+    cardlookup, cardindex = new_lookup, new_index
+    logging.info(
+        "Reloaded {}: {} added, {} removed.".format(
+            cards_path, len(added), len(removed)
+        )
+    )
+
+
+def reload_acronyms(acronyms_path):
+    """Pick up changes to acronyms.txt, touching only the acronyms that changed."""
+
+    global acronyms
+    definitions = {
+        AcronymEngine.normalize(acronym): definition
+        for acronym, definition in AcronymEngine.read_file(acronyms_path).items()
+    }
+    new_acronyms = acronyms.copy()
+    removed = [acronym for acronym in acronyms if acronym not in definitions]
+    for acronym in removed:
+        new_acronyms.remove(acronym)
+    changed = 0
+    for acronym, definition in definitions.items():
+        if new_acronyms.define(acronym) != definition:
+            new_acronyms.add(acronym, definition)
+            changed += 1
+
+    acronyms = new_acronyms
+    logging.info(
+        "Reloaded {}: {} added or changed, {} removed.".format(
+            acronyms_path, changed, len(removed)
+        )
+    )
+
+
+watcher.watch(CARD_LOOKUP, reload_cards)
+watcher.watch(ACRO_LOOKUP, reload_acronyms)
+watcher.watch(CARD_VARIANT_PATH + MANIFEST, card_variants.reload)
+
+
+def card_terms(content):
+    """The comma-separated search terms in a !card message, or the whole
+    thing if it's the name of a card with a comma in it."""
+
+    text = " ".join([x for x in content.split() if not x.startswith("!")])
+    if "," not in text or normalize(text) in cardindex.exact:
+        return [text]
+    return [term.strip() for term in text.split(",") if term.strip()]
+
+
+async def send_cards(message, terms):
+    """Look up every term and send all the cards found on one message, then
+    DM the requester everything that wasn't."""
+
+    found = []
+    missed = []
+    for term in terms[:MAX_CARDS_PER_MESSAGE]:
+        searchterm = term.translate(special_chars_to_spaces).upper()
+        with shrimpperf.span("card.search"):
+            card_matches = searchFor(searchterm, cardindex, match_threshold=140)
+        if not card_matches:
+            missed.append(term)
+            continue
+        filepath = os.path.join(CARD_IMG_PATH, str(cardlookup[card_matches[0][0]]))
+        filepath = card_variants.get(filepath)
+        if filepath not in found:
+            found.append(filepath)
+
+    if found:
+        logging.info("Sending to channel {} - {}".format(message.channel, found))
+        await attachments.send_many(message.channel, found)
+
+    if missed or len(terms) > MAX_CARDS_PER_MESSAGE:
+        async with Outbox(message.author) as out:
+            if missed:
+                out.add(
+                    "Sorry, I couldn't find: {}.  Message Ardaedhel if you think they should be in my list.".format(
+                        ", ".join(missed)
+                    )
+                )
+            if len(terms) > MAX_CARDS_PER_MESSAGE:
+                out.add(
+                    "I can only send {} cards at a time, so I skipped: {}.".format(
+                        MAX_CARDS_PER_MESSAGE, ", ".join(terms[MAX_CARDS_PER_MESSAGE:])
+                    )
+                )
+
+
+async def promote_wiki_image(wiki_img_url, wikisearchterm):
+    """Move a popular wiki image into img/ and cards.txt so later lookups for
+    it are served locally."""
+
+    global cardlookup, cardindex
+    page_title = await wiki.findPage(wikisearchterm)
+    if not page_title:
+        return
+    card_name = cardpop.cardNameFromTitle(page_title)
+    if card_name in cardlookup:
+        return
+
+    filename = wiki_images.promote(wiki_img_url, card_name, CARD_IMG_PATH, CARD_LOOKUP)
+    new_lookup = dict(cardlookup)
+    new_lookup[card_name] = os.path.join(CARD_IMG_PATH, filename)
+    new_index = cardindex.copy()
+    new_index.add(card_name)
+    cardlookup, cardindex = new_lookup, new_index
+
+
+@bot.command(name="list")
+async def list_words(ctx):
     """Lists every word the bot can explain."""
-    i = 0
-    msg = ""
-    for word in acronym_dict:
-        if i > 30:
-            await ctx.send(msg)
-            i = 0
-            msg = ""
-        msg += "\n" + word.upper() + ": " + acronym_dict.get(word.upper(), "ERROR!")
-        i += 1
-    await ctx.send(msg)
-    await ctx.send("------------------")
-    await ctx.send(str(len(acronym_dict)) + " words")
+    async with Outbox(ctx) as out:
+        for acronym, definition in acronyms.items():
+            out.add(acronym + ": " + definition)
+        out.add("------------------")
+        out.add(str(len(acronyms)) + " words")
 
 
 @bot.command()
 async def status(ctx):
     """Checks the status of the bot."""
-    await ctx.send("Shrimpbot info:")
-    await ctx.send("Bot name: " + bot.user.name)
-    await ctx.send("Bot ID: " + str(bot.user.id))
-    if enabled:
-        await ctx.send("The bot is enabled.")
-    else:
-        await ctx.send("The bot is disabled.")
+    async with Outbox(ctx) as out:
+        out.add("Shrimpbot info:")
+        out.add("Bot name: " + bot.user.name)
+        out.add("Bot ID: " + str(bot.user.id))
+        if enabled:
+            out.add("The bot is enabled.")
+        else:
+            out.add("The bot is disabled.")
 
 
 @bot.command()
@@ -138,25 +402,152 @@ async def toggle(ctx):
         await ctx.send("The bot is now disabled.")
 
 
-@bot.event
-async def on_ready():
-    BOT_OWNER = bot.get_user(BOT_OWNER_ID)
+def is_bot_owner(ctx):
+    return ctx.author.id == BOT_OWNER_ID
 
-    logging.info(f"Logged in as{bot.user.name} ({bot.user.id})")
-    logging.info(f"Owner is {BOT_OWNER.name} ({BOT_OWNER.id})")
-    for guild in bot.guilds:
+
+@bot.command()
+@commands.check(is_bot_owner)
+async def loop(ctx, *args):
+    """Event loop lag and slow callbacks.  '&loop stacks' includes stack
+    samples, '&loop reset' starts over."""
+    if "reset" in args:
+        loop_monitor.reset()
+        await ctx.send("Event loop stats reset.")
+        return
+    async with Outbox(ctx.author) as out:
+        for line in loop_monitor.summary(stacks="stacks" in args):
+            out.add(line)
+
+
+@bot.command()
+@commands.check(is_bot_owner)
+async def perf(ctx, *args):
+    """Handler and listbuilder stage latencies.  '&perf reset' starts over."""
+    if "reset" in args:
+        shrimpperf.timings.reset()
+        await ctx.send("Timings reset.")
+        return
+    async with Outbox(ctx.author) as out:
+        for line in shrimpperf.timings.summary():
+            out.add(line)
+
+
+@bot.command()
+@commands.check(is_bot_owner)
+async def fairness(ctx, last=None):
+    """Chi-square check of the dice over the last N rolls (default: all kept)."""
+    if last is not None and not (last.isdigit() and int(last) > 0):
+        await ctx.author.send("Usage: &fairness [number of rolls, 1 or more]")
+        return
+    async with Outbox(ctx.author) as out:
+        for line in dice_roller.fairness(int(last) if last else None):
+            out.add(line)
+
+
+@bot.command()
+@commands.check(is_bot_owner)
+async def memstats(ctx, *args):
+    """Memory use: RSS, the bot's own caches and Discord's, and the top
+    allocation sites while tracing.  '&memstats start' and '&memstats stop'
+    turn tracemalloc on and off."""
+    if "start" in args:
+        started = memory_tracer.start()
+        await ctx.send("Tracing allocations." if started else "Already tracing.")
+        return
+    if "stop" in args:
+        stopped = memory_tracer.stop()
+        await ctx.send("Stopped tracing." if stopped else "Wasn't tracing.")
+        return
+
+    caches = {
+        "cardlookup": cardlookup,
+        "card index": cardindex,
+        "acronyms": acronyms,
+        "attachment cache": attachments.entries,
+        "wiki image cache": wiki_images.entries,
+        "fleet sessions": fleet_sessions.sessions,
+        "rate limit buckets": rate_limits.buckets,
+        "dice history": dice_roller.recent,
+        "card variants": card_variants.entries,
+        "timings": shrimpperf.timings.histograms,
+    }
+    async with Outbox(ctx.author) as out:
+        out.add("RSS: " + format_bytes(rss_bytes()))
+        for line in cache_sizes(caches):
+            out.add(line)
+        out.add(
+            "card searches cached: {}, pool odds cached: {}".format(
+                cardindex.search.cache_info().currsize,
+                dice.odds.cache_info().currsize,
+            )
+        )
+        out.add("discord: " + gateway.footprint(bot))
+        # summing up the traces can take a while with a lot of them
+        lines = await asyncio.get_event_loop().run_in_executor(
+            None, memory_tracer.summary
+        )
+        for line in lines:
+            out.add(line)
+
+
+async def setup_guild(guild):
+    """Leave blacklisted guilds and fix our nickname everywhere else."""
+
+    async with guild_setup_slots:
         logging.info("Server: {} ({})".format(str(guild), str(guild.id)))
         if guild.id == 697833083201650689:
             logging.info(f"Leaving {str(guild)}...")
             await guild.leave()
             logging.info("[!] LEFT {}".format(str(guild)))
+            return
         if guild.id != 669698762402299904:  # BIG Server are special snowflakes
             logging.info("Fixing my name in {}".format(str(guild)))
             await guild.me.edit(nick="Shrimpbot")
-        time.sleep(0.25)
+        # hold the slot a moment so we stay well under the global rate limit
+        await asyncio.sleep(GUILD_SETUP_INTERVAL)
+
+
+async def setup_guilds(guilds):
+    """Set up every guild concurrently, GUILD_SETUP_CONCURRENCY at a time."""
+
+    results = await asyncio.gather(
+        *(setup_guild(guild) for guild in guilds), return_exceptions=True
+    )
+    for guild, result in zip(guilds, results):
+        if isinstance(result, Exception):
+            logging.info("[-] Failed to set up {}: {}".format(str(guild), result))
+    logging.info("Finished setting up {} servers.".format(len(guilds)))
+
+
+@bot.event
+async def on_ready():
+    global guild_setup, bot_owner
+    # without the members intent the owner is only cached once they've
+    # spoken, so ask for them
+    bot_owner = bot.get_user(BOT_OWNER_ID) or await bot.fetch_user(BOT_OWNER_ID)
+
+    logging.info(f"Logged in as{bot.user.name} ({bot.user.id})")
+    logging.info(f"Owner is {bot_owner.name} ({bot_owner.id})")
+    logging.info(
+        "Gateway: intents {}, member cache {}, message cache {}; {}".format(
+            INTENTS_PROFILE,
+            MEMBER_CACHE_POLICY,
+            MESSAGE_CACHE_SIZE,
+            gateway.footprint(bot),
+        )
+    )
 
     logging.info("Shrimpbot is online.")
     await bot.change_presence(status=discord.Status.online, activity=note)
+    owner_errors.start()
+    watcher.start()
+    loop_monitor.start()
+    asyncio.get_event_loop().run_in_executor(None, vassal.warmup)
+
+    # on_ready fires again on every reconnect; don't stack up setup runs
+    if guild_setup is None or guild_setup.done():
+        guild_setup = asyncio.ensure_future(setup_guilds(list(bot.guilds)))
 
 
 @bot.command()
@@ -172,14 +563,8 @@ async def on_message(message):
 
     if message.channel.type is not discord.ChannelType.private:
         # logging
-        logging.info(
-            "[{} | {} | {} | {}] {}".format(
-                time.ctime(),
-                message.guild,
-                message.channel.name,
-                message.author.name,
-                message.content,
-            )
+        shrimplog.log_chat(
+            message.guild, message.channel.name, message.author.name, message.content
         )
 
     # don't read our own message or do anything if not enabled
@@ -190,116 +575,75 @@ async def on_message(message):
     if not enabled:
         return
 
+    # one pass over the message for every keyword trigger; the only other
+    # handler is the "ACRONYM?" syntax, which needs a trailing question mark
+    triggered = triggers.match(message.content)
+    if not triggered and not message.content.endswith("?"):
+        return
+
+    limited = rate_limits.limited(triggered, message.author.id, message.channel.id)
+    if limited:
+        logging.info(
+            "Rate limited {} for {}".format(", ".join(sorted(limited)), message.author)
+        )
+        reactions.schedule(message, "\u23f3")
+        triggered -= limited
+
+    with in_flight.claim(request_keys(message, triggered)) as duplicates:
+        if duplicates:
+            logging.info(
+                "Dropped duplicate {} from {}".format(
+                    ", ".join(sorted(duplicates)), message.author
+                )
+            )
+        if "vassal" in duplicates:
+            # a repeated card lookup shows up in the channel anyway, but the
+            # same list again deserves an answer
+            await message.channel.send(
+                "Hang on, I'm already working on that list. It'll be along shortly.",
+            )
+        await respond(message, triggered - duplicates)
+
+
+async def respond(message, triggered):
+    """Run the handlers for the triggers in message that made it past the rate
+    limits and duplicate check."""
+
     #   rollDice(message.content,bot)
-    if findIn(["!ROLL"], message.content):
-        out = ""
-        reds = [
-            "<:redblank:522785582284275755>",
-            "<:redblank:522785582284275755>",
-            "<:redacc:522785555847577610>",
-            "<:redhit:522785530958577701>",
-            "<:redhit:522785530958577701>",
-            "<:redcrit:522785616707059713>",
-            "<:redcrit:522785616707059713>",
-            "<:reddbl:522784255722651670>",
-        ]
-        blues = [
-            "<:bluehit:522785736500576266>",
-            "<:bluehit:522785736500576266>",
-            "<:bluehit:522785736500576266>",
-            "<:bluehit:522785736500576266>",
-            "<:bluecrit:522785721153748996>",
-            "<:bluecrit:522785721153748996>",
-            "<:blueacc:522785704917467137>",
-            "<:blueacc:522785704917467137>",
-        ]
-        blacks = [
-            "<:blackhit:522785658062766090>",
-            "<:blackhit:522785658062766090>",
-            "<:blackhit:522785658062766090>",
-            "<:blackhit:522785658062766090>",
-            "<:blackblank:522785641310847024>",
-            "<:blackblank:522785641310847024>",
-            "<:blackhitcrit:522785681156866063>",
-            "<:blackhitcrit:522785681156866063>",
-        ]
-        redcount = 0
-        bluecount = 0
-        blackcount = 0
-
-        for word in message.content.split(" "):
-            word = word.upper().rstrip("S")
-
-            if word[-3::] == "RED":
-                try:
-                    redcount += int(word[:-3])
-                except:
-                    pass
-            if word[-4::] == "BLUE":
-                try:
-                    bluecount += int(word[:-4])
-                except:
-                    pass
-            if word[-5::] == "BLACK":
-                try:
-                    blackcount += int(word[:-5])
-                except:
-                    pass
-
-        if (redcount + bluecount + blackcount) < 50:
-            if cheating:
-                for _ in range(redcount):
-                    if message.author.id == "419956366703329281":
-                        out += reds[0]
-                        out += " "
-                    else:
-                        out += random.sample(reds, 1)[0]
-                        out += " "
-                for _ in range(bluecount):
-                    if message.author.id == "419956366703329281":
-                        out += blues[7]
-                        out += " "
-                    else:
-                        out += random.sample(blues, 1)[0]
-                        out += " "
-                for _ in range(blackcount):
-                    if message.author.id == "236683961831653376":
-                        out += blacks[7]
-                        out += " "
-                    elif message.author.id == "419956366703329281":
-                        out += blacks[5]
-                        out += " "
-                    else:
-                        out += random.sample(blacks, 1)[0]
-                        out += " "
+    if "roll" in triggered:
+        with shrimpperf.span("roll"):
+            pool = dice.parse_pool(message.content)
+            if not dice.too_many(pool):
+                forced = LOADED_DICE.get(message.author.id) if cheating else None
+                out = dice_roller.render(dice_roller.roll(*pool, forced=forced))
             else:
-                for _ in range(redcount):
-                    out += random.sample(reds, 1)[0]
-                    out += " "
-                for _ in range(bluecount):
-                    out += random.sample(blues, 1)[0]
-                    out += " "
-                for _ in range(blackcount):
-                    out += random.sample(blacks, 1)[0]
-                    out += " "
-        else:
-            out = "Real funny there, funny guy."
-
-        dicechannel = [
-            channel
-            for channel in [server for server in bot.servers][0].channels
-            if channel.id == "534871344395845657"
-        ][
-            0
-        ]  # dedicated dice roller channel
-
-        if out:
-            if cheating and message.author.id == "236683961831653376":
-                await dicechannel.send(message.author.mention + " is a dirty cheater.")
-                # await bot.send_message(dicechannel, out)
-            else:
-                await dicechannel.send(message.author.mention)
-                # await bot.send_message(dicechannel, out)
+                out = "Real funny there, funny guy."
+
+            dicechannel = get_dice_channel() or message.channel
+
+            if out:
+                if cheating and message.author.id == BOT_OWNER_ID:
+                    await dicechannel.send(
+                        message.author.mention + " is a dirty cheater."
+                    )
+                    # await bot.send_message(dicechannel, out)
+                else:
+                    await dicechannel.send(message.author.mention)
+                    # await bot.send_message(dicechannel, out)
+
+    if "odds" in triggered:
+        with shrimpperf.span("odds"):
+            pool = dice.parse_pool(message.content)
+            async with Outbox(message.channel) as out:
+                if dice.too_many(pool):
+                    out.add("Real funny there, funny guy.")
+                elif not sum(pool):
+                    out.add(
+                        "Odds of what?  Try something like !odds 3red 2blue 1black."
+                    )
+                else:
+                    for line in dice.odds(*pool):
+                        out.add(line)
 
     # don't read any bot's messages
 
@@ -307,244 +651,286 @@ async def on_message(message):
         return
 
     #   shrimpBot(message.content,bot)
-    if findIn(
-        [
-            "SHRIMP",
-            "SHRIMPBOT",
-            "MC30",
-            "MC30T",
-            "MC30S",
-            "MC30'S",
-            "MC-30",
-            "MC-30S",
-            "MC-30'S",
-        ],
-        message.content,
-    ):
-        time.sleep(1)
-        await message.add_reaction("\U0001f990")
-
-    if findIn(["HAIL SHRIMPBOT"], message.content):
-        await message.channel.send(
-            "His chitinous appendages reach down and grant "
-            + message.author.name
-            + " a pony.  :racehorse:",
-        )
+    if "shrimp" in triggered:
+        with shrimpperf.span("shrimp"):
+            reactions.schedule(message, "\U0001f990")
+
+    if "hail" in triggered:
+        with shrimpperf.span("hail"):
+            await message.channel.send(
+                "His chitinous appendages reach down and grant "
+                + message.author.name
+                + " a pony.  :racehorse:",
+            )
 
-    if findIn(["DATA FOR THE DATA GOD"], message.content):
-        await message.channel.send(
-            "Statistics, likelihoods, and probabilities mean everything to men, nothing to Shrimpbot.",
-        )
+    if "datagod" in triggered:
+        with shrimpperf.span("datagod"):
+            await message.channel.send(
+                "Statistics, likelihoods, and probabilities mean everything to men, nothing to Shrimpbot.",
+            )
 
     #   garmBot(message.content,bot)
-    if findIn(["GARM"], message.content):
-        time.sleep(1)
-        await message.add_reaction("\U000026ab")
-        await message.add_reaction("\U0001f534")
-        await message.add_reaction("\U0001f535")
-        await message.add_reaction("\U0001f525")
+    if "garm" in triggered:
+        with shrimpperf.span("garm"):
+            reactions.schedule(
+                message, "\U000026ab", "\U0001f534", "\U0001f535", "\U0001f525"
+            )
 
     #   foxBot
-    if findIn(["DOOKU"], message.content):
-        time.sleep(1)
-        await message.add_reaction("\U0001f98a")
+    if "dooku" in triggered:
+        with shrimpperf.span("dooku"):
+            reactions.schedule(message, "\U0001f98a")
 
     #   acronymExplain(message.content,bot)
-    if findIn(["!ACRONYM", "!ACRO", "!DEFINE"], message.content):
-        sent = False
-        for word in message.content.split():
-            word = word.strip(special_chars)
-            if word.upper() in acronym_dict:
-                await message.author.send(
-                    word.upper() + ": " + acronym_dict.get(word.upper(), "ERROR!"),
-                )
-                sent = True
-        if not sent:
-            await message.author.send(
-                "Sorry, it doesn't look like that is in my list.  Message Ardaedhel if you think it should be.",
-            )
+    if "acronym" in triggered:
+        with shrimpperf.span("acronym"):
+            async with Outbox(message.author) as out:
+                for acronym, definition in acronyms.lookup(message.content):
+                    out.add(acronym + ": " + definition)
+                if not out:
+                    out.add(
+                        "Sorry, it doesn't look like that is in my list.  Message Ardaedhel if you think it should be.",
+                    )
+                    suggestions = []
+                    for word in message.content.split():
+                        if not word.startswith("!"):
+                            suggestions += acronyms.suggest(word)
+                    if suggestions:
+                        out.add("Did you mean: {}?".format(", ".join(suggestions[:5])))
 
     #   acronymExplain(new syntax)
-    if equalsAny([key + "?" for key in acronym_dict.keys()], message.content):
-        sent = False
-        for word in message.content.split():
-            word = word.strip(special_chars)
-            if word.upper() in acronym_dict:
-                await message.author.send(
-                    "It looks like you're asking for the definition of "
-                    + word.upper()
-                    + ": "
-                    + acronym_dict.get(
-                        word.upper(),
-                        "Hi, sorry to bother you.  It looks like you have triggered an error in AcronymBot. Please pm Ardaedhel so he can fix it.",
-                    ),
-                )
+    asked_about = acronyms.question(message.content)
+    if asked_about:
+        with shrimpperf.span("acronym?"):
+            await message.author.send(
+                "It looks like you're asking for the definition of "
+                + asked_about
+                + ": "
+                + acronyms.define(asked_about),
+            )
 
     #   cardLookup(message.content,bot)
-    if findIn(["!LOOKUP", "!CARD"], message.content) and message.content.startswith(
-        "!"
-    ):
-        sent = False
-        searchterm = " ".join(
-            [x for x in message.content.split() if not x.startswith("!")]
-        )
-        for char in special_chars:
-            searchterm = searchterm.replace(
-                char, " "
-            )  # this is super hacky, lrn2regex, scrub
-        searchterm = searchterm.upper()
-        logging.info("Looking for {}".format(searchterm))
-
-        card_matches = searchFor(searchterm, cardlookup, match_threshold=140)
-
-        # maybe return SURPRISE MOTHERFUCKER instead of Surprise Attack
-        if searchterm == "SURPRISE ATTACK" and random.random() > 0.9:
-            try:
-                filepath = os.path.join(CARD_IMG_PATH, "surprisemofo.png")
-                logging.info(
-                    "Sending to channel {} - Surprise Motherfucker...".format(
-                        message.channel
+    card_lookup = "card" in triggered and message.content.startswith("!")
+    terms = card_terms(message.content) if card_lookup else []
+    if len(terms) > 1:
+        with shrimpperf.span("cards"):
+            await send_cards(message, terms)
+    elif card_lookup:
+        with shrimpperf.span("card"):
+            sent = False
+            searchterm = " ".join(
+                [x for x in message.content.split() if not x.startswith("!")]
+            )
+            searchterm = searchterm.translate(special_chars_to_spaces).upper()
+            logging.info("Looking for {}".format(searchterm))
+
+            with shrimpperf.span("card.search"):
+                card_matches = searchFor(searchterm, cardindex, match_threshold=140)
+
+            # maybe return SURPRISE MOTHERFUCKER instead of Surprise Attack
+            if searchterm == "SURPRISE ATTACK" and random.random() > 0.9:
+                try:
+                    filepath = os.path.join(CARD_IMG_PATH, "surprisemofo.png")
+                    logging.info(
+                        "Sending to channel {} - Surprise Motherfucker...".format(
+                            message.channel
+                        )
                     )
+                    await attachments.send(message.channel, filepath)
+                    sent = True
+                except:
+                    logging.info("Surprise Motherfucker broke.")
+            elif card_matches:
+                # Post the image to requested channel
+                filepath = card_variants.get(
+                    os.path.join(CARD_IMG_PATH, str(cardlookup[card_matches[0][0]]))
+                )
+                # logging.info("Looking in {}".format(filepath))
+                logging.info(
+                    "Sending to channel {} - {}".format(message.channel, filepath)
                 )
-                await message.channel.send(file=discord.File(filepath))
+                await attachments.send(message.channel, filepath)
                 sent = True
-            except:
-                logging.info("Surprise Motherfucker broke.")
-        elif card_matches:
-            # Post the image to requested channel
-            filepath = os.path.join(CARD_IMG_PATH, str(cardlookup[card_matches[0][0]]))
-            # logging.info("Looking in {}".format(filepath))
-            logging.info("Sending to channel {} - {}".format(message.channel, filepath))
-            await message.channel.send(file=discord.File(filepath))
-            sent = True
-        else:
-            logging.info("Didn't find it.  Failing over to wiki search.")
-            # logging.info(cardlookup)
+            else:
+                with shrimpperf.span("card.wiki"):
+                    logging.info("Didn't find it.  Failing over to wiki search.")
+                    # logging.info(cardlookup)
+
+                    wikisearchterm = " ".join(
+                        [x for x in message.content.split() if not x.startswith("!")]
+                    )
+                    wiki_img_url = await wiki.autoPopulateImage(wikisearchterm)
+                    if wiki_img_url:
+                        tmp_img_path = wiki_images.get(wiki_img_url)
+                        if tmp_img_path is None:
+                            wiki_img = await wiki.fetch(wiki_img_url)
+                            tmp_img_path = wiki_images.put(wiki_img_url, wiki_img)
+                            logging.info(
+                                "Wiki image retrieval - {} - {}".format(
+                                    wikisearchterm, wiki_img_url
+                                )
+                            )
 
-            wikisearchterm = " ".join(
-                [x for x in message.content.split() if not x.startswith("!")]
-            )
-            wiki_img_url = cardpop.autoPopulateImage(wikisearchterm)
-            if wiki_img_url:
-                tmp_img_path = CARD_IMG_PATH + "tmp/" + searchterm + ".png"
-                with requests.get(wiki_img_url, stream=True) as r:
-                    with open(tmp_img_path, "wb") as out_file:
-                        shutil.copyfileobj(r.raw, out_file)
                         logging.info(
-                            "Wiki image retrieval - {} - {}".format(
-                                wikisearchterm, wiki_img_url
+                            "Sending to channel {} - {}".format(
+                                message.channel, tmp_img_path
                             )
                         )
+                        await attachments.send(message.channel, tmp_img_path)
+                        if wiki_images.should_promote(wiki_img_url):
+                            await promote_wiki_image(wiki_img_url, wikisearchterm)
+                        # await bot.send_message(message.author, "I didn't have that image in my database, so I tried finding it on the Wiki.  Was this the picture you wanted?")
+                        # await bot.send_message(message.author, "[!yes/!no]")
+                        sent = True
+
+            if not sent:
+                async with Outbox(message.author) as out:
+                    out.add(
+                        "Sorry, it doesn't look like that is in my list.  Message Ardaedhel if you think it should be.",
+                    )
+                    out.add(
+                        "Please keep in mind that my search functionality is pretty rudimentary at the moment, so you might re-try using a different common name.  Generally I should recognize the full name as printed on the card, with few exceptions.",
+                    )
 
-                logging.info(
-                    "Sending to channel {} - {}".format(message.channel, tmp_img_path)
-                )
-                await message.channel.send(file=discord.File(tmp_img_path))
-                # await bot.send_message(message.author, "I didn't have that image in my database, so I tried finding it on the Wiki.  Was this the picture you wanted?")
-                # await bot.send_message(message.author, "[!yes/!no]")
-                sent = True
+    if "yes" in triggered:
+        pass
+
+    if "no" in triggered:
+        pass
 
-        if not sent:
+    #   listBuilder
+    if "listhelp" in triggered:
+        with shrimpperf.span("listhelp"):
             await message.author.send(
-                "Sorry, it doesn't look like that is in my list.  Message Ardaedhel if you think it should be.",
+                "To use a generated Vassal fleet:"
+                + "\n\t1. Click to download the .vlog file I provided you."
+                + "\n\t2. Start a new game in Vassal as normal."
+                + "\n\t3. Tools > Load Continuation... > Select the downloaded .vlog file > Open"
+                + "\n\t\t*note: accept the warning in the popup"
+                + "\n\t4. Click the 'Step forward through logfile' (shown) in the upper left corner of the Star Wars Armada Controls dialog box until your whole list is visible."
+                + "\n\nFor {} minutes after, you can change the list with '!vassal add <upgrade> to <ship>', '!vassal remove <card>' or '!vassal fix line <n> <new line>'.".format(
+                    FLEET_SESSION_TTL // 60
+                )
             )
-            await message.author.send(
-                "Please keep in mind that my search functionality is pretty rudimentary at the moment, so you might re-try using a different common name.  Generally I should recognize the full name as printed on the card, with few exceptions.",
+            await attachments.send(message.author, PWD + "/img/arrowed.png")
+
+    if len(message.content) >= 7:
+        if "vassal" in triggered and vassal_pool.is_full(message.author.id):
+            await message.channel.send(
+                "Hang on, I'm still working on your last list. Try again once it's done.",
             )
+        elif "vassal" in triggered:
+            with shrimpperf.span("vassal"):
+                job_dir = tempfile.mkdtemp(prefix="shrimpbot-vassal-")
+                try:
+                    await message.channel.send("Generating a VASSAL list, hang on...")
+
+                    liststr = message.content.strip()[7::].strip()
+                    if not liststr:
+                        raise Exception("List not found. Did you forget the list?")
+                    guid_hash = hashlib.new("md5")
+                    guid_hash.update(str(time.time()).encode())
+                    guid = guid_hash.hexdigest()[0:16]
+
+                    # the conversion is all sqlite, regex, XOR and zip work, so it
+                    # runs on the worker pool rather than blocking every guild
+                    edit = vassal.parse_edit(liststr)
+                    session = fleet_sessions.get(message.author.id)
+                    if edit is None:
+                        session = vassal.FleetSession()
+                        success, last_item = await vassal_pool.run(
+                            message.author.id,
+                            vassal.build_vlog,
+                            liststr,
+                            guid,
+                            job_dir,
+                            PWD,
+                            session,
+                        )
+                        if success:
+                            fleet_sessions.put(message.author.id, session)
+                    elif session is None:
+                        success, last_item = (
+                            False,
+                            "I don't have a list of yours to change any more. Send me the whole list again.",
+                        )
+                    else:
+                        with shrimpperf.span("vassal.edit"):
+                            success, last_item = await vassal_pool.run(
+                                message.author.id,
+                                vassal.edit_vlog,
+                                session,
+                                edit,
+                                guid,
+                                job_dir,
+                                PWD,
+                            )
 
-    if findIn(["!YES"], message.content):
-        pass
+                    if not success and edit is not None:
+                        # an edit that doesn't apply is the user's to fix
+                        await message.channel.send(last_item)
 
-    if findIn(["!NO"], message.content):
-        pass
+                    elif not success:
+                        logging.info("[!] LISTBUILDER ERROR | {}".format(last_item))
+                        owner_errors.report(
+                            "[!] LISTBUILDER ERROR | {}".format(last_item),
+                            "List: \n{}".format(message.content),
+                            poc=message.author.name,
+                        )
+                        async with Outbox(message.channel) as out:
+                            out.add(
+                                "Sorry, there was a list parsing error. I have reported it to Ardaedhel to fix it.",
+                            )
+                            out.add(
+                                "Details - My best guess is, the error was in or near this line: ",
+                            )
+                            out.add(last_item)
 
-    #   listBuilder
-    if findIn(["!listhelp"], message.content):
-        await message.author.send(
-            "To use a generated Vassal fleet:"
-            + "\n\t1. Click to download the .vlog file I provided you."
-            + "\n\t2. Start a new game in Vassal as normal."
-            + "\n\t3. Tools > Load Continuation... > Select the downloaded .vlog file > Open"
-            + "\n\t\t*note: accept the warning in the popup"
-            + "\n\t4. Click the 'Step forward through logfile' (shown) in the upper left corner of the Star Wars Armada Controls dialog box until your whole list is visible."
-        )
-        await message.author.send(file=discord.File(PWD + "/img/arrowed.png"))
+                    else:
+                        await message.channel.send(file=discord.File(last_item))
+                        await message.author.send(
+                            "For usage instructions, pm me '!listhelp'."
+                        )
+                    del guid_hash
 
-    if len(message.content) >= 7:
-        if findIn(["!VASSAL"], message.content):
-            try:
-                await message.channel.send("Generating a VASSAL list, hang on...")
-
-                liststr = message.content.strip()[7::].strip()
-                if not liststr:
-                    raise Exception("List not found. Did you forget the list?")
-                guid_hash = hashlib.new("md5")
-                guid_hash.update(str(time.time()).encode())
-                guid = guid_hash.hexdigest()[0:16]
-
-                listbuilderpath = os.path.dirname(__file__)
-                workingpath = os.path.join(listbuilderpath, "working/")
-                outpath = os.path.join(listbuilderpath, "out/")
-                vlbdirpath = os.path.join(listbuilderpath, "vlb/")
-                vlbfilepath = os.path.join(vlbdirpath, guid + ".vlb")
-                vlogfilepath = os.path.join(outpath, guid + ".vlog")
-                databasepath = os.path.join(listbuilderpath, "vlb_pieces.vlo")
-
-                listbuilder_config = listbuilder.get_default_config()
-                listbuilder_config.pwd = os.path.dirname(__file__)
-                listbuilder_config.vlog_path = vlogfilepath
-                listbuilder_config.vlb_path = vlbfilepath
-                listbuilder_config.working_dir = workingpath
-                listbuilder_config.db_path = databasepath
-                listbuilder_config.fleet = liststr
-
-                success, last_item = listbuilder.import_from_list(listbuilder_config)
-
-                if not success:
-                    logging.info("[!] LISTBUILDER ERROR | {}".format(last_item))
-                    await bot.get_user(BOT_OWNER_ID).send(
-                        "[!] LISTBUILDER ERROR | {}".format(last_item)
-                    )
-                    await bot.get_user(BOT_OWNER_ID).send(
-                        "POC: {}".format(message.author.name)
-                    )
-                    await bot.get_user(BOT_OWNER_ID).send(
-                        "List: \n{}".format(message.content)
-                    )
+                except UserQueueFull as inst:
+                    logging.info(inst)
                     await message.channel.send(
-                        "Sorry, there was a list parsing error. I have reported it to Ardaedhel to fix it.",
+                        "Hang on, I'm still working on your last list. Try again once it's done.",
                     )
-                    await message.channel.send(
-                        "Details - My best guess is, the error was in or near this line: ",
+
+                except Exception as inst:
+                    logging.info(inst)
+                    logging.info(*inst.args)
+                    owner_errors.report(
+                        "[!] LISTBUILDER ERROR | {}".format(inst),
+                        "Details - Runtime Error:",
+                        inst,
+                        poc=message.author.name,
                     )
-                    await message.channel.send(last_item)
 
-                else:
-                    listbuilder.export_to_vlog(listbuilder_config)
-                    await message.channel.send(file=discord.File(vlogfilepath))
-                    await message.author.send(
-                        "For usage instructions, pm me '!listhelp'."
+                    await message.channel.send(
+                        "Sorry, there was an application error. I have reported it to Ardaedhel to fix it.",
                     )
-                del guid_hash
 
-            except Exception as inst:
-                logging.info(inst)
-                logging.info(*inst.args)
-                await bot.get_user(BOT_OWNER_ID).send(
-                    "[!] LISTBUILDER ERROR | {}".format(inst)
-                )
-                await bot.get_user(BOT_OWNER_ID).send("Details - Runtime Error:")
-                await bot.get_user(BOT_OWNER_ID).send(inst)
+                finally:
+                    shutil.rmtree(job_dir, ignore_errors=True)
 
-                await message.channel.send(
-                    "Sorry, there was an application error. I have reported it to Ardaedhel to fix it.",
+    if "testy" in triggered:
+        with shrimpperf.span("testy"):
+            async with Outbox(message.channel) as out:
+                out.add(
+                    "Bananas.",
                 )
+                out.add(str(bot.guilds))
 
-    if findIn(["!testy"], message.content):
-        await message.channel.send(
-            "Bananas.",
-        )
-        await message.channel.send(str(bot.guilds))
 
+if __name__ == "__main__":
+
+    with open(TOKEN_PATH) as t:
+        BOT_TOKEN = t.read().strip()
 
-bot.run(BOT_TOKEN)
+    try:
+        bot.run(BOT_TOKEN)
+    finally:
+        wiki_images.flush()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+"""
+shrimplog.py
+
+Queue-based logging shared by the bot, the API, cardpop and the listbuilder.
+
+Every module used to attach its own WatchedFileHandler with logging.basicConfig,
+so every log call formatted, stat()ed and flushed the log file synchronously on
+whatever thread made it, including the bot's event loop.  configure() instead
+puts a QueueHandler on the root logger and does the file work on a background
+QueueListener thread, writing records in batches and only checking for log
+rotation once per batch.
+
+Chat traffic is logged as structured records (see log_chat()) and rendered in
+the same "[time | guild | channel | author] message" form as before, so the
+disclosure in the README still holds.  Those records can optionally be sampled.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import time
+
+_FLUSH = object()
+
+_listener = None
+_sampler = None
+
+
+class ChatSampler(logging.Filter):
+    """Keeps only rate (0.0-1.0) of chat message records; everything else passes."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, "chat", False) or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class ShrimpFormatter(logging.Formatter):
+    """The basicConfig format, with chat records rendered as
+    [ctime | guild | channel | author] message."""
+
+    def __init__(self):
+        super().__init__(logging.BASIC_FORMAT)
+
+    def formatMessage(self, record):
+        if getattr(record, "chat", False):
+            record.message = "[{} | {} | {} | {}] {}".format(
+                time.ctime(record.created),
+                record.guild,
+                record.channel,
+                record.author,
+                record.message,
+            )
+        return super().formatMessage(record)
+
+
+class BatchedFileHandler(logging.handlers.WatchedFileHandler):
+    """A WatchedFileHandler that writes records without flushing each one, and
+    only checks whether the file was rotated when it's flushed."""
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            super().flush()
+            self.reopenIfNeeded()
+        finally:
+            self.release()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """A QueueListener that flushes its handlers every batch_size records, or
+    when the queue has been quiet for flush_interval seconds."""
+
+    def __init__(self, log_queue, *handlers, batch_size=100, flush_interval=1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = 0
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get(block, timeout=self.flush_interval)
+        except queue.Empty:
+            return _FLUSH
+
+    def handle(self, record):
+        if record is not _FLUSH:
+            super().handle(record)
+            self.pending += 1
+            if self.pending < self.batch_size:
+                return
+        if self.pending:
+            for handler in self.handlers:
+                handler.flush()
+            self.pending = 0
+
+    def stop(self):
+        super().stop()
+        self.handle(_FLUSH)
+
+
+def configure(log_path, chat_sample_rate=None, batch_size=100, flush_interval=1.0):
+    """Send all logging through a queue to log_path on a background thread.
+
+    Like logging.basicConfig, this does nothing if the root logger already has
+    handlers, so the first module to call it (or basicConfig) picks the log file.
+    chat_sample_rate is honored on every call, though."""
+
+    global _listener, _sampler
+
+    if _sampler is None:
+        _sampler = ChatSampler()
+    if chat_sample_rate is not None:
+        _sampler.rate = chat_sample_rate
+
+    root = logging.getLogger()
+    if _listener is not None or root.handlers:
+        return _listener
+
+    file_handler = BatchedFileHandler(log_path)
+    file_handler.setFormatter(ShrimpFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(_sampler)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+
+    _listener = BatchingQueueListener(
+        log_queue, file_handler, batch_size=batch_size, flush_interval=flush_interval
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def log_chat(guild, channel, author, content):
+    """Log one chat message as a structured record."""
+
+    logging.info(
+        content,
+        extra={
+            "chat": True,
+            "guild": str(guild),
+            "channel": str(channel),
+            "author": str(author),
+        },
+    )
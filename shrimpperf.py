@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""
+shrimpperf.py
+
+In-memory latency histograms shared by the bot and the listbuilder.
+
+Code to be measured is wrapped in a span, which records how long the block
+took (awaits included) under a name:
+
+    with shrimpperf.span("card.search"):
+        ...
+
+Each name keeps a count, a total and the most recent samples, which is enough
+for p50/p95/p99 without the memory growing over a long uptime.  Spans can be
+recorded from worker threads, so the listbuilder's stages show up alongside the
+bot's handlers.
+"""
+
+import collections
+import contextlib
+import threading
+import time
+
+
+def percentile(values, fraction):
+    """The value fraction (0.0-1.0) of the way through values, by rank."""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Histogram:
+    """Count and total of every sample, and the last keep samples for the
+    percentiles."""
+
+    def __init__(self, keep=1000):
+        self.count = 0
+        self.total = 0.0
+        self.samples = collections.deque(maxlen=keep)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def percentiles(self, *fractions):
+        samples = list(self.samples)
+        return [percentile(samples, fraction) for fraction in fractions]
+
+
+class Timings:
+    """A Histogram per span name."""
+
+    def __init__(self, keep=1000):
+        self.keep = keep
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.since = time.time()
+
+    def record(self, name, seconds):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(self.keep)
+            self.histograms[name].add(seconds)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.since = time.time()
+
+    def summary(self):
+        """One line per span name, in name order, so stages sort under their
+        handler."""
+
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        lines = ["since {}:".format(time.ctime(self.since))]
+        for name, histogram in histograms:
+            p50, p95, p99 = histogram.percentiles(0.50, 0.95, 0.99)
+            lines.append(
+                "{}: {} calls, p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms".format(
+                    name, histogram.count, p50 * 1000, p95 * 1000, p99 * 1000
+                )
+            )
+        if not histograms:
+            lines.append("nothing timed yet")
+        return lines
+
+
+timings = Timings()
+
+
+def span(name):
+    """Time a block into the shared timings."""
+    return timings.span(name)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from lib_shrimpbot.acronyms import AcronymEngine
+
+
+class AcronymEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = AcronymEngine(
+            {
+                "ACM": "Assault Concussion Missiles upgrade card.",
+                "ACMS": "Assault Concussion Missiles upgrade card.",
+                "APT": "Assault Proton Torpedoes upgrade card.",
+                "BT": "Boarding Troopers upgrade card.",
+            }
+        )
+
+    def test_from_file(self):
+        engine = AcronymEngine.from_file("acronyms.txt")
+        self.assertIn("acm", engine)
+        self.assertGreater(len(engine), 100)
+
+    def test_lookup_batches_every_match(self):
+        self.assertEqual(
+            self.engine.lookup("!acro apt, bt and apt again"),
+            [
+                ("APT", "Assault Proton Torpedoes upgrade card."),
+                ("BT", "Boarding Troopers upgrade card."),
+            ],
+        )
+
+    def test_question(self):
+        self.assertEqual(self.engine.question("bt?"), "BT")
+        self.assertIsNone(self.engine.question("what is bt?"))
+        self.assertIsNone(self.engine.question("bt"))
+
+    def test_suggest(self):
+        self.assertEqual(self.engine.suggest("ACX"), ["ACM", "ACMS"])
+        self.assertEqual(self.engine.suggest("AP"), ["APT"])
+        self.assertEqual(self.engine.suggest("ZZZ"), [])
+
+    def test_remove_from_copy(self):
+        engine = self.engine.copy()
+        engine.remove("ACMS")
+        engine.remove("BT")
+        self.assertEqual(engine.suggest("ACX"), ["ACM"])
+        self.assertEqual(engine.suggest("B"), [])
+        self.assertIn("BT", self.engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
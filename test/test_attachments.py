@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import itertools
+import json
+import os
+import tempfile
+import time
+import types
+import unittest
+
+_ids = itertools.count(1)
+
+
+def cdn_url(name, expires):
+    return "https://cdn.discordapp.com/attachments/1/{}/{}?ex={:x}&is=0&hm=abc".format(
+        next(_ids), name, int(expires)
+    )
+
+
+class FakeMessage:
+    def __init__(self, urls):
+        self.attachments = [types.SimpleNamespace(url=url) for url in urls]
+
+
+class FakeChannel:
+    """Records every send; uploads come back with fresh hour-long URLs.  The
+    first fail_embeds sends that carry embeds are refused."""
+
+    def __init__(self, fail_embeds=0):
+        self.sent = []
+        self.fail_embeds = fail_embeds
+
+    async def send(self, embed=None, embeds=None, file=None, files=None):
+        import discord
+
+        embeds = embeds or ([embed] if embed else [])
+        files = files or ([file] if file else [])
+        if embeds and self.fail_embeds:
+            self.fail_embeds -= 1
+            raise discord.HTTPException(
+                types.SimpleNamespace(status=400, reason="Bad Request"), "dead"
+            )
+        self.sent.append(([e.image.url for e in embeds], [f.filename for f in files]))
+        return FakeMessage(cdn_url(f.filename, time.time() + 3600) for f in files)
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class AttachmentCacheTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        from lib_shrimpbot.attachments import AttachmentCache
+
+        self.AttachmentCache = AttachmentCache
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "attachments.json")
+        self.cache = AttachmentCache(self.cache_path, margin=60)
+        self.images = []
+        for name in ("ackbar.png", "motti.png"):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "wb") as img:
+                img.write(name.encode())
+            self.images.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_expiry(self):
+        self.assertEqual(
+            self.AttachmentCache.expiry("https://cdn/x.png?ex=65a1b2c3&is=0"),
+            0x65A1B2C3,
+        )
+        self.assertIsNone(self.AttachmentCache.expiry("https://cdn/x.png"))
+        self.assertIsNone(self.AttachmentCache.expiry("https://cdn/x.png?ex=zz"))
+
+    def test_only_live_urls_are_reused(self):
+        ackbar, motti = self.images
+        live = cdn_url("ackbar.png", time.time() + 3600)
+        self.cache.put(ackbar, live)
+        self.assertEqual(self.cache.get(ackbar), live)
+
+        # inside the margin counts as expired
+        self.cache.put(ackbar, cdn_url("ackbar.png", time.time() + 30))
+        self.assertIsNone(self.cache.get(ackbar))
+
+        self.cache.put(motti, "https://cdn.discordapp.com/attachments/1/2/motti.png")
+        self.assertIsNone(self.cache.get(motti))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_persists(self):
+        ackbar = self.images[0]
+        # past the default hour's margin, for the reloaded cache
+        url = cdn_url("ackbar.png", time.time() + 7200)
+        self.cache.put(ackbar, url)
+        with open(self.cache_path) as cache:
+            self.assertEqual([e["url"] for e in json.load(cache).values()], [url])
+        self.assertEqual(self.AttachmentCache(self.cache_path).get(ackbar), url)
+
+    def test_forget(self):
+        ackbar = self.images[0]
+        self.cache.put(ackbar, cdn_url("ackbar.png", time.time() + 3600))
+        self.cache.forget(ackbar)
+        self.assertIsNone(self.cache.get(ackbar))
+        self.assertIsNone(self.AttachmentCache(self.cache_path).get(ackbar))
+
+    async def test_send_uploads_then_reuses(self):
+        ackbar = self.images[0]
+        channel = FakeChannel()
+        await self.cache.send(channel, ackbar)
+        await self.cache.send(channel, ackbar)
+        self.assertEqual(channel.sent[0], ([], ["ackbar.png"]))
+        self.assertEqual(channel.sent[1], ([self.cache.get(ackbar)], []))
+
+    async def test_send_uploads_again_when_embed_fails(self):
+        ackbar = self.images[0]
+        stale = cdn_url("ackbar.png", time.time() + 3600)
+        self.cache.put(ackbar, stale)
+        channel = FakeChannel(fail_embeds=1)
+        await self.cache.send(channel, ackbar)
+        self.assertEqual(channel.sent, [([], ["ackbar.png"])])
+        self.assertNotEqual(self.cache.get(ackbar), stale)
+
+    async def test_send_uploads_when_url_has_no_expiry(self):
+        ackbar = self.images[0]
+        # an entry written before URLs were checked for an expiry
+        self.cache.entries[self.cache.digest(ackbar)] = {
+            "url": "https://cdn.discordapp.com/attachments/1/2/ackbar.png",
+            "expires": None,
+        }
+        channel = FakeChannel()
+        await self.cache.send(channel, ackbar)
+        self.assertEqual(channel.sent, [([], ["ackbar.png"])])
+
+    async def test_send_many_mixes_embeds_and_uploads(self):
+        ackbar, motti = self.images
+        live = cdn_url("ackbar.png", time.time() + 3600)
+        self.cache.put(ackbar, live)
+        channel = FakeChannel()
+        await self.cache.send_many(channel, [ackbar, motti])
+        self.assertEqual(channel.sent, [([live], ["motti.png"])])
+
+        # motti's upload is remembered, so both go as embeds next time
+        await self.cache.send_many(channel, [ackbar, motti])
+        self.assertEqual(channel.sent[1], ([live, self.cache.get(motti)], []))
+        with open(self.cache_path) as cache:
+            self.assertEqual(len(json.load(cache)), 2)
+
+    async def test_send_many_uploads_everything_when_embeds_fail(self):
+        ackbar, motti = self.images
+        stale = cdn_url("ackbar.png", time.time() + 3600)
+        self.cache.put(ackbar, stale)
+        channel = FakeChannel(fail_embeds=1)
+        await self.cache.send_many(channel, [ackbar, motti])
+        self.assertEqual(channel.sent, [([], ["ackbar.png", "motti.png"])])
+        self.assertNotEqual(self.cache.get(ackbar), stale)
+        self.assertIsNotNone(self.cache.get(motti))
+
+    async def test_send_many_upload_failure_is_raised(self):
+        import discord
+
+        channel = FakeChannel()
+
+        async def refuse(**kwargs):
+            raise discord.HTTPException(
+                types.SimpleNamespace(status=413, reason="Too Large"), "big"
+            )
+
+        channel.send = refuse
+        with self.assertRaises(discord.HTTPException):
+            await self.cache.send_many(channel, self.images)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
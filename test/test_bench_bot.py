@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import asyncio
+import importlib.util
+import unittest
+
+import bench_bot
+import shrimpperf
+
+
+class CorpusTestCase(unittest.TestCase):
+    def test_text_and_json_lines(self):
+        corpus = bench_bot.read_corpus(
+            [
+                "!card ackbar\n",
+                "\n",
+                '{"content": "ACM?", "author": "truthiness", "channel": "rules"}\n',
+            ]
+        )
+        self.assertEqual(
+            corpus,
+            [
+                ("ardaedhel", "general", "Armada", "!card ackbar"),
+                ("truthiness", "rules", "Armada", "ACM?"),
+            ],
+        )
+
+
+class FakeDiscordTestCase(unittest.TestCase):
+    def test_sends_are_recorded(self):
+        recorder = bench_bot.Recorder()
+        guild = bench_bot.FakeGuild("Armada")
+        channel = bench_bot.FakeChannel("general", guild, recorder)
+        user = bench_bot.FakeUser("ardaedhel", recorder)
+
+        async def main():
+            await channel.send("one")
+            return await user.send(file=object())
+
+        sent = asyncio.run(main())
+        self.assertEqual([s[0] for s in recorder.sent], [channel, user])
+        self.assertEqual(recorder.sent[0][1], "one")
+        # uploads come back with an expiring attachment URL, like Discord's
+        self.assertIn("?ex=", sent.attachments[0].url)
+        self.assertEqual(guild.channels, [channel])
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class HarnessTestCase(unittest.TestCase):
+    def test_replay(self):
+        import discord
+        import shrimpbot
+
+        harness = bench_bot.Harness(shrimpbot, channel_type=discord.ChannelType.text)
+        self.addCleanup(harness.close)
+        shrimpperf.timings.reset()
+        corpus = bench_bot.read_corpus(["!acro ACM", "I love shrimp"])
+        elapsed = asyncio.run(harness.replay(corpus, repeat=3))
+
+        self.assertEqual(len(harness.messages), 6)
+        self.assertEqual(len(harness.recorder.sent), 3)
+        self.assertEqual(sum(len(m.reactions) for m in harness.messages), 3)
+        self.assertIn("6 messages in", harness.report(elapsed))
+        self.assertEqual(shrimpperf.timings.histograms["acronym"].count, 3)
+
+    def test_multi_card_lookup_is_one_message(self):
+        import discord
+        import shrimpbot
+
+        harness = bench_bot.Harness(shrimpbot, channel_type=discord.ChannelType.text)
+        self.addCleanup(harness.close)
+        corpus = bench_bot.read_corpus(
+            ["!card admiral ackbar, intel officer, zzzzzz", "!card admiral ackbar"]
+        )
+        asyncio.run(harness.replay(corpus))
+
+        (channel, _, first), (user, missed, _), (_, _, second) = harness.recorder.sent
+        self.assertEqual(len(first["files"]), 2)
+        self.assertIn("zzzzzz", missed)
+        # the second lookup reuses the first upload's URL
+        self.assertEqual(len(second.get("embeds", [second.get("embed")])), 1)
+
+    def test_duplicate_list_gets_a_reply(self):
+        import discord
+        import shrimpbot
+
+        harness = bench_bot.Harness(shrimpbot, channel_type=discord.ChannelType.text)
+        self.addCleanup(harness.close)
+        message = harness.message("ardaedhel", "general", "Armada", "!vassal x")
+        # as if the same list were still being converted
+        keys = shrimpbot.request_keys(message, {"vassal"})
+        with shrimpbot.in_flight.claim(keys):
+            asyncio.run(harness.dispatch(message))
+
+        self.assertFalse(harness.errors)
+        self.assertEqual(
+            [content for _, content, _ in harness.recorder.sent],
+            ["Hang on, I'm already working on that list. It'll be along shortly."],
+        )
+
+    def test_close_puts_shrimpbot_back(self):
+        import discord
+        import shrimpbot
+
+        before = (
+            shrimpbot.wiki,
+            shrimpbot.attachments,
+            shrimpbot.rate_limits,
+            shrimpbot.reactions.delay,
+        )
+        with bench_bot.Harness(shrimpbot, channel_type=discord.ChannelType.text):
+            self.assertIsInstance(shrimpbot.wiki, bench_bot.NoWiki)
+            self.assertEqual(shrimpbot.reactions.delay, 0)
+        self.assertEqual(
+            (
+                shrimpbot.wiki,
+                shrimpbot.attachments,
+                shrimpbot.rate_limits,
+                shrimpbot.reactions.delay,
+            ),
+            before,
+        )
+        self.assertNotIn("process_commands", vars(shrimpbot.bot))
+
+
+if __name__ == "__main__":
+    unittest.main()
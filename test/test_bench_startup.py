@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import bench_startup
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       476 |        476 |     lib_listbuilder.definitions
+import time:       879 |       1355 |   lib_listbuilder.fleet
+import time:      1049 |       2404 | listbuilder
+"""
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            bench_startup.parse_importtime(SAMPLE),
+            [
+                ("lib_listbuilder.definitions", 476, 476, 2),
+                ("lib_listbuilder.fleet", 879, 1355, 1),
+                ("listbuilder", 1049, 2404, 0),
+            ],
+        )
+
+    def test_vassal_defers_listbuilder(self):
+        _, entries = bench_startup.measure("lib_shrimpbot.vassal")
+        names = [entry[0] for entry in entries]
+        self.assertIn("lib_shrimpbot.vassal", names)
+        self.assertNotIn("listbuilder", names)
+        self.assertNotIn("site", names)
+
+    def test_missing_module(self):
+        with self.assertRaises(RuntimeError):
+            bench_startup.measure("no_such_module")
+
+
+if __name__ == "__main__":
+    unittest.main()
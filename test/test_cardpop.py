@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from aiohttp import web
+
+import cardpop
+
+
+class FakeMediaWiki:
+    """Just enough of the MediaWiki query API to answer cardpop's lookups."""
+
+    pages = ["General Dodonna", "Rules Reference", "Admiral Motti"]
+
+    def __init__(self):
+        self.calls = 0
+        self.app = web.Application()
+        self.app.router.add_get("/api.php", self.api)
+        self.app.router.add_get("/images/general-dodonna.png", self.image)
+
+    async def api(self, request):
+        self.calls += 1
+        params = request.query
+        if params.get("list") == "allpages":
+            # two pages per batch, to exercise continuation
+            start = int(params.get("apcontinue", 0))
+            batch = {
+                "query": {
+                    "allpages": [{"title": t} for t in self.pages[start : start + 2]]
+                }
+            }
+            if start + 2 < len(self.pages):
+                batch["continue"] = {"apcontinue": str(start + 2)}
+            return web.json_response(batch)
+        if params.get("list") == "search":
+            if "dodonna" in params["srsearch"].lower():
+                return web.json_response(
+                    {"query": {"search": [{"title": "General Dodonna"}]}}
+                )
+            return web.json_response({"query": {"search": []}})
+        if params.get("prop") == "images":
+            if params["titles"] == "Rules Reference":
+                return web.json_response(
+                    {
+                        "query": {
+                            "pages": {"2": {"images": [{"title": "File:Logo.png"}]}}
+                        }
+                    }
+                )
+            return web.json_response(
+                {
+                    "query": {
+                        "pages": {
+                            "1": {
+                                "title": params["titles"],
+                                "images": [
+                                    {"title": "File:Rebel-logo.png"},
+                                    {"title": "File:General-dodonna.png"},
+                                ],
+                            }
+                        }
+                    }
+                }
+            )
+        if params.get("prop") == "imageinfo":
+            url = str(request.url.with_path("/images/general-dodonna.png"))
+            return web.json_response(
+                {
+                    "query": {
+                        "pages": {
+                            "-1": {"imageinfo": [{"url": url + "/revision/latest"}]}
+                        }
+                    }
+                }
+            )
+        return web.json_response({}, status=400)
+
+    async def image(self, request):
+        return web.Response(body=b"\x89PNG fake", content_type="image/png")
+
+
+class FakeMediaWikiTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.wiki = FakeMediaWiki()
+        self.runner = web.AppRunner(self.wiki.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = "http://127.0.0.1:{}".format(port)
+        self.client = cardpop.WikiClient(api_url=self.base_url + "/api.php")
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+
+class WikiClientTestCase(FakeMediaWikiTestCase):
+
+    async def test_lookup(self):
+        url = await self.client.autoPopulateImage("general dodonna")
+        self.assertEqual(url, self.base_url + "/images/general-dodonna.png")
+        self.assertEqual(await self.client.fetch(url), b"\x89PNG fake")
+
+    async def test_results_are_cached(self):
+        await self.client.autoPopulateImage("general dodonna")
+        calls = self.wiki.calls
+        await self.client.autoPopulateImage("General  Dodonna")
+        self.assertEqual(self.wiki.calls, calls)
+
+    async def test_list_pages(self):
+        titles = [title async for title in self.client.listPages()]
+        self.assertEqual(titles, FakeMediaWiki.pages)
+
+    async def test_misses_are_cached(self):
+        self.assertFalse(await self.client.autoPopulateImage("not a card"))
+        self.assertFalse(await self.client.autoPopulateImage("not a card"))
+        self.assertEqual(self.wiki.calls, 1)
+
+
+class ImageCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "tmp")
+        self.cache = cardpop.ImageCache(self.cache_dir, max_bytes=10, promote_after=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_content_addressed(self):
+        first = self.cache.put("http://wiki/a.png", b"same")
+        second = self.cache.put("http://wiki/b.png", b"same")
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.size(), 4)
+        self.assertEqual(self.cache.get("http://wiki/a.png"), first)
+
+    def test_lru_eviction(self):
+        self.cache.put("http://wiki/a.png", b"aaaa")
+        self.cache.put("http://wiki/b.png", b"bbbb")
+        self.cache.get("http://wiki/a.png")
+        self.cache.put("http://wiki/c.png", b"cccc")
+        self.assertIsNone(self.cache.get("http://wiki/b.png"))
+        self.assertIsNotNone(self.cache.get("http://wiki/a.png"))
+
+    def test_index_persists(self):
+        path = self.cache.put("http://wiki/a.png", b"aaaa")
+        reopened = cardpop.ImageCache(self.cache_dir)
+        self.assertEqual(reopened.get("http://wiki/a.png"), path)
+
+    def test_promotion(self):
+        table = os.path.join(self.tmp.name, "cards.txt")
+        with open(table, "w") as t:
+            t.write("w1_com_admiral-motti.png;ADMIRAL MOTTI")
+
+        self.cache.put("http://wiki/dodonna.png", b"png")
+        self.assertFalse(self.cache.should_promote("http://wiki/dodonna.png"))
+        self.cache.get("http://wiki/dodonna.png")
+        self.assertTrue(self.cache.should_promote("http://wiki/dodonna.png"))
+
+        filename = self.cache.promote(
+            "http://wiki/dodonna.png", "GENERAL DODONNA", self.tmp.name, table
+        )
+        self.assertEqual(filename, "_wiki_general-dodonna.png")
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, filename)))
+        with open(table) as t:
+            self.assertEqual(t.read().split("\n")[-1], filename + ";GENERAL DODONNA")
+        self.assertIsNone(self.cache.get("http://wiki/dodonna.png"))
+
+    def test_hits_are_saved_in_batches(self):
+        now = [0.0]
+        cache = cardpop.ImageCache(
+            self.cache_dir, save_interval=60, clock=lambda: now[0]
+        )
+        cache.put("http://wiki/a.png", b"aaaa")
+
+        def saved_hits():
+            return cardpop.ImageCache(self.cache_dir).entries["http://wiki/a.png"][
+                "hits"
+            ]
+
+        cache.get("http://wiki/a.png")
+        cache.get("http://wiki/a.png")
+        self.assertEqual(saved_hits(), 1)
+        self.assertTrue(cache.should_promote("http://wiki/a.png"))
+
+        now[0] = 60
+        cache.get("http://wiki/a.png")
+        self.assertEqual(saved_hits(), 4)
+
+        cache.get("http://wiki/a.png")
+        cache.flush()
+        self.assertEqual(saved_hits(), 5)
+        self.assertFalse(cache.dirty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import asyncio
+import importlib.util
+import os
+import types
+import unittest
+
+
+class FakeAttachments:
+    def __init__(self):
+        self.sent = []
+
+    async def send_many(self, channel, filepaths):
+        self.sent.append(list(filepaths))
+
+
+class FakeUser:
+    def __init__(self):
+        self.dms = []
+
+    async def send(self, content):
+        self.dms.append(content)
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class CardTermsTestCase(unittest.TestCase):
+    def setUp(self):
+        import shrimpbot
+
+        self.card_terms = shrimpbot.card_terms
+
+    def test_single_name(self):
+        self.assertEqual(self.card_terms("!card admiral ackbar"), ["admiral ackbar"])
+
+    def test_comma_list(self):
+        self.assertEqual(
+            self.card_terms("!card ackbar, motti ,, garm"),
+            ["ackbar", "motti", "garm"],
+        )
+
+    def test_card_name_with_a_comma(self):
+        self.assertEqual(
+            self.card_terms("!card All Fighters, Follow Me!"),
+            ["All Fighters, Follow Me!"],
+        )
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class SendCardsTestCase(unittest.TestCase):
+    def setUp(self):
+        import shrimpbot
+
+        self.shrimpbot = shrimpbot
+        self.saved = shrimpbot.attachments
+        shrimpbot.attachments = self.attachments = FakeAttachments()
+        self.author = FakeUser()
+        self.message = types.SimpleNamespace(channel="#general", author=self.author)
+
+    def tearDown(self):
+        self.shrimpbot.attachments = self.saved
+
+    def send(self, terms):
+        asyncio.run(self.shrimpbot.send_cards(self.message, terms))
+
+    def sent_cards(self):
+        return [
+            [os.path.basename(filepath) for filepath in message]
+            for message in self.attachments.sent
+        ]
+
+    def test_one_message_for_every_card(self):
+        self.send(["admiral ackbar", "admiral motti"])
+        self.assertEqual(
+            self.sent_cards(),
+            [["w2_com_admiral-ackbar.png", "w1_com_admiral-motti.png"]],
+        )
+        self.assertEqual(self.author.dms, [])
+
+    def test_same_card_is_sent_once(self):
+        self.send(["admiral ackbar", "ADMIRAL ACKBAR", "admiral motti"])
+        self.assertEqual(
+            self.sent_cards(),
+            [["w2_com_admiral-ackbar.png", "w1_com_admiral-motti.png"]],
+        )
+
+    def test_misses_are_dmed(self):
+        self.send(["admiral ackbar", "zzxqv"])
+        self.assertEqual(self.sent_cards(), [["w2_com_admiral-ackbar.png"]])
+        self.assertEqual(len(self.author.dms), 1)
+        self.assertIn("couldn't find: zzxqv", self.author.dms[0])
+
+    def test_overflow_is_dmed(self):
+        limit = self.shrimpbot.MAX_CARDS_PER_MESSAGE
+        terms = ["admiral ackbar"] * limit + ["admiral motti", "garm bel iblis"]
+        self.send(terms)
+        # only the first limit terms are looked up
+        self.assertEqual(self.sent_cards(), [["w2_com_admiral-ackbar.png"]])
+        self.assertEqual(len(self.author.dms), 1)
+        self.assertIn(
+            "I can only send {} cards at a time, so I skipped: "
+            "admiral motti, garm bel iblis.".format(limit),
+            self.author.dms[0],
+        )
+
+    def test_nothing_found_sends_nothing_to_the_channel(self):
+        self.send(["zzxqv"])
+        self.assertEqual(self.attachments.sent, [])
+        self.assertEqual(len(self.author.dms), 1)
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class PromoteWikiImageTestCase(unittest.TestCase):
+    def setUp(self):
+        import shrimpbot
+
+        self.shrimpbot = shrimpbot
+        self.saved = (
+            shrimpbot.wiki,
+            shrimpbot.wiki_images,
+            shrimpbot.cardlookup,
+            shrimpbot.cardindex,
+        )
+        self.promoted = []
+
+        async def find_page(term):
+            return "General Tagge Jr"
+
+        def promote(url, card_name, img_path, table_path):
+            self.promoted.append((url, card_name))
+            return "_wiki_general-tagge-jr.png"
+
+        shrimpbot.wiki = types.SimpleNamespace(findPage=find_page)
+        shrimpbot.wiki_images = types.SimpleNamespace(promote=promote)
+
+    def tearDown(self):
+        (
+            self.shrimpbot.wiki,
+            self.shrimpbot.wiki_images,
+            self.shrimpbot.cardlookup,
+            self.shrimpbot.cardindex,
+        ) = self.saved
+
+    def test_swaps_in_a_new_lookup_and_index(self):
+        lookup, index = self.shrimpbot.cardlookup, self.shrimpbot.cardindex
+        asyncio.run(self.shrimpbot.promote_wiki_image("http://wiki/t.png", "tagge jr"))
+
+        self.assertEqual(self.promoted, [("http://wiki/t.png", "GENERAL TAGGE JR")])
+        self.assertEqual(
+            os.path.basename(self.shrimpbot.cardlookup["GENERAL TAGGE JR"]),
+            "_wiki_general-tagge-jr.png",
+        )
+        self.assertIn("GENERAL TAGGE JR", self.shrimpbot.cardindex)
+        # the old ones, which a search may still be holding, are untouched
+        self.assertNotIn("GENERAL TAGGE JR", lookup)
+        self.assertNotIn("GENERAL TAGGE JR", index)
+
+    def test_known_card_is_not_promoted_again(self):
+        self.shrimpbot.cardlookup = dict(
+            self.shrimpbot.cardlookup, **{"GENERAL TAGGE JR": "tagge.png"}
+        )
+        asyncio.run(self.shrimpbot.promote_wiki_image("http://wiki/t.png", "tagge jr"))
+        self.assertEqual(self.promoted, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import unittest
+
+from lib_shrimpbot.cardsearch import CardIndex
+
+
+class CardIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = CardIndex(
+            [
+                "ADMIRAL ACKBAR",
+                "ADMIRAL MOTTI",
+                "GARM BEL IBLIS",
+                "COMMANDER DARTH VADER",
+                "DARTH VADER OFFICER",
+            ]
+        )
+
+    def test_exact_match(self):
+        self.assertEqual(
+            self.index.search("garm bel-iblis"), (("GARM BEL IBLIS", 100, 100),)
+        )
+
+    def test_typo(self):
+        self.assertEqual(self.index.search("ADMIRAL AKBAR")[0][0], "ADMIRAL ACKBAR")
+
+    def test_top_k_is_sorted(self):
+        matches = self.index.search("VADER", limit=2)
+        self.assertEqual(len(matches), 2)
+        self.assertGreaterEqual(sum(matches[0][1:]), sum(matches[1][1:]))
+
+    def test_remove_from_copy(self):
+        index = self.index.copy()
+        index.remove("ADMIRAL ACKBAR")
+        index.add("ADMIRAL RADDUS")
+        self.assertNotIn("ADMIRAL ACKBAR", index)
+        self.assertEqual(index.search("ADMIRAL RADDUS")[0][0], "ADMIRAL RADDUS")
+        self.assertNotEqual(index.search("ACKBAR")[0][0], "ADMIRAL ACKBAR")
+        self.assertEqual(self.index.search("ACKBAR")[0][0], "ADMIRAL ACKBAR")
+
+    def test_empty_search(self):
+        self.assertEqual(self.index.search("!!"), ())
+
+    def test_ties_go_to_the_first_card(self):
+        for names in (
+            ["ADMIRAL MOTTI", "ADMIRAL OZZEL"],
+            ["ADMIRAL OZZEL", "ADMIRAL MOTTI"],
+        ):
+            matches = CardIndex(names).search("ADMIRAL")
+            self.assertEqual(sum(matches[0][1:]), sum(matches[1][1:]))
+            self.assertEqual([m[0] for m in matches], names)
+
+    def test_copy_keeps_the_order(self):
+        index = CardIndex(["ADMIRAL OZZEL", "ADMIRAL MOTTI"]).copy()
+        index.add("ADMIRAL ACKBAR")
+        self.assertEqual(index.search("ADMIRAL")[0][0], "ADMIRAL OZZEL")
+        index.remove("ADMIRAL OZZEL")
+        index.add("ADMIRAL OZZEL")
+        self.assertEqual(index.search("ADMIRAL")[0][0], "ADMIRAL MOTTI")
+
+    def test_same_results_whatever_the_hash_seed(self):
+        # sets of names iterate in hash order, which changes every run
+        script = (
+            "from lib_shrimpbot.cardsearch import CardIndex, read_card_table\n"
+            "index = CardIndex(read_card_table('cards.txt', 'img/'))\n"
+            "for term in ('ADMIRAL', 'MUNITIONS RESUPPLY FLEET', 'VADER'):\n"
+            "    print(index.search(term))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        results = set()
+        for seed in ("1", "2", "3"):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            results.add(
+                subprocess.run(
+                    [sys.executable, "-W", "ignore", "-c", script],
+                    cwd=root,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+            )
+        self.assertEqual(len(results), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import asyncio
+import importlib.util
+import itertools
+import unittest
+
+from lib_shrimpbot import dice
+
+
+class ParsePoolTestCase(unittest.TestCase):
+    def test_counts(self):
+        self.assertEqual(dice.parse_pool("!odds 3red 2blues 1BLACK"), (3, 2, 1))
+        self.assertEqual(dice.parse_pool("!roll 2red 2red"), (4, 0, 0))
+        self.assertEqual(dice.parse_pool("!roll some red and blue"), (0, 0, 0))
+
+    def test_negative_counts_are_ignored(self):
+        self.assertEqual(dice.parse_pool("!odds -1red 2blue"), (0, 2, 0))
+        self.assertEqual(dice.parse_pool("!odds 1000red -970blue"), (1000, 0, 0))
+        self.assertEqual(dice.parse_pool("!odds 3red -2red"), (3, 0, 0))
+
+    def test_too_many(self):
+        self.assertFalse(dice.too_many((20, 15, 14)))
+        self.assertTrue(dice.too_many((20, 15, 15)))
+        self.assertTrue(dice.too_many((dice.MAX_POOL, 0, 0)))
+        self.assertTrue(dice.too_many(dice.parse_pool("!odds 1000red -970blue")))
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "needs numpy")
+class OddsTestCase(unittest.TestCase):
+    def brute_force(self, red, blue, black):
+        """The same distribution by rolling every combination of faces."""
+
+        fields = dice.Face._fields[1:]
+        counts = {}
+        dice_faces = [dice.RED] * red + [dice.BLUE] * blue + [dice.BLACK] * black
+        for roll in itertools.product(*dice_faces):
+            key = tuple(sum(getattr(f, field) for f in roll) for field in fields)
+            counts[key] = counts.get(key, 0) + 1
+        total = 8 ** (red + blue + black)
+        return {key: count / total for key, count in counts.items()}
+
+    def test_matches_brute_force(self):
+        for pool in [(1, 0, 0), (2, 1, 0), (1, 1, 2), (0, 0, 3)]:
+            dist = dice.pool_distribution(*pool)
+            expected = self.brute_force(*pool)
+            for key, p in expected.items():
+                self.assertAlmostEqual(dist[key], p)
+            self.assertAlmostEqual(dist.sum(), 1.0)
+
+    def test_odds_lines(self):
+        lines = dice.odds(3, 2, 1)
+        self.assertEqual(lines[0], "3 red, 2 blue, 1 black: 4.75 damage on average")
+        self.assertTrue(lines[2].startswith("crits: 1+ 82%"))
+
+    def test_negative_pool_is_refused(self):
+        with self.assertRaises(ValueError):
+            dice.pool_distribution(-1, 2, 0)
+
+    def test_only_the_summary_is_memoized(self):
+        dice.odds.cache_clear()
+        first = dice.odds(20, 15, 14)
+        self.assertIs(dice.odds(20, 15, 14), first)
+        self.assertIsInstance(first, tuple)
+        # the joint arrays are too big to keep around
+        self.assertFalse(hasattr(dice.pool_distribution, "cache_info"))
+        for red in range(40):
+            dice.odds(red, 1, 1)
+        self.assertLessEqual(dice.odds.cache_info().currsize, 32)
+
+
+class ChiSquareTestCase(unittest.TestCase):
+    def test_known_values(self):
+        self.assertAlmostEqual(dice.chi2_sf(14.067, 7), 0.05, places=4)
+        self.assertAlmostEqual(dice.chi2_sf(2.0, 1), 0.1573, places=4)
+        self.assertAlmostEqual(dice.chi2_sf(0.0, 7), 1.0)
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "needs numpy")
+class DiceRollerTestCase(unittest.TestCase):
+    def test_seeded_rolls_repeat(self):
+        first = dice.DiceRoller(seed=1138).roll(3, 2, 1)
+        second = dice.DiceRoller(seed=1138).roll(3, 2, 1)
+        for color in dice.DICE:
+            self.assertEqual(list(first[color]), list(second[color]))
+        self.assertEqual([len(first[c]) for c in dice.DICE], [3, 2, 1])
+
+    def test_negative_pool_is_refused(self):
+        roller = dice.DiceRoller(seed=1138)
+        with self.assertRaises(ValueError):
+            roller.roll(-2, 0, 0)
+        self.assertEqual(len(roller.recent), 0)
+
+    def test_render(self):
+        roller = dice.DiceRoller(seed=1138)
+        rolled = roller.roll(0, 1, 1, forced={"blue": 7, "black": 6})
+        self.assertEqual(
+            roller.render(rolled), dice.BLUE[7].emoji + " " + dice.BLACK[6].emoji
+        )
+        self.assertEqual(roller.render(roller.roll(0, 0, 0)), "")
+
+    def test_fairness_needs_at_least_one_roll(self):
+        roller = dice.DiceRoller(seed=1138)
+        for _ in range(3):
+            roller.roll(1, 1, 1)
+        for last in (0, -1):
+            with self.assertRaises(ValueError):
+                roller.fairness(last)
+        self.assertEqual(roller.fairness(1)[0], "over the last 1 rolls:")
+
+    def test_forced_faces_are_not_counted(self):
+        roller = dice.DiceRoller(seed=1138)
+        roller.roll(2, 2, 2, forced={"black": 7})
+        self.assertEqual(list(roller.window.sum(axis=1)), [2, 2, 0])
+
+    def test_window_keeps_last_rolls(self):
+        roller = dice.DiceRoller(seed=1138, history=10)
+        for _ in range(25):
+            roller.roll(1, 0, 0)
+        self.assertEqual(list(roller.window.sum(axis=1)), [10, 0, 0])
+        self.assertEqual(roller.fairness(4)[0], "over the last 4 rolls:")
+
+    def test_fairness(self):
+        roller = dice.DiceRoller(seed=1138)
+        for _ in range(200):
+            roller.roll(5, 5, 0)
+        lines = roller.fairness()
+        self.assertNotIn("suspicious", lines[1])
+        self.assertTrue(lines[3].endswith("too few to tell"))
+
+        for _ in range(50):
+            roller.roll(0, 0, 5, forced={"red": 7})
+            roller.recent[-1][2, 7] += 5  # as if black kept rolling hit/crits
+            roller.window[2, 7] += 5
+        self.assertIn("suspicious", roller.fairness()[3])
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class DiceCommandsTestCase(unittest.TestCase):
+    def replay(self, *lines):
+        import bench_bot
+        import discord
+        import shrimpbot
+
+        harness = bench_bot.Harness(shrimpbot, channel_type=discord.ChannelType.text)
+        self.addCleanup(harness.close)
+        asyncio.run(harness.replay(bench_bot.read_corpus(lines)))
+        self.assertFalse(harness.errors)
+        return [content for _, content, _ in harness.recorder.sent]
+
+    def test_odds_refuses_oversized_pools(self):
+        for line in ("!odds 1000red -970blue", "!odds 50red"):
+            self.assertEqual(self.replay(line), ["Real funny there, funny guy."])
+
+    def rolled(self, line):
+        """How many dice of each color !roll rolled for line."""
+
+        import shrimpbot
+
+        before = len(shrimpbot.dice_roller.recent)
+        self.replay(line)
+        if len(shrimpbot.dice_roller.recent) == before:
+            return None
+        return [int(row.sum()) for row in shrimpbot.dice_roller.recent[-1]]
+
+    def test_roll_refuses_oversized_pools(self):
+        self.assertIsNone(self.rolled("!roll 500red -460blue"))
+        self.assertIsNone(self.rolled("!roll 50black"))
+
+    def test_roll_ignores_negative_counts(self):
+        self.assertEqual(self.rolled("!roll -2red 1black"), [0, 0, 1])
+
+    def test_fairness_usage(self):
+        for line in ("&fairness 0", "&fairness -3", "&fairness lots"):
+            sent = self.replay(line)
+            self.assertEqual(sent, ["Usage: &fairness [number of rolls, 1 or more]"])
+
+    def test_odds_ignores_negative_counts(self):
+        sent = self.replay("!odds -1red 2blue")
+        self.assertTrue(sent[0].startswith("2 blue:"))
+
+
+if __name__ == "__main__":
+    unittest.main()
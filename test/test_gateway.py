@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import unittest
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class GatewayTestCase(unittest.TestCase):
+    def setUp(self):
+        from lib_shrimpbot import gateway
+
+        self.gateway = gateway
+
+    def test_minimal_profile(self):
+        intents = self.gateway.intents("minimal")
+        self.assertTrue(intents.message_content)
+        self.assertTrue(intents.guild_messages)
+        self.assertTrue(intents.dm_messages)
+        self.assertFalse(intents.members)
+        self.assertFalse(intents.presences)
+
+    def test_extra_intents(self):
+        intents = self.gateway.intents("minimal, members")
+        self.assertTrue(intents.members)
+        self.assertFalse(intents.presences)
+
+    def test_all_profile(self):
+        self.assertTrue(self.gateway.intents("all").presences)
+
+    def test_unknown_names(self):
+        with self.assertRaises(ValueError):
+            self.gateway.intents("everything")
+        with self.assertRaises(ValueError):
+            self.gateway.intents("minimal,value")
+        with self.assertRaises(ValueError):
+            self.gateway.member_cache_flags("some", self.gateway.intents("all"))
+
+    def test_member_cache_flags(self):
+        minimal = self.gateway.intents("minimal")
+        flags = self.gateway.member_cache_flags("none", minimal)
+        self.assertFalse(flags.joined)
+        self.assertFalse(flags.voice)
+        flags = self.gateway.member_cache_flags("joined", self.gateway.intents("all"))
+        self.assertTrue(flags.joined)
+        self.assertFalse(flags.voice)
+
+    def test_max_messages(self):
+        self.assertIsNone(self.gateway.max_messages(0))
+        self.assertEqual(self.gateway.max_messages(250), 250)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import asyncio
+import importlib.util
+import unittest
+
+
+class FakeMember:
+    def __init__(self, guild):
+        self.guild = guild
+
+    async def edit(self, nick=None):
+        self.guild.setup.running += 1
+        self.guild.setup.peak = max(self.guild.setup.peak, self.guild.setup.running)
+        await asyncio.sleep(0.01)
+        self.guild.setup.running -= 1
+        self.guild.nick = nick
+
+
+class FakeGuild:
+    def __init__(self, guild_id, setup):
+        self.id = guild_id
+        self.setup = setup
+        self.me = FakeMember(self)
+        self.nick = None
+        self.left = False
+
+    def __str__(self):
+        return str(self.id)
+
+    async def leave(self):
+        self.left = True
+
+
+class Tally:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+
+@unittest.skipUnless(importlib.util.find_spec("discord"), "needs discord.py")
+class SetupGuildsTestCase(unittest.TestCase):
+    def setUp(self):
+        import shrimpbot
+
+        self.shrimpbot = shrimpbot
+        self.saved = (shrimpbot.guild_setup_slots, shrimpbot.GUILD_SETUP_INTERVAL)
+        shrimpbot.GUILD_SETUP_INTERVAL = 0
+        self.tally = Tally()
+
+    def tearDown(self):
+        (
+            self.shrimpbot.guild_setup_slots,
+            self.shrimpbot.GUILD_SETUP_INTERVAL,
+        ) = self.saved
+
+    def run_setup(self, guilds, concurrency=5):
+        async def main():
+            self.shrimpbot.guild_setup_slots = asyncio.Semaphore(concurrency)
+            await self.shrimpbot.setup_guilds(guilds)
+
+        asyncio.run(main())
+
+    def test_leaves_blacklisted_guild(self):
+        guild = FakeGuild(697833083201650689, self.tally)
+        self.run_setup([guild])
+        self.assertTrue(guild.left)
+        self.assertIsNone(guild.nick)
+
+    def test_fixes_nickname(self):
+        guild = FakeGuild(1, self.tally)
+        big = FakeGuild(669698762402299904, self.tally)
+        self.run_setup([guild, big])
+        self.assertEqual(guild.nick, "Shrimpbot")
+        self.assertFalse(guild.left)
+        self.assertIsNone(big.nick)
+
+    def test_concurrency_cap(self):
+        guilds = [FakeGuild(i, self.tally) for i in range(1, 9)]
+        self.run_setup(guilds, concurrency=3)
+        self.assertEqual(self.tally.peak, 3)
+        self.assertTrue(all(guild.nick == "Shrimpbot" for guild in guilds))
+
+    def test_one_failure_does_not_stop_the_rest(self):
+        broken = FakeGuild(1, self.tally)
+        broken.me = None
+        guild = FakeGuild(2, self.tally)
+        self.run_setup([broken, guild])
+        self.assertEqual(guild.nick, "Shrimpbot")
+
+    def test_list_command_keeps_its_name(self):
+        self.assertIsNotNone(self.shrimpbot.bot.get_command("list"))
+        # and doesn't shadow the builtin on_ready uses
+        self.assertIs(self.shrimpbot.__dict__.get("list"), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
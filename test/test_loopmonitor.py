@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+import unittest
+
+from lib_shrimpbot.loopmonitor import LoopMonitor
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+class LoopMonitorTestCase(unittest.TestCase):
+    def test_blocking_handler_is_caught_with_stack(self):
+        monitor = LoopMonitor(interval=0.02, threshold=0.1)
+
+        async def slow_handler():
+            block_the_loop(0.3)
+
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.1)
+            await asyncio.ensure_future(slow_handler())
+            await asyncio.sleep(0.1)
+            for task in monitor.tasks:
+                task.cancel()
+
+        asyncio.run(main())
+
+        self.assertEqual(monitor.slow_total, 1)
+        stalled = monitor.slow[0]
+        self.assertGreaterEqual(stalled["duration"], 0.2)
+        self.assertIn("slow_handler", stalled["handler"])
+        self.assertIn("block_the_loop", stalled["stack"][-1])
+
+        summary = monitor.summary(stacks=True)
+        self.assertEqual(summary[1], "1 callbacks over 100 ms")
+        self.assertIn("block_the_loop", summary[-1])
+
+        monitor.reset()
+        self.assertEqual(monitor.summary()[1], "0 callbacks over 100 ms")
+
+    def test_discord_event_tasks_are_named(self):
+        monitor = LoopMonitor(interval=0.02, threshold=0.1)
+
+        async def _run_event(coro, event_name):
+            await coro
+
+        async def respond():
+            block_the_loop(0.3)
+
+        async def on_message():
+            await respond()
+
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.1)
+            # the way discord.py's Client._schedule_event starts every event
+            await asyncio.create_task(
+                _run_event(on_message(), "on_message"), name="discord.py: on_message"
+            )
+            await asyncio.sleep(0.1)
+            for task in monitor.tasks:
+                task.cancel()
+
+        asyncio.run(main())
+
+        self.assertEqual(monitor.slow_total, 1)
+        handler = monitor.slow[0]["handler"]
+        self.assertTrue(handler.startswith("discord.py: on_message ("))
+        self.assertIn("respond", handler)
+        self.assertNotIn("_run_event", handler)
+
+    def test_quick_lag_is_not_slow(self):
+        monitor = LoopMonitor(threshold=0.1)
+        monitor.record(0.01)
+        self.assertEqual(monitor.slow_total, 0)
+        self.assertEqual(len(monitor.lags), 1)
+
+    def test_late_sample_is_not_put_down_to_the_next_beat(self):
+        monitor = LoopMonitor(threshold=0.1)
+        # the watchdog caught beat 1 stalled, but only set its sample after
+        # beat 1 had been recorded
+        monitor.record(0.0, beat=1.0)
+        monitor.stalled = {"when": 0, "handler": "stale", "stack": [], "beat": 1.0}
+        monitor.record(0.2, beat=2.0)
+        self.assertEqual(monitor.slow_total, 1)
+        self.assertEqual(monitor.slow[0]["handler"], "(unknown)")
+
+        monitor.stalled = {"when": 0, "handler": "caught", "stack": [], "beat": 3.0}
+        monitor.record(0.2, beat=3.0)
+        self.assertEqual(monitor.slow[1]["handler"], "caught")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import sys
+import tracemalloc
+import unittest
+
+from lib_shrimpbot import memstats
+from lib_shrimpbot.memstats import MemoryTracer
+
+
+class Holder:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class DeepSizeTestCase(unittest.TestCase):
+    def test_counts_contents(self):
+        payload = [str(i) * 1000 for i in range(10)]
+        self.assertGreater(memstats.deep_size(payload), 10000)
+        self.assertGreater(memstats.deep_size(Holder(payload)), 10000)
+
+    def test_counts_shared_objects_once(self):
+        big = "y" * 10000
+        self.assertLess(memstats.deep_size([big, big, big]), 2 * sys.getsizeof(big))
+
+    def test_skips_functions_and_modules(self):
+        self.assertLess(memstats.deep_size({"f": unittest.main, "m": sys}), 1000)
+
+    def test_cache_sizes(self):
+        lines = memstats.cache_sizes({"things": {"a": 1, "b": 2}, "holder": Holder(1)})
+        self.assertTrue(lines[0].startswith("things: 2 entries, ~"))
+        self.assertTrue(lines[1].startswith("holder: ~"))
+
+
+class FormatTestCase(unittest.TestCase):
+    def test_format_bytes(self):
+        self.assertEqual(memstats.format_bytes(512), "512 B")
+        self.assertEqual(memstats.format_bytes(1536), "1.5 KiB")
+        self.assertEqual(memstats.format_bytes(3 * 1024**3), "3.0 GiB")
+
+    def test_rss(self):
+        self.assertGreater(memstats.rss_bytes(), 1024 * 1024)
+
+
+class MemoryTracerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tracer = MemoryTracer()
+
+    def tearDown(self):
+        self.tracer.stop()
+
+    def test_off_by_default(self):
+        self.assertFalse(self.tracer.tracing)
+        self.assertEqual(self.tracer.summary(), ["tracemalloc is off"])
+
+    def test_start_and_stop(self):
+        self.assertTrue(self.tracer.start())
+        self.assertFalse(self.tracer.start())
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertTrue(self.tracer.stop())
+        self.assertFalse(self.tracer.stop())
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_reports_growth(self):
+        self.tracer.start()
+        hoard = [bytearray(1000) for _ in range(1000)]
+        lines = self.tracer.summary(top=5)
+        grown = lines[lines.index("grown the most since tracing started:") + 1 :]
+        self.assertTrue(any("test_memstats.py" in line for line in grown))
+        del hoard
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+import mirror_wiki_images
+from test.test_cardpop import FakeMediaWikiTestCase
+
+
+class MirrorTestCase(FakeMediaWikiTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cards = os.path.join(self.tmp.name, "cards.txt")
+        with open(self.cards, "w") as cards:
+            cards.write("w1_com_admiral-motti.png;ADMIRAL MOTTI")
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.tmp.cleanup()
+
+    async def mirror(self):
+        return await mirror_wiki_images.mirror(
+            self.client, self.tmp.name, self.cards, concurrency=2
+        )
+
+    async def test_mirror(self):
+        counts = await self.mirror()
+        self.assertEqual(
+            counts,
+            {"pages": 3, "local": 1, "no_image": 1, "mirrored": 1, "failed": 0},
+        )
+        with open(self.cards) as cards:
+            self.assertEqual(
+                cards.read().split("\n")[-1],
+                "_wiki_general-dodonna.png;GENERAL DODONNA",
+            )
+        with open(os.path.join(self.tmp.name, "_wiki_general-dodonna.png"), "rb") as f:
+            self.assertEqual(f.read(), b"\x89PNG fake")
+
+    async def test_resume(self):
+        await self.mirror()
+        counts = await self.mirror()
+        self.assertEqual(counts["mirrored"], 0)
+        self.assertEqual(counts["local"], 2)
+
+    def test_category_is_required(self):
+        # without it, every article on the wiki would be listed
+        argv = sys.argv
+        sys.argv = ["mirror_wiki_images.py", "--dry-run"]
+        try:
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(
+                io.StringIO()
+            ):
+                mirror_wiki_images.main()
+        finally:
+            sys.argv = argv
+
+
+if __name__ == "__main__":
+    unittest.main()
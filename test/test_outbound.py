@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from lib_shrimpbot.outbound import ErrorDigest, Outbox, pack
+
+
+class FakeDestination:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class PackTestCase(unittest.TestCase):
+    def test_joins_under_limit(self):
+        self.assertEqual(pack(["a", "b", "c"], limit=5), ["a\nb\nc"])
+
+    def test_splits_at_limit(self):
+        self.assertEqual(pack(["aaa", "bbb", "c"], limit=5), ["aaa", "bbb\nc"])
+
+    def test_splits_long_text(self):
+        self.assertEqual(pack(["x", "abcdefg"], limit=3), ["x", "abc", "def", "g"])
+
+
+class OutboxTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesces(self):
+        destination = FakeDestination()
+        async with Outbox(destination) as out:
+            for i in range(100):
+                out.add("line {}".format(i))
+        self.assertEqual(len(destination.sent), 1)
+
+    async def test_error_digest(self):
+        owner = FakeDestination()
+        digest = ErrorDigest(lambda: owner)
+        digest.report("[!] ERROR | a", "List: one", poc="Alice")
+        digest.report("[!] ERROR | a", "List: two", poc="Bob")
+        digest.report("[!] ERROR | b", poc="Alice")
+        await digest.flush()
+        await digest.flush()
+        self.assertEqual(
+            owner.sent,
+            [
+                "[!] ERROR | a (x2)\nPOC: Alice, Bob\nList: one\n"
+                "[!] ERROR | b\nPOC: Alice"
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
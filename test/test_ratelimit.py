@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from lib_shrimpbot.ratelimit import InFlight, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(
+            {"card": {"user": (6, 2), "channel": (60, 3)}}, clock=self.clock
+        )
+
+    def test_burst_then_refill(self):
+        self.assertTrue(self.limiter.allow("card", "ard", "general"))
+        self.assertTrue(self.limiter.allow("card", "ard", "general"))
+        self.assertFalse(self.limiter.allow("card", "ard", "general"))
+        self.clock.now += 10  # 6 per minute
+        self.assertTrue(self.limiter.allow("card", "ard", "general"))
+        self.assertFalse(self.limiter.allow("card", "ard", "general"))
+
+    def test_channel_bucket_is_shared(self):
+        self.assertTrue(self.limiter.allow("card", "ard", "general"))
+        self.assertTrue(self.limiter.allow("card", "ard", "general"))
+        self.assertTrue(self.limiter.allow("card", "truthiness", "general"))
+        # truthiness still has tokens, but the channel doesn't, and being
+        # turned away doesn't cost truthiness one
+        self.assertFalse(self.limiter.allow("card", "truthiness", "general"))
+        self.assertTrue(self.limiter.allow("card", "truthiness", "other"))
+        self.assertFalse(self.limiter.allow("card", "truthiness", "other"))
+
+    def test_limited_only_returns_limited_commands(self):
+        commands = frozenset({"card", "shrimp"})
+        self.assertEqual(self.limiter.limited(commands, "ard", "general"), set())
+        self.limiter.limited(commands, "ard", "general")
+        self.assertEqual(self.limiter.limited(commands, "ard", "general"), {"card"})
+
+    def test_prune_forgets_refilled_buckets(self):
+        self.limiter.allow("card", "ard", "general")
+        self.clock.now += 600
+        self.limiter.prune()
+        self.assertEqual(self.limiter.buckets, {})
+
+
+class InFlightTestCase(unittest.TestCase):
+    def test_duplicates_are_collapsed_until_released(self):
+        in_flight = InFlight()
+        key = ("card", "general", "!CARD ACKBAR")
+        with in_flight.claim({"card": key}) as first:
+            self.assertEqual(first, set())
+            with in_flight.claim({"card": key, "vassal": "list"}) as second:
+                self.assertEqual(second, {"card"})
+                self.assertIn("list", in_flight)
+            self.assertIn(key, in_flight)
+        self.assertEqual(len(in_flight), 0)
+        self.assertEqual(in_flight.collapsed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import asyncio
+import types
+import unittest
+
+from lib_shrimpbot.reactions import ReactionScheduler
+
+
+class FakeMessage:
+    """Records each reaction and when it was added, and how many were being
+    added at once."""
+
+    def __init__(self, channel_id, tally, fail=()):
+        self.id = channel_id * 100
+        self.channel = types.SimpleNamespace(id=channel_id)
+        self.tally = tally
+        self.fail = fail
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        self.tally.running += 1
+        self.tally.peak = max(self.tally.peak, self.tally.running)
+        try:
+            await asyncio.sleep(0.01)
+            if emoji in self.fail:
+                raise RuntimeError("no")
+            self.reactions.append((emoji, asyncio.get_running_loop().time()))
+        finally:
+            self.tally.running -= 1
+
+
+class Tally:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+
+class ReactionSchedulerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def settle(self, scheduler, wait):
+        await asyncio.sleep(wait)
+        while scheduler.tasks:
+            await asyncio.gather(*scheduler.tasks)
+
+    async def test_waits_for_the_delay(self):
+        scheduler = ReactionScheduler(delay=0.05)
+        message = FakeMessage(1, Tally())
+        start = asyncio.get_running_loop().time()
+        scheduler.schedule(message, "🦐", "👍")
+        await asyncio.sleep(0.02)
+        self.assertEqual(message.reactions, [])
+        await self.settle(scheduler, 0.05)
+        self.assertEqual(sorted(e for e, _ in message.reactions), ["👍", "🦐"])
+        self.assertTrue(all(at - start >= 0.045 for _, at in message.reactions))
+
+    async def test_delay_override(self):
+        scheduler = ReactionScheduler(delay=10)
+        message = FakeMessage(1, Tally())
+        scheduler.schedule(message, "🦐", delay=0)
+        await self.settle(scheduler, 0.01)
+        self.assertEqual([e for e, _ in message.reactions], ["🦐"])
+
+    async def test_per_channel_cap(self):
+        scheduler = ReactionScheduler(delay=0, per_channel=2)
+        tally = Tally()
+        messages = [FakeMessage(1, tally) for _ in range(3)]
+        for message in messages:
+            scheduler.schedule(message, "1", "2", "3")
+        await self.settle(scheduler, 0.01)
+        self.assertEqual(tally.peak, 2)
+        self.assertTrue(all(len(m.reactions) == 3 for m in messages))
+
+    async def test_channels_do_not_share_a_cap(self):
+        scheduler = ReactionScheduler(delay=0, per_channel=1)
+        tally = Tally()
+        for channel_id in (1, 2, 3):
+            scheduler.schedule(FakeMessage(channel_id, tally), "🦐")
+        await self.settle(scheduler, 0.01)
+        self.assertEqual(tally.peak, 3)
+
+    async def test_channel_slots_are_cleaned_up(self):
+        scheduler = ReactionScheduler(delay=0)
+        message = FakeMessage(1, Tally(), fail=("👎",))
+        scheduler.schedule(message, "🦐", "👎")
+        await asyncio.sleep(0.005)
+        self.assertIn(1, scheduler.channel_slots)
+        await self.settle(scheduler, 0)
+        # a failed reaction is logged, not raised, and leaves nothing behind
+        self.assertEqual([e for e, _ in message.reactions], ["🦐"])
+        self.assertEqual(scheduler.channel_slots, {})
+        self.assertEqual(scheduler.channel_users, {})
+        self.assertEqual(scheduler.tasks, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from lib_shrimpbot.reloader import FileWatcher
+
+
+class FileWatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "acronyms.txt")
+        with open(self.path, "w") as f:
+            f.write("BT;Boarding Troopers upgrade card.")
+        self.reloads = []
+        self.watcher = FileWatcher()
+        self.watcher.watch(self.path, self.reloads.append)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_reloads_on_change(self):
+        self.assertEqual(self.watcher.poll(), [])
+        with open(self.path, "a") as f:
+            f.write("\nACM;Assault Concussion Missiles upgrade card.")
+        self.assertEqual(self.watcher.poll(), [self.path])
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.reloads, [self.path])
+
+    def test_failed_reload_is_logged(self):
+        def broken(path):
+            raise ValueError("not enough values to unpack")
+
+        self.watcher.watch(self.path, broken)
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual(self.watcher.poll(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import queue
+import tempfile
+import unittest
+
+import shrimplog
+
+
+class ShrimplogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmp.name, "shrimp.log")
+        self.queue = queue.SimpleQueue()
+
+        file_handler = shrimplog.BatchedFileHandler(self.log_path)
+        file_handler.setFormatter(shrimplog.ShrimpFormatter())
+        self.sampler = shrimplog.ChatSampler()
+        queue_handler = logging.handlers.QueueHandler(self.queue)
+        queue_handler.addFilter(self.sampler)
+
+        self.logger = logging.getLogger("test_shrimplog")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(queue_handler)
+        self.listener = shrimplog.BatchingQueueListener(
+            self.queue, file_handler, batch_size=2, flush_interval=0.05
+        )
+        self.listener.start()
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+        self.tmp.cleanup()
+
+    def read_log(self):
+        self.listener.stop()
+        with open(self.log_path) as log:
+            return log.read().splitlines()
+
+    def test_chat_record_format(self):
+        self.logger.info(
+            "Good night.",
+            extra={
+                "chat": True,
+                "guild": "Star Wars: Armada",
+                "channel": "rules-discussions",
+                "author": "Ardaedhel",
+            },
+        )
+        self.logger.info("plain %s", "record")
+        chat, plain = self.read_log()
+        self.assertTrue(chat.startswith("INFO:test_shrimplog:["))
+        self.assertTrue(
+            chat.endswith(
+                "| Star Wars: Armada | rules-discussions | Ardaedhel] Good night."
+            )
+        )
+        self.assertEqual(plain, "INFO:test_shrimplog:plain record")
+
+    def test_chat_sampling(self):
+        self.sampler.rate = 0.0
+        self.logger.info("dropped", extra={"chat": True})
+        self.logger.info("kept")
+        self.assertEqual(self.read_log(), ["INFO:test_shrimplog:kept"])
+
+
+if __name__ == "__main__":
+    unittest.main()
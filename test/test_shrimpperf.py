@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import threading
+import unittest
+
+import shrimpperf
+
+
+class TimingsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.timings = shrimpperf.Timings(keep=10)
+
+    def test_span_records_even_on_error(self):
+        with self.timings.span("card"):
+            pass
+        with self.assertRaises(ValueError):
+            with self.timings.span("card"):
+                raise ValueError
+        self.assertEqual(self.timings.histograms["card"].count, 2)
+
+    def test_summary_and_reset(self):
+        for ms in range(1, 101):
+            self.timings.record("card.search", ms / 1000)
+        self.timings.record("card", 0.5)
+
+        summary = self.timings.summary()
+        self.assertEqual(summary[1].split(":")[0], "card")
+        # only the last 10 samples are kept for the percentiles
+        self.assertEqual(
+            summary[2],
+            "card.search: 100 calls, p50 96.0 ms, p95 100.0 ms, p99 100.0 ms",
+        )
+
+        self.timings.reset()
+        self.assertEqual(self.timings.summary()[1], "nothing timed yet")
+
+    def test_record_from_threads(self):
+        def work():
+            for _ in range(1000):
+                self.timings.record("listbuilder.zip", 0.001)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        self.assertEqual(self.timings.histograms["listbuilder.zip"].count, 4000)
+
+    def test_percentile(self):
+        self.assertEqual(shrimpperf.percentile([], 0.5), 0.0)
+        self.assertEqual(shrimpperf.percentile([3, 1, 2, 4], 0.5), 3)
+        self.assertEqual(shrimpperf.percentile([3, 1, 2, 4], 0.99), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
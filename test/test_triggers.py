@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from lib_shrimpbot.triggers import TriggerTable
+
+
+class TriggerTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.table = TriggerTable(
+            {
+                "shrimp": ["SHRIMP", "SHRIMPBOT", "MC30"],
+                "hail": ["HAIL SHRIMPBOT"],
+                "acronym": ["!ACRONYM", "!ACRO"],
+                "listhelp": ["!listhelp"],
+            }
+        )
+
+    def test_no_match(self):
+        self.assertEqual(self.table.match("nothing to see here"), frozenset())
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.table.match("mc30s are great"), {"shrimp"})
+        self.assertEqual(self.table.match("!LISTHELP"), {"listhelp"})
+
+    def test_contained_keywords(self):
+        self.assertEqual(self.table.match("all hail shrimpbot"), {"hail", "shrimp"})
+
+    def test_multiple_handlers(self):
+        self.assertEqual(
+            self.table.match("!acronym MC30, then !listhelp"),
+            {"acronym", "shrimp", "listhelp"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from lib_shrimpbot import variants
+from lib_shrimpbot.variants import VariantIndex
+
+
+class VariantIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "card.png")
+        with open(self.source, "wb") as img:
+            img.write(b"original")
+        self.variant_dir = os.path.join(self.tmp.name, "variants")
+        os.makedirs(self.variant_dir)
+        self.variant = os.path.join(self.variant_dir, "card-abc.webp")
+        with open(self.variant, "wb") as img:
+            img.write(b"small")
+        stat = os.stat(self.source)
+        variants.write_manifest(
+            self.variant_dir,
+            {
+                "settings": {},
+                "sources": {
+                    "card.png": {
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "digest": "abc",
+                        "variant": "card-abc.webp",
+                    }
+                },
+            },
+        )
+        self.index = VariantIndex(self.variant_dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_serves_variant(self):
+        self.assertEqual(self.index.get(self.source), self.variant)
+
+    def test_unknown_image_is_sent_as_is(self):
+        other = os.path.join(self.tmp.name, "other.png")
+        self.assertEqual(self.index.get(other), other)
+
+    def test_changed_source_is_sent_as_is(self):
+        with open(self.source, "wb") as img:
+            img.write(b"replaced with something else")
+        self.assertEqual(self.index.get(self.source), self.source)
+
+    def test_missing_variant_is_not_served(self):
+        os.remove(self.variant)
+        self.assertEqual(self.index.get(self.source), self.source)
+
+    def test_no_manifest(self):
+        index = VariantIndex(os.path.join(self.tmp.name, "nowhere"))
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.get(self.source), self.source)
+
+
+@unittest.skipUnless(importlib.util.find_spec("PIL"), "needs Pillow")
+class BuildTestCase(unittest.TestCase):
+    def setUp(self):
+        from PIL import Image
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.variant_dir = os.path.join(self.tmp.name, "variants")
+        self.big = os.path.join(self.tmp.name, "big.png")
+        Image.effect_noise((1200, 2000), 64).convert("RGB").save(self.big)
+        # already small and heavily compressed, so a variant can't beat it
+        self.tiny = os.path.join(self.tmp.name, "tiny.jpg")
+        Image.effect_noise((100, 150), 64).convert("RGB").save(self.tiny, quality=5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, **kwargs):
+        return variants.build([self.big, self.tiny], self.variant_dir, **kwargs)
+
+    def test_builds_smaller_variants(self):
+        from PIL import Image
+
+        counts = self.build(max_size=400)
+        self.assertEqual(counts["built"], 1)
+        self.assertEqual(counts["kept_source"], 1)
+
+        index = VariantIndex(self.variant_dir)
+        variant = index.get(self.big)
+        self.assertTrue(variant.endswith(".webp"))
+        self.assertLess(os.path.getsize(variant), os.path.getsize(self.big))
+        with Image.open(variant) as img:
+            self.assertEqual(img.size, (240, 400))
+        self.assertEqual(index.get(self.tiny), self.tiny)
+
+    def test_only_changed_images_are_rebuilt(self):
+        self.build()
+        os.utime(self.tiny)
+        self.assertEqual(self.build()["unchanged"], 2)
+
+        from PIL import Image
+
+        Image.new("RGB", (900, 900), "red").save(self.big)
+        counts = self.build()
+        self.assertEqual(counts["unchanged"], 1)
+        self.assertEqual(counts["built"], 1)
+        # the old variant is gone
+        self.assertEqual(len(os.listdir(self.variant_dir)), 2)
+
+    def test_new_settings_rebuild_everything(self):
+        self.build()
+        counts = self.build(fmt="png")
+        self.assertEqual(counts["unchanged"], 0)
+        self.assertTrue(VariantIndex(self.variant_dir).get(self.big).endswith(".png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
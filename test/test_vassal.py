@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import tempfile
+import types
+import unittest
+
+from lib_listbuilder.fleet import Upgrade
+from lib_shrimpbot import vassal
+from lib_shrimpbot.vassal import Edit, FleetSession, FleetSessions
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ParseEditTestCase(unittest.TestCase):
+    def test_add_to_ship(self):
+        self.assertEqual(
+            vassal.parse_edit("add Intel Officer to Victory II"),
+            Edit("add", "Intel Officer", "Victory II"),
+        )
+
+    def test_add_without_ship(self):
+        self.assertEqual(
+            vassal.parse_edit("ADD x-wing squadron"),
+            Edit("add", "x-wing squadron", None),
+        )
+
+    def test_remove(self):
+        self.assertEqual(
+            vassal.parse_edit("remove Intel Officer from Victory II"),
+            Edit("remove", "Intel Officer", "Victory II"),
+        )
+        self.assertEqual(vassal.parse_edit("remove Tua"), Edit("remove", "Tua", None))
+
+    def test_fix_line(self):
+        self.assertEqual(
+            vassal.parse_edit("fix line 3: Admiral Motti"),
+            Edit("fix", "Admiral Motti", 3),
+        )
+
+    def test_whole_list_is_not_an_edit(self):
+        self.assertIsNone(vassal.parse_edit("Name: Fleet\nadd Tua to ISD"))
+        self.assertIsNone(vassal.parse_edit("Victory II (73 points)"))
+
+
+class FleetSessionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.sessions = FleetSessions(ttl=60, clock=self.clock)
+
+    def test_expires_after_ttl(self):
+        session = FleetSession()
+        self.sessions.put(1, session)
+        self.clock.now = 59
+        self.assertIs(self.sessions.get(1), session)
+        self.clock.now = 200
+        self.assertIsNone(self.sessions.get(1))
+        self.assertEqual(len(self.sessions), 0)
+
+    def test_use_keeps_it_alive(self):
+        self.sessions.put(1, FleetSession())
+        for now in (50, 100, 150):
+            self.clock.now = now
+            self.assertIsNotNone(self.sessions.get(1))
+
+    def test_end(self):
+        self.sessions.put(1, FleetSession())
+        self.sessions.end(1)
+        self.assertIsNone(self.sessions.get(1))
+
+
+# what the fake fleet's piece lookups can find
+CARDS = {"intelofficer", "tua", "xwingsquadron", "nebulonbescortfrigate"}
+
+
+def look_up(name):
+    if name not in CARDS:
+        raise ValueError(name)
+    return name
+
+
+class FakeShip:
+    def __init__(self, shipclass, upgrades):
+        self.shipclass = shipclass
+        self.upgrades = [types.SimpleNamespace(upgradename=u) for u in upgrades]
+
+    def add_upgrade(self, name):
+        self.upgrades.append(types.SimpleNamespace(upgradename=look_up(name)))
+
+    def remove_upgrade(self, upgrade):
+        self.upgrades.remove(upgrade)
+
+
+class FakeFleet:
+    def __init__(self):
+        self.config = types.SimpleNamespace(piece_cache={})
+        self.ships = [
+            FakeShip("victoryii", ["intelofficer", "tua"]),
+            FakeShip("gladiatori", ["intelofficer"]),
+        ]
+        self.squadrons = []
+
+    def add_ship(self, name):
+        self.ships.append(FakeShip(look_up(name), []))
+
+    def remove_ship(self, ship):
+        self.ships.remove(ship)
+
+    def add_squadron(self, name):
+        if not name.endswith("squadron"):
+            raise ValueError(name)
+        self.squadrons.append(types.SimpleNamespace(squadronclass=look_up(name)))
+
+    def remove_squadron(self, squadron):
+        self.squadrons.remove(squadron)
+
+    def shape(self):
+        return (
+            [(s.shipclass, [u.upgradename for u in s.upgrades]) for s in self.ships],
+            [s.squadronclass for s in self.squadrons],
+        )
+
+
+class ApplyEditTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fleet = FakeFleet()
+
+    def test_remove_from_ship(self):
+        edit = Edit("remove", "Intel Officer", "Gladiator")
+        self.assertIsNone(vassal.apply_edit(self.fleet, edit))
+        self.assertEqual(self.fleet.ships[1].upgrades, [])
+        self.assertEqual(len(self.fleet.ships[0].upgrades), 2)
+
+    def test_remove_ship(self):
+        self.assertIsNone(
+            vassal.apply_edit(self.fleet, Edit("remove", "Victory II", None))
+        )
+        self.assertEqual([s.shipclass for s in self.fleet.ships], ["gladiatori"])
+
+    def test_missing_ship(self):
+        error = vassal.apply_edit(self.fleet, Edit("remove", "Tua", "Onager"))
+        self.assertIn("Onager", error)
+        self.assertEqual(len(self.fleet.ships[0].upgrades), 2)
+
+    def test_add_to_ship(self):
+        edit = Edit("add", "Tua", "Gladiator")
+        self.assertIsNone(vassal.apply_edit(self.fleet, edit))
+        self.assertEqual(
+            self.fleet.shape()[0][1], ("gladiatori", ["intelofficer", "tua"])
+        )
+
+    def test_add_squadron(self):
+        edit = Edit("add", "X-wing Squadron", None)
+        self.assertIsNone(vassal.apply_edit(self.fleet, edit))
+        self.assertEqual(self.fleet.shape()[1], ["xwingsquadron"])
+        self.assertEqual(len(self.fleet.ships), 2)
+
+    def test_add_falls_back_to_ship(self):
+        edit = Edit("add", "Nebulon-B Escort Frigate", None)
+        self.assertIsNone(vassal.apply_edit(self.fleet, edit))
+        self.assertEqual(self.fleet.shape()[0][2], ("nebulonbescortfrigate", []))
+        self.assertEqual(self.fleet.squadrons, [])
+
+    def test_failed_add_leaves_the_fleet_alone(self):
+        before = self.fleet.shape()
+        for edit in (Edit("add", "Bogus", None), Edit("add", "Bogus", "Victory II")):
+            error = vassal.apply_edit(self.fleet, edit)
+            self.assertEqual(error, "I couldn't find a card called Bogus.")
+            self.assertEqual(self.fleet.shape(), before)
+
+
+class EditVlogTestCase(unittest.TestCase):
+    """edit_vlog with listbuilder's parsing and export swapped for fakes."""
+
+    LINES = ["Victory II", "Gladiator I", "Admiral Motti"]
+
+    def setUp(self):
+        import listbuilder
+
+        self.listbuilder = listbuilder
+        self.saved = (
+            listbuilder.parse_fleet,
+            listbuilder.write_vlb,
+            listbuilder.export_to_vlog,
+            vassal.job_config,
+        )
+        self.parsed = []
+        self.written = []
+        self.export_fails = False
+        listbuilder.parse_fleet = self.parse_fleet
+        listbuilder.write_vlb = lambda fleet, path: self.written.append(fleet.shape())
+        listbuilder.export_to_vlog = self.export_to_vlog
+        vassal.job_config = lambda lb, guid, job_dir, root_path: types.SimpleNamespace(
+            vlb_path="job.vlb", vlog_path="job.vlog"
+        )
+
+        self.fleet = FakeFleet()
+        self.session = FleetSession()
+        self.session.fleet = self.fleet
+        self.session.lines = list(self.LINES)
+
+    def tearDown(self):
+        (
+            self.listbuilder.parse_fleet,
+            self.listbuilder.write_vlb,
+            self.listbuilder.export_to_vlog,
+            vassal.job_config,
+        ) = self.saved
+
+    def parse_fleet(self, config):
+        lines = config.fleet.splitlines()
+        self.parsed.append(lines)
+        if "Bogus" in lines:
+            return (False, "Bogus")
+        fleet = FakeFleet()
+        if "Gladiator I" not in lines:
+            fleet.ships.pop()
+        return (True, fleet)
+
+    def export_to_vlog(self, config):
+        if self.export_fails:
+            raise OSError("disk full")
+
+    def edit(self, edit):
+        return vassal.edit_vlog(self.session, edit, "guid", "job", "root")
+
+    def assertUnchanged(self, shape):
+        self.assertIs(self.session.fleet, self.fleet)
+        self.assertEqual(self.fleet.shape(), shape)
+        self.assertEqual(self.session.lines, self.LINES)
+        self.assertEqual(self.session.edits, [])
+
+    def test_add(self):
+        edit = Edit("add", "X-wing Squadron", None)
+        self.assertEqual(self.edit(edit), (True, "job.vlog"))
+        self.assertEqual(self.session.fleet.shape()[1], ["xwingsquadron"])
+        self.assertEqual(self.written, [self.session.fleet.shape()])
+        self.assertEqual(self.session.edits, [edit])
+        self.assertIs(self.session.fleet.config, self.fleet.config)
+
+    def test_failed_edit_leaves_the_session_alone(self):
+        before = self.fleet.shape()
+        success, error = self.edit(Edit("remove", "Tua", "Onager"))
+        self.assertFalse(success)
+        self.assertIn("Onager", error)
+        self.assertEqual(self.written, [])
+        self.assertUnchanged(before)
+
+    def test_failed_export_leaves_the_session_alone(self):
+        before = self.fleet.shape()
+        self.export_fails = True
+        with self.assertRaises(OSError):
+            self.edit(Edit("add", "X-wing Squadron", None))
+        with self.assertRaises(OSError):
+            self.edit(Edit("fix", "Admiral Ozzel", 3))
+        self.assertUnchanged(before)
+
+    def test_fix_line_out_of_range(self):
+        before = self.fleet.shape()
+        for line in (0, 4):
+            self.assertEqual(
+                self.edit(Edit("fix", "Admiral Ozzel", line)),
+                (False, "Your list only has 3 lines."),
+            )
+        self.assertEqual(self.parsed, [])
+        self.assertUnchanged(before)
+
+    def test_fix_line_that_still_does_not_parse(self):
+        before = self.fleet.shape()
+        success, error = self.edit(Edit("fix", "Bogus", 2))
+        self.assertFalse(success)
+        self.assertIn("Bogus", error)
+        self.assertUnchanged(before)
+
+    def test_fix_line_makes_earlier_edits_again(self):
+        tua = Edit("add", "Tua", "Gladiator")
+        squadron = Edit("add", "X-wing Squadron", None)
+        for edit in (tua, squadron):
+            self.assertTrue(self.edit(edit)[0])
+
+        fix = Edit("fix", "Admiral Ozzel", 3)
+        self.assertEqual(self.edit(fix), (True, "job.vlog"))
+        self.assertEqual(self.parsed, [["Victory II", "Gladiator I", "Admiral Ozzel"]])
+        self.assertEqual(self.session.lines[2], "Admiral Ozzel")
+        self.assertEqual(self.session.edits, [tua, squadron])
+        self.assertEqual(
+            self.session.fleet.shape(),
+            (
+                [
+                    ("victoryii", ["intelofficer", "tua"]),
+                    ("gladiatori", ["intelofficer", "tua"]),
+                ],
+                ["xwingsquadron"],
+            ),
+        )
+
+        # with the Gladiator gone, the upgrade added to it is dropped
+        self.assertTrue(self.edit(Edit("fix", "Onager", 2))[0])
+        self.assertEqual(self.session.edits, [squadron])
+        self.assertEqual(
+            self.session.fleet.shape(),
+            ([("victoryii", ["intelofficer", "tua"])], ["xwingsquadron"]),
+        )
+
+
+class PieceCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "pieces.vlo")
+        with sqlite3.connect(self.db) as connection:
+            connection.execute(
+                "create table pieces (piecetype, piecename, content, catchall)"
+            )
+            connection.execute(
+                "insert into pieces values ('upgradecard', 'tua', 'id=vlb_GUID', '')"
+            )
+        connection.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cached_rows_get_fresh_guids(self):
+        config = types.SimpleNamespace(db_path=self.db, piece_cache={})
+        first = Upgrade("Tua", None, config)
+        os.remove(self.db)
+        second = Upgrade("Tua", None, config)
+        self.assertEqual(first.content, "id=" + first.guid)
+        self.assertEqual(second.content, "id=" + second.guid)
+        self.assertNotEqual(first.guid, second.guid)
+
+
+if __name__ == "__main__":
+    unittest.main()
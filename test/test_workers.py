@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import asyncio
+import threading
+import unittest
+
+from lib_shrimpbot.workers import BoundedWorkerPool, UserQueueFull
+
+
+class BoundedWorkerPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = BoundedWorkerPool(max_workers=2, per_user_limit=1)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_runs_off_the_event_loop(self):
+        async def go():
+            return await self.pool.run(1, threading.current_thread)
+
+        self.assertIsNot(asyncio.run(go()), threading.main_thread())
+
+    def test_per_user_limit(self):
+        release = threading.Event()
+
+        async def go():
+            first = asyncio.ensure_future(self.pool.run(1, release.wait))
+            await asyncio.sleep(0)
+            self.assertTrue(self.pool.is_full(1))
+            self.assertFalse(self.pool.is_full(2))
+            with self.assertRaises(UserQueueFull):
+                await self.pool.run(1, release.wait)
+            release.set()
+            await first
+            self.assertFalse(self.pool.is_full(1))
+
+        asyncio.run(go())
+
+
+if __name__ == "__main__":
+    unittest.main()